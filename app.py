@@ -1,28 +1,44 @@
-import streamlit as st
-import pandas as pd
-import ast
-import altair as alt
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
-import seaborn as sns
-import itertools
-from collections import defaultdict, Counter
-import networkx as nx
-from pyvis.network import Network
-import streamlit.components.v1 as components
-import plotly.graph_objects as go
-import plotly.express as px
-import folium
-from folium.plugins import HeatMap
-from geopy.geocoders import Nominatim
-import time
 import os
+import json
+import time
+import threading
+from collections import Counter
+import startup_profile
+from startup_profile import lazy_import, timed
+
+# Core modules needed by every session. Visualization libraries (Altair, Plotly, Folium) and
+# the TF-IDF model (scikit-learn) are imported with lazy_import where they are first used.
+with timed("import", "streamlit"):
+    import streamlit as st
+    import streamlit.components.v1 as components
+with timed("import", "pandas"):
+    import pandas as pd
+with timed("import", "data_store"):
+    import data_store
+    from data_store import to_tuples
+with timed("import", "project modules"):
+    import gazetteer
+    import vector_index
+    from similarity_index import (
+        ALL_CATEGORIES, FUZZY_METHOD, SIMILARITY_COLUMNS, extend_similarity_data, get_filtered_df,
+        prepare_similarity_data, shared_entities,
+    )
+    import artifact_cache
+    import graph_store
+    import instrumentation
+    import search_index
+    from instrumentation import counted_cache, span
+
+RUN_START = time.perf_counter()
+if "debug_session" not in st.session_state:
+    st.session_state["debug_session"] = f"{time.time_ns():x}"
+TRACE = instrumentation.start_trace(st.session_state["debug_session"])
 
 #############################################
 # Helper: Data Loading (Modularized & Cached)
 #############################################
 
-@st.cache_data(show_spinner=False)
+@counted_cache(st.cache_data(show_spinner=False))
 def load_pickle_data(filepath: str) -> pd.DataFrame:
     """Loads a preprocessed pickle file and returns a DataFrame."""
     if os.path.exists(filepath):
@@ -31,42 +47,67 @@ def load_pickle_data(filepath: str) -> pd.DataFrame:
         st.error(f"File {filepath} not found. Please create the pickle file first.")
         raise FileNotFoundError(f"{filepath} does not exist.")
 
-def load_similarity_data() -> dict:
-    """
-    Loads preprocessed similarity analysis data from pickle files.
-    Ensure that you have created these pickle files offline.
-    """
-    # Update these paths to your pickle file locations
-    fuzzy_df = load_pickle_data("./data/fuzzy_clean.pkl")
-    bert_df = load_pickle_data("./data/bert_clean.pkl")
-    parsed_news_df = load_pickle_data("./data/parsed_news_clean.pkl")
-    wikileaks_mapping_df = load_pickle_data("./data/wikileaks_mapping_clean.pkl")
-    
-    # Build a mapping from key to Wikileaks document text.
-    key_to_text = pd.Series(wikileaks_mapping_df["Text"].values, index=wikileaks_mapping_df["key"]).to_dict()
-
-    def get_unique_links(df):
-        return df.drop_duplicates(subset="news_Link")["news_Link"].unique()
-    
-    fuzzy_unique_links = get_unique_links(fuzzy_df)
-    bert_unique_links = get_unique_links(bert_df)
-    
-    # Preprocess entity columns if needed
-    if "common_entities" in fuzzy_df.columns:
-        fuzzy_df["common_entities"] = fuzzy_df["common_entities"].apply(
-            lambda x: ast.literal_eval(x) if isinstance(x, str) else x
+def read_store_parts(name: str, paths: list, columns: list = None) -> pd.DataFrame:
+    """Reads a table's part files from one manifest snapshot, reporting a missing table in the UI."""
+    if not paths:
+        e = FileNotFoundError(
+            f"Table '{name}' not found in {data_store.STORE_DIR}. Run `python data_store.py build` first."
         )
-    
-    return {
-        "fuzzy_df": fuzzy_df,
-        "bert_df": bert_df,
-        "parsed_news_df": parsed_news_df,
-        "key_to_text": key_to_text,
-        "fuzzy_unique_links": fuzzy_unique_links,
-        "bert_unique_links": bert_unique_links
-    }
+        st.error(f"{e}")
+        raise e
+    return data_store.read_parts(paths, columns)
+
+# Columns the similarity data is built from, per store table.
+SIMILARITY_TABLES = {"fuzzy": SIMILARITY_COLUMNS, "bert": SIMILARITY_COLUMNS, "news": ["Link", "Text"]}
+
+@st.cache_resource
+def similarity_state() -> dict:
+    """The last similarity data built in this process, with the store build and part files it covers."""
+    return {"lock": threading.Lock(), "build": None, "files": {}, "data": None}
 
-@st.cache_data(show_spinner=False)
+@counted_cache(st.cache_resource(show_spinner=False, max_entries=2))
+def load_similarity_data(store_version: int = 0) -> dict:
+    """
+    Loads preprocessed similarity analysis data from the columnar data store and builds
+    the lookup structures used by the sidebar and tabs. Built once per process and
+    store version; `store_version` is only used as the cache key, and only the two most
+    recent versions are kept, so appends by ingest.py do not accumulate copies.
+    When the store was only appended to since the last load, just the new parts are read
+    and added to the previous data; a rebuild (or a compaction mixing read and unread
+    parts) reloads everything.
+    Ensure that you have built the store offline with `python data_store.py build`.
+    """
+    state = similarity_state()
+    with state["lock"]:
+        manifest = data_store.read_manifest()
+        build = manifest.get("build_version", manifest.get("version", 0))
+        added = None
+        if state["data"] is not None and state["build"] == build:
+            added = {name: data_store.new_parts(name, state["files"].get(name, []), manifest)
+                     for name in SIMILARITY_TABLES}
+        if added is not None and all(paths is not None for paths in added.values()):
+            if any(added.values()):
+                state["data"] = extend_similarity_data(state["data"], *(
+                    data_store.read_parts(paths, SIMILARITY_TABLES[name]) if paths else None
+                    for name, paths in added.items()
+                ))
+        else:
+            tables = {name: read_store_parts(name, data_store.manifest_parts(name, manifest), columns)
+                      for name, columns in SIMILARITY_TABLES.items()}
+            wikileaks = read_store_parts(
+                "wikileaks", data_store.manifest_parts("wikileaks", manifest), ["key", "Text", "Category", "entities"]
+            )
+            state["data"] = prepare_similarity_data(tables["fuzzy"], tables["bert"], tables["news"], wikileaks)
+        state["build"] = build
+        state["files"] = {name: [os.path.basename(path) for path in data_store.manifest_parts(name, manifest)]
+                          for name in SIMILARITY_TABLES}
+        return state["data"]
+
+def get_news_text(sim_data: dict, link: str) -> str:
+    """Returns the news excerpt text for a link."""
+    return sim_data["link_to_text"].get(link, "Text not found.")
+
+@counted_cache(st.cache_data(show_spinner=False))
 def load_threat_data() -> pd.DataFrame:
     """
     Loads preprocessed threat analysis data from pickle files.
@@ -85,36 +126,171 @@ def load_threat_data() -> pd.DataFrame:
     sentencebert_df.rename(columns={'Text': 'news_content'}, inplace=True)
     return sentencebert_df
 
+@counted_cache(st.cache_resource(show_spinner=False, max_entries=2))
+def get_artifact_cache(build_version: int = 0) -> artifact_cache.ArtifactCache:
+    """
+    Process-wide LRU cache of rendered per-article visualizations, shared by all sessions.
+    Falls back to the files written by `python artifact_cache.py` for this store build. Keyed by
+    the build version, not the store version: appended articles do not change existing ones.
+    """
+    return artifact_cache.ArtifactCache(disk_dir=artifact_cache.version_dir(build_version))
+
+@counted_cache(st.cache_resource(show_spinner=False, max_entries=2))
+def load_graph_store(store_version: int = 0) -> graph_store.GraphStore:
+    """
+    Loads the corpus entity-relationship graph built by `python graph_store.py build` and appends
+    any documents added to the data store since (builds it in memory if it has not been saved).
+    """
+    with timed("data", "load_graph_store"):
+        return graph_store.sync_graph(graph_store.GraphStore.load(graph_store.GRAPH_DIR))
+
+def get_article_triples(graph: graph_store.GraphStore, news_link: str, news_relationships) -> list:
+    """(subject, relation, object, key) triples of an article, from the graph store when it is indexed."""
+    doc = graph_store.news_doc(news_link)
+    if doc in graph:
+        return graph.triples(graph.doc_edges(doc))
+    return graph_store.relationship_triples(to_tuples(news_relationships))
+
+#############################################
+# LIVE RANKING: Vector Index for Pasted Articles
+#############################################
+
+@counted_cache(st.cache_resource(show_spinner=False))
+def load_wikileaks_index():
+    """Loads the saved Wikileaks vector index (memory-mapped), or None if it has not been built."""
+    return vector_index.load_index(vector_index.INDEX_DIR)
+
+@counted_cache(st.cache_resource(show_spinner="Loading TF-IDF model...", max_entries=2))
+def load_tfidf_model(build_version: int = 0) -> tuple:
+    """
+    Loads the saved Wikileaks TF-IDF model built by `python tfidf_model.py build`. Returns
+    (model or None, current?). The app never fits or saves a model: saving prunes old versions,
+    which other sessions or processes may still be reading.
+    """
+    tfidf_model = lazy_import("tfidf_model")
+    with timed("data", "load_tfidf_model"):
+        model = tfidf_model.TfidfModel.load(tfidf_model.MODEL_DIR)
+        if model is None:
+            return None, False
+        return model, tfidf_model.is_current(model, *tfidf_model.wikileaks_corpus())
+
+@counted_cache(st.cache_resource(show_spinner="Loading Sentence-BERT model..."))
+def load_sentence_model(model_name: str):
+    """Loads the Sentence-BERT model used to build the index. Imported lazily, as it is heavy."""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
 #############################################
 # GEOLOCATION: For Heatmap
 #############################################
 
-# Initialize geolocator with a proper user agent
-geolocator = Nominatim(user_agent="your_app_name_here")
+# Country coordinates come from the bundled offline gazetteer (data/country_centroids.csv).
+# Set ENABLE_ONLINE_GEOCODING=1 to geocode names missing from it with Nominatim.
+ONLINE_GEOCODING = os.environ.get("ENABLE_ONLINE_GEOCODING", "0") == "1"
 
-@st.cache_data(show_spinner=False)
+@counted_cache(st.cache_data(show_spinner=False))
 def get_cached_lat_lon(country: str):
     """
-    Returns the latitude and longitude for a given country.
+    Returns the latitude and longitude for a name that is not in the offline gazetteer, using Nominatim.
     The result is cached so that subsequent calls with the same country name do not trigger a new API request.
     """
+    return gazetteer.geocode_online(country)
+
+def locate_countries(countries) -> pd.DataFrame:
+    """Bulk lookup of canonical country names and coordinates (iso3, country, latitude, longitude)."""
+    return gazetteer.coordinates(countries, online_fallback=ONLINE_GEOCODING, geocoder=get_cached_lat_lon)
+
+#############################################
+# THREAT AGGREGATE: Produced by test.py
+#############################################
+
+# Per-country High/Medium/Low counts written by `python test.py`.
+THREAT_COUNTS_FILE = "./data/threat_counts.json"
+THREAT_COLUMNS = ["High Threats", "Medium Threats", "Low Threats"]
+
+def file_signature(path: str):
+    """(modification time, size) of a file, or None if it does not exist. Used as a cache key."""
     try:
-        time.sleep(1)  # Avoid rate limiting
-        location = geolocator.geocode(country)
-        if location:
-            return location.latitude, location.longitude
-        else:
-            return None, None
-    except Exception as e:
-        st.write(f"Error geocoding {country}: {e}")
-        return None, None
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+@counted_cache(st.cache_resource(show_spinner=False))
+def load_threat_tables(path: str, signature: tuple) -> dict:
+    """
+    Loads the threat aggregate once and precomputes everything the Analysis Dashboard and
+    Threat Heatmap tabs render: totals, scores, sort order, pie labels and heatmap points.
+    `signature` is part of the cache key, so a new pipeline run is picked up on the next rerun.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        result = json.load(f)
+    levels = result.get("levels", ["High", "Medium", "Low"])
+    threat_df = pd.DataFrame(result["countries"], columns=["country"] + levels)
+    threat_df.columns = ["Country"] + [f"{level} Threats" for level in levels]
+    threat_df["Total Threats"] = threat_df[THREAT_COLUMNS].sum(axis=1)
+    threat_df = threat_df.sort_values("Total Threats", ascending=False, kind="mergesort").reset_index(drop=True)
+    threat_df["Threat Score"] = (threat_df["High Threats"] * 3 +
+                                 threat_df["Medium Threats"] * 2 +
+                                 threat_df["Low Threats"] * 1)
+    total = threat_df["Total Threats"].sum()
+    percent = threat_df["Total Threats"] / total * 100 if total else threat_df["Total Threats"] * 0.0
+    threat_df["display_text"] = [f"{x:.1f}%" if x >= 2 else "" for x in percent]
+
+    # Resolve all names in one pass; the pipeline already writes canonical country names.
+    locations = locate_countries(threat_df["Country"])
+    located = threat_df.join(locations[["latitude", "longitude"]]).dropna(subset=["latitude", "longitude"])
+    return {
+        "threat_df": threat_df,
+        "country_order": threat_df["Country"].tolist(),
+        "heat_data": located[["latitude", "longitude", "Total Threats"]].values.tolist(),
+        "generated_at": result.get("generated_at"),
+        "rows": result.get("rows"),
+        "signature": signature,
+    }
+
+def get_threat_tables(path: str = THREAT_COUNTS_FILE):
+    """Returns the cached threat tables, or None (with a warning) if the aggregate has not been produced."""
+    signature = file_signature(path)
+    if signature is None:
+        st.warning(f"{path} not found. Run `python test.py` to compute the threat counts.")
+        return None
+    return load_threat_tables(path, signature)
+
+@counted_cache(st.cache_resource(show_spinner=False))
+def threat_heatmap_html(path: str, signature: tuple) -> str:
+    """Renders the Folium heatmap to an HTML document once per version of the aggregate."""
+    folium = lazy_import("folium")
+    HeatMap = lazy_import("folium.plugins").HeatMap
+    heat_data = load_threat_tables(path, signature)["heat_data"]
+    m = folium.Map(location=[20, 0], zoom_start=2)
+    if heat_data:
+        HeatMap(heat_data).add_to(m)
+    return m.get_root().render()
 
 #############################################
 # GLOBAL SIDEBAR (Restored, without Top 15 Entities)
 #############################################
 
+# The store version is read once per run, so every cached loader in this run is keyed by the same version.
+STORE_VERSION = data_store.store_version()
+
 # Load similarity data once for sidebar use.
-sim_data = load_similarity_data()
+with timed("data", "load_similarity_data"):
+    sim_data = load_similarity_data(STORE_VERSION)
+
+# New excerpts appended by ingest.py bump the store version; each session checks the manifest
+# every STORE_POLL_SECONDS and reruns when it changes (STORE_POLL_SECONDS=0 turns this off).
+STORE_POLL_SECONDS = float(os.environ.get("STORE_POLL_SECONDS", "5"))
+
+@st.fragment(run_every=STORE_POLL_SECONDS or None)
+def watch_store_version(seen_version: int):
+    if data_store.store_version() != seen_version:
+        st.rerun()
+    st.caption(f"Data store version {seen_version} · {len(sim_data['link_to_text'])} news excerpts")
+
+with st.sidebar:
+    watch_store_version(STORE_VERSION)
 
 st.sidebar.title("Article Selection")
 
@@ -131,21 +307,29 @@ if selection_method == "News Link":
     selected_news = st.sidebar.selectbox("Select a News Link", available_links)
     selected_news_link = selected_news
 else:
+    # Full-text search instead of a selectbox of every excerpt: only one page of hits is sent
+    # to the browser, and a hit maps to its link directly.
     st.sidebar.subheader("News Excerpts")
-    available_texts = sim_data["parsed_news_df"]["Text"].dropna().unique()
-    selected_text = st.sidebar.selectbox("Select a News Excerpt", available_texts)
-    selected_news_link = sim_data["parsed_news_df"][sim_data["parsed_news_df"]["Text"] == selected_text].iloc[0]["Link"]
+    news_search = sim_data["news_search"]
+    query = st.sidebar.text_input("Search news excerpts", placeholder="Words or word prefixes, e.g. money laund")
+    page = st.sidebar.number_input("Results page", min_value=1, value=1, step=1)
+    with span("search"):
+        hits = news_search.search(query, page)
+    if hits["total"]:
+        first = (hits["page"] - 1) * search_index.PAGE_SIZE
+        st.sidebar.caption(f"Results {first + 1}–{first + len(hits['keys'])} of {hits['total']} "
+                           f"(page {hits['page']} of {hits['pages']})")
+        selected_news_link = st.sidebar.radio(
+            "Select a News Excerpt", hits["keys"],
+            format_func=lambda link: news_search.snippet(link, query, width=100),
+        )
+        st.session_state["last_excerpt_link"] = selected_news_link
+    else:
+        st.sidebar.info("No excerpts match this search.")
+        selected_news_link = st.session_state.get("last_excerpt_link", news_search.keys[0] if len(news_search) else None)
 
 # Additional similarity settings (restored from your original sidebar)
-if view_option == "Fuzzy Matching":
-    data_for_categories = sim_data["fuzzy_df"]
-else:
-    data_for_categories = sim_data["bert_df"]
-
-def get_categories(df):
-    return df['wikileaks_Category'].dropna().unique()
-
-categories = get_categories(data_for_categories)
+categories = sim_data["categories"][view_option]
 st.sidebar.header("Category Filter")
 category_option = st.sidebar.selectbox("Select Category", ["All"] + list(categories))
 
@@ -153,42 +337,69 @@ category_option = st.sidebar.selectbox("Select Category", ["All"] + list(categor
 # TAB 1: Wikileaks Similarity Analysis
 #############################################
 
+# Figures are memoized on the inputs they are built from (store version, method, link,
+# category), so reruns triggered elsewhere reuse them. Arguments starting with "_" are
+# derived from the hashed ones and are not part of the cache key.
+
+@counted_cache(st.cache_resource(show_spinner=False, max_entries=256))
+def sankey_figure(store_version: int, news_link: str, _triples: list):
+    """Sankey diagram of an article's relationship triples, or None if there are too few."""
+    nodes, source_indices, target_indices, values = graph_store.sankey_links(_triples)
+    if not (nodes and source_indices):
+        return None
+    go = lazy_import("plotly.graph_objects")
+    sankey_fig = go.Figure(data=[go.Sankey(
+        node=dict(
+            pad=15,
+            thickness=20,
+            line=dict(color="black", width=0.5),
+            label=nodes,
+            color="blue"
+        ),
+        link=dict(
+            source=source_indices,
+            target=target_indices,
+            value=values
+        )
+    )])
+    sankey_fig.update_layout(title_text="Entity-Relationship Sankey Diagram", font_size=10)
+    return sankey_fig
+
+@counted_cache(st.cache_resource(show_spinner=False, max_entries=256))
+def similarity_scatter(store_version: int, method: str, news_link: str, category: str, _filtered_df: pd.DataFrame):
+    """Altair scatter of the top-30 similarity rows for a (method, link, category) selection."""
+    alt = lazy_import("altair")
+    plot_df = _filtered_df[["content_similarity", "wikileaks_Category", "news_Link"]]
+    return alt.Chart(plot_df).mark_circle(size=100).encode(
+        x=alt.X("content_similarity:Q", title="Content Similarity (%)"),
+        y=alt.Y("wikileaks_Category:N", title="Wikileaks Category"),
+        color="wikileaks_Category:N",
+        # Tooltip now includes news_Link so that each dot shows its news link
+        tooltip=["content_similarity", "wikileaks_Category", "news_Link"]
+    ).properties(
+        width=600,
+        height=300,
+        title="Scatter Plot of Similarity Score vs. Category (Top 30)"
+    )
+
 def similarity_analysis(selected_news_link, view_option, category_option, sim_data):
     st.header("Wikileaks and News Excerpt Similarity Analysis")
-    parsed_news_df = sim_data["parsed_news_df"]
     key_to_text = sim_data["key_to_text"]
+    graph = load_graph_store(STORE_VERSION)
 
-    if view_option == "Fuzzy Matching":
-        data_df = sim_data["fuzzy_df"]
-    else:
-        data_df = sim_data["bert_df"]
-
-    # Modified filtering function that takes a parameter for number of rows
-    @st.cache_data(show_spinner=False)
-    def get_filtered_df(df, news_link, cat_option, n):
-        filtered = df[df["news_Link"] == news_link].sort_values(by="content_similarity", ascending=False)
-        if cat_option != "All":
-            filtered = filtered[filtered["wikileaks_Category"] == cat_option]
-        return filtered.head(n)
-    
     # Use one filtered DataFrame for the top 3 display and one for the scatter plot (top 30)
-    filtered_df_top = get_filtered_df(data_df, selected_news_link, category_option, 3)
-    filtered_df_scatter = get_filtered_df(data_df, selected_news_link, category_option, 30)
-
-    def get_news_text(link):
-        result = parsed_news_df[parsed_news_df["Link"] == link]
-        if not result.empty:
-            return result.iloc[0]["Text"]
-        return "Text not found."
+    with span("filter"):
+        filtered_df_top = get_filtered_df(sim_data, view_option, selected_news_link, category_option, 3)
+        filtered_df_scatter = get_filtered_df(sim_data, view_option, selected_news_link, category_option, 30)
 
     st.markdown("## Selected News Article")
     if not filtered_df_top.empty:
-        article_text = get_news_text(selected_news_link)
+        article_text = get_news_text(sim_data, selected_news_link)
         st.write(article_text)
         st.markdown("### Entities:")
-        st.write(filtered_df_top.iloc[0].get('news_entities', "N/A"))
+        st.write(to_tuples(filtered_df_top.iloc[0].get('news_entities')))
         st.markdown("### Relationships:")
-        st.write(filtered_df_top.iloc[0].get('news_relationships', "N/A"))
+        st.write(to_tuples(filtered_df_top.iloc[0].get('news_relationships')))
         # Display as Topic / Sector.
         st.markdown("### Categories (Topic / Sector):")
         topic = filtered_df_top.iloc[0].get('news_Category_x', "N/A")
@@ -211,89 +422,56 @@ def similarity_analysis(selected_news_link, view_option, category_option, sim_da
             with col:
                 st.markdown(f"### Similarity Score: {filtered_df_top.iloc[i]['content_similarity']:.2f}%")
                 st.markdown("### Wikileaks Document")
-                if view_option == "Sentence-BERT":
-                    doc_key = filtered_df_top.iloc[i]['wikileaks_Text']
-                    doc_text = key_to_text.get(doc_key, f"Document not found for key: {doc_key}")
-                    st.write(doc_text)
-                else:
-                    st.write(filtered_df_top.iloc[i]['wikileaks_Text'])
+                doc_key = filtered_df_top.iloc[i]['wikileaks_key']
+                st.write(key_to_text.get(doc_key, f"Document not found for key: {doc_key}"))
                 st.markdown(f"**Category Match:** {filtered_df_top.iloc[i]['wikileaks_Category']}")
+                shared = shared_entities(sim_data, filtered_df_top.iloc[i].get('news_entities'), doc_key)
+                if shared:
+                    st.markdown(f"**Shared Entities:** {', '.join(f'{text} ({label})' for text, label in shared)}")
     else:
         st.info("No similar Wikileaks documents to display.")
 
     st.markdown("## Additional Visualizations")
+    # Per-article artifacts are rendered once and served from the shared LRU cache afterwards.
+    artifacts = get_artifact_cache(data_store.build_version())
+    # Both relationship views render the article's subgraph from the corpus graph store.
+    if not filtered_df_top.empty:
+        article_triples = get_article_triples(graph, selected_news_link,
+                                              filtered_df_top.iloc[0].get("news_relationships"))
+
     # Word Cloud
     st.markdown("### News Article Word Cloud")
-    article_text_for_wc = get_news_text(selected_news_link)
+    article_text_for_wc = get_news_text(sim_data, selected_news_link)
+    wordcloud_png = None
     if article_text_for_wc:
-        wordcloud = WordCloud(width=800, height=400, background_color='white').generate(article_text_for_wc)
-        plt.figure(figsize=(10, 5))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis("off")
-        st.pyplot(plt)
+        with span("wordcloud"):
+            wordcloud_png = artifacts.get_or_render(artifact_cache.WORDCLOUD, selected_news_link,
+                                                    artifact_cache.render_wordcloud, article_text_for_wc)
+    if wordcloud_png:
+        st.image(wordcloud_png)
     else:
         st.info("No news text available for word cloud visualization.")
     
     # Entity–Relationship Graph using Pyvis
     st.markdown("### Entity–Relationship Graph for Selected Article")
     if not filtered_df_top.empty:
-        news_relationships = filtered_df_top.iloc[0].get("news_relationships", [])
-        if isinstance(news_relationships, str):
-            news_relationships = ast.literal_eval(news_relationships)
-        groups = defaultdict(list)
-        for rel in news_relationships:
-            groups[rel[2]].append(rel)
-        def build_entity_relationship_graph(rel_groups):
-            G = nx.Graph()
-            for key, group in rel_groups.items():
-                if len(group) == 2:
-                    subj_tuple, obj_tuple = group[0], group[1]
-                    subject = subj_tuple[0]
-                    relation = subj_tuple[1]
-                    obj = obj_tuple[0]
-                    G.add_node(subject, label=subject, type="entity")
-                    G.add_node(obj, label=obj, type="entity")
-                    rel_node_id = f"rel_{key}"
-                    G.add_node(rel_node_id, label=relation, shape="box", type="relation")
-                    G.add_edge(subject, rel_node_id)
-                    G.add_edge(rel_node_id, obj)
-            return G
-        def draw_pyvis_graph(G):
-            net = Network(height="500px", width="100%", notebook=False)
-            net.from_nx(G)
-            net.repulsion(node_distance=200, central_gravity=0.3)
-            net.save_graph("entity_relationship_graph.html")
-            with open("entity_relationship_graph.html", "r", encoding="utf-8") as html_file:
-                source_code = html_file.read()
-            return source_code
-        G = build_entity_relationship_graph(groups)
-        graph_html = draw_pyvis_graph(G)
-        components.html(graph_html, height=550, scrolling=True)
+        with span("entity graph"):
+            graph_html = artifacts.get_or_render(artifact_cache.ENTITY_GRAPH, selected_news_link,
+                                                 artifact_cache.render_entity_graph, article_triples)
+            components.html(graph_html, height=550, scrolling=True)
     else:
         st.info("No selected article available to generate an entity–relationship graph.")
     
     # Entity Co-occurrence Heatmap
     st.markdown("### Entity Co-occurrence Heatmap")
     if not filtered_df_top.empty:
-        entities = filtered_df_top.iloc[0].get("news_entities", [])
-        if isinstance(entities, str):
-            entities = ast.literal_eval(entities)
-        def get_entity_name(ent):
-            if isinstance(ent, (list, tuple)):
-                return ent[0]
-            return ent
-        entities = [get_entity_name(e) for e in entities]
-        if entities and isinstance(entities, list):
-            unique_entities = sorted(set(entities))
-            co_occurrence = pd.DataFrame(0, index=unique_entities, columns=unique_entities)
-            for pair in itertools.combinations(entities, 2):
-                co_occurrence.loc[pair[0], pair[1]] += 1
-                co_occurrence.loc[pair[1], pair[0]] += 1
-            for entity in unique_entities:
-                co_occurrence.loc[entity, entity] = entities.count(entity)
-            plt.figure(figsize=(10, 8))
-            sns.heatmap(co_occurrence, annot=True, cmap="YlGnBu", fmt="d")
-            st.pyplot(plt)
+        entities = to_tuples(filtered_df_top.iloc[0].get("news_entities"))
+        with span("co-occurrence heatmap"):
+            heatmap_png = artifacts.get_or_render(artifact_cache.COOCCURRENCE, selected_news_link,
+                                                  artifact_cache.render_cooccurrence, entities)
+        if heatmap_png:
+            st.caption(f"Showing up to the {artifact_cache.DEFAULT_TOP_N} most frequently mentioned entities.")
+            st.image(heatmap_png)
         else:
             st.info("No entities available for the co-occurrence heatmap.")
     else:
@@ -302,53 +480,10 @@ def similarity_analysis(selected_news_link, view_option, category_option, sim_da
     # Sankey Diagram for Entity Relationships
     st.markdown("### Sankey Diagram for Entity Relationships")
     if not filtered_df_top.empty:
-        news_relationships = filtered_df_top.iloc[0].get("news_relationships", [])
-        if isinstance(news_relationships, str):
-            news_relationships = ast.literal_eval(news_relationships)
-        groups = defaultdict(list)
-        for rel in news_relationships:
-            groups[rel[2]].append(rel)
-        nodes = []
-        node_to_index = {}
-        source_indices = []
-        target_indices = []
-        values = []
-        def add_node(label):
-            if label not in node_to_index:
-                node_to_index[label] = len(nodes)
-                nodes.append(label)
-            return node_to_index[label]
-        for key, group in groups.items():
-            if len(group) == 2:
-                subj = group[0][0]
-                relation = group[0][1]
-                obj = group[1][0]
-                subj_idx = add_node(subj)
-                rel_idx = add_node(relation)
-                obj_idx = add_node(obj)
-                source_indices.append(subj_idx)
-                target_indices.append(rel_idx)
-                values.append(1)
-                source_indices.append(rel_idx)
-                target_indices.append(obj_idx)
-                values.append(1)
-        if nodes and source_indices:
-            sankey_fig = go.Figure(data=[go.Sankey(
-                node=dict(
-                    pad=15,
-                    thickness=20,
-                    line=dict(color="black", width=0.5),
-                    label=nodes,
-                    color="blue"
-                ),
-                link=dict(
-                    source=source_indices,
-                    target=target_indices,
-                    value=values
-                )
-            )])
-            sankey_fig.update_layout(title_text="Entity-Relationship Sankey Diagram", font_size=10)
-            st.plotly_chart(sankey_fig, use_container_width=True)
+        sankey_fig = sankey_figure(STORE_VERSION, selected_news_link, article_triples)
+        if sankey_fig is not None:
+            with span("render sankey"):
+                st.plotly_chart(sankey_fig, use_container_width=True)
         else:
             st.info("Not enough relationship data to generate a Sankey diagram.")
     else:
@@ -357,91 +492,125 @@ def similarity_analysis(selected_news_link, view_option, category_option, sim_da
     # Additional Visualization: Altair Scatter Plot using Top 30 Similarity Entries
     st.markdown("## Additional Visualization: Similarity vs. Category")
     if not filtered_df_scatter.empty:
-        alt_chart = alt.Chart(filtered_df_scatter).mark_circle(size=100).encode(
-            x=alt.X("content_similarity:Q", title="Content Similarity (%)"),
-            y=alt.Y("wikileaks_Category:N", title="Wikileaks Category"),
-            color="wikileaks_Category:N",
-            # Tooltip now includes news_Link so that each dot shows its news link
-            tooltip=["content_similarity", "wikileaks_Category", "news_Link"]
-        ).properties(
-            width=600,
-            height=300,
-            title="Scatter Plot of Similarity Score vs. Category (Top 30)"
-        )
-        st.altair_chart(alt_chart, use_container_width=True)
+        alt_chart = similarity_scatter(STORE_VERSION, view_option, selected_news_link,
+                                       category_option, filtered_df_scatter)
+        with span("render scatter"):
+            st.altair_chart(alt_chart, use_container_width=True)
     else:
         st.info("No data available for the scatter plot.")
 
+def rank_pasted_article(sim_data):
+    st.markdown("## Rank a New Article")
+    index = load_wikileaks_index()
+    methods = ["TF-IDF"] + (["Sentence-BERT"] if index is not None else [])
+    method = st.radio("Ranking method", methods, horizontal=True)
+    if index is None:
+        st.caption("Build the Wikileaks vector index with `python vector_index.py build` to rank with Sentence-BERT.")
+    article_text = st.text_area("Paste a news article to find its most similar Wikileaks documents")
+    if not article_text.strip():
+        return
+    if method == "Sentence-BERT":
+        model = load_sentence_model(index.model_name)
+        embedding = model.encode([article_text], convert_to_numpy=True, normalize_embeddings=True)
+        keys, scores = index.search(embedding, k=3)
+    else:
+        model, current = load_tfidf_model(data_store.build_version())
+        if model is None:
+            st.warning("No TF-IDF model has been built. Run `python tfidf_model.py build` to rank with TF-IDF.")
+            return
+        if not current:
+            st.caption("The TF-IDF model was fitted on an older Wikileaks corpus; "
+                       "run `python tfidf_model.py build` to refit it.")
+        keys, scores = model.query([article_text], k=3)
+    matches = [(doc_key, score) for doc_key, score in zip(keys[0], scores[0]) if score > 0]
+    if not matches:
+        st.info("No Wikileaks document shares any terms with this article.")
+        return
+    cols = st.columns(3)
+    for col, (doc_key, score) in zip(cols, matches):
+        with col:
+            st.markdown(f"### Similarity Score: {score * 100:.2f}%")
+            st.write(sim_data["key_to_text"].get(doc_key, f"Document not found for key: {doc_key}"))
+            st.markdown(f"**Category Match:** {sim_data['key_to_category'].get(doc_key, 'N/A')}")
+
 #############################################
 # TAB 2: Analysis Dashboard (Static Data + Category Analysis)
 #############################################
 
-def threat_analysis(selected_news_link, sim_data):
-    st.header("Analysis Dashboard")
-    
-    # ----- Existing Threat Analysis Visualizations -----
-    static_threat_data = {
-        "Country": [
-            "Denmark", "Portugal", "Hong Kong", "China", "Vietnam", "Singapore",
-            "Ukraine", "South Korea", "Japan", "North Korea", "India", "Pakistan",
-            "Canada", "SINGAPORE", "Afghanistan", "Indonesia", "US", "Philippines",
-            "Nigeria", "Norway", "Türkiye", "Kenya", "Uganda", "Ethiopia", "Somalia",
-            "Yemen", "Israel", "Italy", "Malaysia", "France", "Niger", "HONG KONG",
-            "Slovakia", "Australia", "New Zealand", "Ireland", "Iraq", "Germany",
-            "Hungary", "Papua New Guinea", "Taiwan", "Belarus"
-        ],
-        "High Threats": [
-            0, 1, 1, 24, 0, 3, 10, 4, 7, 12, 5, 1, 0, 1, 2, 1, 6, 1, 1, 1,
-            2, 0, 0, 1, 3, 1, 11, 0, 4, 6, 1, 1, 1, 3, 0, 1, 0, 1, 2, 0, 2, 1
-        ],
-        "Medium Threats": [
-            1, 0, 2, 8, 1, 2, 0, 0, 0, 0, 1, 0, 1, 1, 0, 0, 2, 0, 0, 1,
-            1, 2, 1, 0, 0, 1, 2, 1, 1, 0, 0, 0, 0, 2, 0, 0, 1, 0, 0, 1, 0, 0
-        ],
-        "Low Threats": [
-            0, 0, 0, 0, 0, 4, 2, 2, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0,
-            0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0
-        ]
-    }
-    threat_df = pd.DataFrame(static_threat_data)
-    threat_df["Total Threats"] = (threat_df["High Threats"] +
-                                  threat_df["Medium Threats"] +
-                                  threat_df["Low Threats"])
-    
-    threat_df = threat_df.sort_values("Total Threats", ascending=False).reset_index(drop=True)
-    
-    st.subheader("Threat Counts by Country")
-    st.dataframe(threat_df)
-    
-    bar_fig = px.bar(
+@counted_cache(st.cache_resource(show_spinner=False))
+def threat_figures(path: str, signature: tuple) -> dict:
+    """Plotly figures of both threat views, built once per version of the aggregate."""
+    px = lazy_import("plotly.express")
+    threat_tables = load_threat_tables(path, signature)
+    threat_df = threat_tables["threat_df"]
+    country_order = threat_tables["country_order"]
+    figures = {}
+    figures["levels"] = px.bar(
         threat_df,
         x="Country",
-        y=["High Threats", "Medium Threats", "Low Threats"],
+        y=THREAT_COLUMNS,
         barmode="group",
         title="Threat Levels by Country",
         labels={"value": "Count", "variable": "Threat Level"},
-        category_orders={"Country": threat_df["Country"].tolist()}
+        category_orders={"Country": country_order}
     )
-    st.plotly_chart(bar_fig, use_container_width=True)
-    
-    threat_df["Threat Score"] = (threat_df["High Threats"] * 3 +
-                                 threat_df["Medium Threats"] * 2 +
-                                 threat_df["Low Threats"] * 1)
-    scatter_fig = px.scatter(
+    figures["score"] = px.scatter(
         threat_df,
         x="Country",
         y="Threat Score",
         size="Threat Score",
         title="Overall Threat Score by Country",
         labels={"Threat Score": "Threat Score (High=3, Medium=2, Low=1)"},
-        category_orders={"Country": threat_df["Country"].tolist()}
+        category_orders={"Country": country_order}
     )
-    st.plotly_chart(scatter_fig, use_container_width=True)
+    figures["total"] = px.bar(threat_df, x="Country", y="Total Threats",
+                              title="Total Threats by Country",
+                              labels={"Total Threats": "Total Threat Count"})
+    figures["pie"] = px.pie(
+        threat_df,
+        names="Country",
+        values="Total Threats",
+        title="Threat Distribution by Country"
+    )
+    figures["pie"].update_traces(text=threat_df["display_text"], textposition='inside', textinfo='text')
+    return figures
+
+@counted_cache(st.cache_resource(show_spinner=False, max_entries=128))
+def category_figures(store_version: int, topic: str, sector: str, _similarity_df: pd.DataFrame):
+    """Topic and sector distribution bars of the fuzzy matching data, highlighting the selected article's."""
+    px = lazy_import("plotly.express")
+    figures = []
+    for column, label, selected in [("news_Category_x", "Topic", topic), ("news_Category_y", "Sector", sector)]:
+        dist = _similarity_df[column].value_counts().loc[lambda counts: counts > 0].reset_index()
+        dist.columns = [label, "Count"]
+        dist["Selected"] = dist[label] == selected
+        figures.append(px.bar(dist, x=label, y="Count",
+                              title=f"{label} Distribution",
+                              color="Selected",
+                              color_discrete_map={True: "red", False: "blue"}))
+    return figures
+
+def threat_analysis(selected_news_link, sim_data):
+    st.header("Analysis Dashboard")
+    
+    # ----- Existing Threat Analysis Visualizations -----
+    threat_tables = get_threat_tables()
+    if threat_tables is not None:
+        threat_df = threat_tables["threat_df"]
+        figures = threat_figures(THREAT_COUNTS_FILE, threat_tables["signature"])
+        
+        st.subheader("Threat Counts by Country")
+        st.caption(f"Computed from {threat_tables['rows']} excerpts at {threat_tables['generated_at']}.")
+        with span("render threat charts"):
+            st.dataframe(threat_df[["Country"] + THREAT_COLUMNS + ["Total Threats"]])
+            st.plotly_chart(figures["levels"], use_container_width=True)
+            st.plotly_chart(figures["score"], use_container_width=True)
     
     # ----- New Category Analysis Section -----
     st.markdown("## Category Analysis from Similarity Data")
     similarity_df = sim_data["fuzzy_df"]  # using fuzzy matching data; adjust if needed
-    selected_rows = similarity_df[similarity_df["news_Link"] == selected_news_link]
+    with span("filter"):
+        selected_rows = get_filtered_df(sim_data, FUZZY_METHOD, selected_news_link, ALL_CATEGORIES, 1)
     if not selected_rows.empty:
         selected_row = selected_rows.iloc[0]
         topic = selected_row.get("news_Category_x", "N/A")
@@ -452,25 +621,10 @@ def threat_analysis(selected_news_link, sim_data):
     st.write(f"- **Topic:** {topic}")
     st.write(f"- **Sector:** {sector}")
 
-    dist_topic = similarity_df["news_Category_x"].value_counts().reset_index()
-    dist_topic.columns = ["Topic", "Count"]
-    dist_topic["Selected"] = dist_topic["Topic"] == topic
-
-    fig_topic = px.bar(dist_topic, x="Topic", y="Count",
-                   title="Topic Distribution",
-                   color="Selected",
-                   color_discrete_map={True: "red", False: "blue"})
-    st.plotly_chart(fig_topic, use_container_width=True)
-
-    dist_sector = similarity_df["news_Category_y"].value_counts().reset_index()
-    dist_sector.columns = ["Sector", "Count"]
-    dist_sector["Selected"] = dist_sector["Sector"] == sector
-
-    fig_sector = px.bar(dist_sector, x="Sector", y="Count",
-                   title="Sector Distribution",
-                   color="Selected",
-                   color_discrete_map={True: "red", False: "blue"})
-    st.plotly_chart(fig_sector, use_container_width=True)
+    fig_topic, fig_sector = category_figures(STORE_VERSION, topic, sector, similarity_df)
+    with span("render category charts"):
+        st.plotly_chart(fig_topic, use_container_width=True)
+        st.plotly_chart(fig_sector, use_container_width=True)
 
 #############################################
 # TAB 3: Threat Heatmap & Global Visualizations
@@ -480,82 +634,92 @@ def geographical_heatmap():
     st.header("Threat Heatmap")
     st.markdown("This heatmap visualizes the total threat count by country using Folium.")
     
-    static_threat_data = {
-        "Country": [
-            "Denmark", "Portugal", "Hong Kong", "China", "Vietnam", "Singapore",
-            "Ukraine", "South Korea", "Japan", "North Korea", "India", "Pakistan",
-            "Canada", "SINGAPORE", "Afghanistan", "Indonesia", "US", "Philippines",
-            "Nigeria", "Norway", "Türkiye", "Kenya", "Uganda", "Ethiopia", "Somalia",
-            "Yemen", "Israel", "Italy", "Malaysia", "France", "Niger", "HONG KONG",
-            "Slovakia", "Australia", "AI", "New Zealand", "Ireland", "Iraq", "Germany",
-            "Hungary", "Papua New Guinea", "Taiwan", "Belarus"
-        ],
-        "High Threats": [
-            0, 1, 1, 24, 0, 3, 10, 4, 7, 12, 5, 1, 0, 1, 2, 1, 6, 1, 1, 1,
-            2, 0, 0, 1, 3, 1, 11, 0, 4, 6, 1, 1, 1, 3, 0, 0, 1, 0, 1, 2, 0, 2, 1
-        ],
-        "Medium Threats": [
-            1, 0, 2, 8, 1, 2, 0, 0, 0, 0, 1, 0, 1, 1, 0, 0, 2, 0, 0, 1,
-            1, 2, 1, 0, 0, 1, 2, 1, 1, 0, 0, 0, 0, 2, 0, 0, 0, 1, 0, 0, 1, 0, 0
-        ],
-        "Low Threats": [
-            0, 0, 0, 0, 0, 4, 2, 2, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0,
-            0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 3, 1, 0, 0, 0, 0, 0, 0, 0
-        ]
-    }
-    threat_df = pd.DataFrame(static_threat_data)
-    threat_df["Total Threats"] = threat_df["High Threats"] + threat_df["Medium Threats"] + threat_df["Low Threats"]
+    threat_tables = get_threat_tables()
+    if threat_tables is None:
+        return
+    figures = threat_figures(THREAT_COUNTS_FILE, threat_tables["signature"])
     
-    country_counts = threat_df.set_index("Country")["Total Threats"].to_dict()
-    
-    m = folium.Map(location=[20, 0], zoom_start=2)
-    heat_data = []
-    for country, count in country_counts.items():
-        lat_lon = get_cached_lat_lon(country)
-        if lat_lon and lat_lon[0] is not None and lat_lon[1] is not None:
-            heat_data.append([lat_lon[0], lat_lon[1], count])
-    if heat_data:
-        HeatMap(heat_data).add_to(m)
-    else:
+    if not threat_tables["heat_data"]:
         st.info("No valid latitude/longitude data found for heatmap.")
     
-    m.save('threats_map.html')
-    st.markdown("Map saved as 'threats_map.html'")
-    components.html(m._repr_html_(), height=500)
+    map_html = threat_heatmap_html(THREAT_COUNTS_FILE, threat_tables["signature"])
+    with span("render map"):
+        components.html(map_html, height=500)
     
     st.markdown("## Global Visualization: Total Threats by Country")
-    bar_fig = px.bar(threat_df, x="Country", y="Total Threats",
-                     title="Total Threats by Country",
-                     labels={"Total Threats": "Total Threat Count"})
-    st.plotly_chart(bar_fig, use_container_width=True)
+    with span("render total chart"):
+        st.plotly_chart(figures["total"], use_container_width=True)
     
     st.markdown("## Global Visualization: Threat Distribution (Pie Chart)")
-    total = threat_df["Total Threats"].sum()
-    threat_df["percent"] = threat_df["Total Threats"] / total * 100
-    threat_df["display_text"] = threat_df["percent"].apply(lambda x: f"{x:.1f}%" if x >= 2 else "")
-    
-    pie_fig = px.pie(
-        threat_df,
-        names="Country",
-        values="Total Threats",
-        title="Threat Distribution by Country"
-    )
-    pie_fig.update_traces(text=threat_df["display_text"], textposition='inside', textinfo='text')
-    
-    st.plotly_chart(pie_fig, use_container_width=True)
+    with span("render pie chart"):
+        st.plotly_chart(figures["pie"], use_container_width=True)
 
 #############################################
-# MAIN APP: Multi-Tab Layout
+# MAIN APP: Multi-View Layout
 #############################################
 
+def search_wikileaks(sim_data):
+    st.markdown("## Search Wikileaks Documents")
+    wikileaks_search = sim_data["wikileaks_search"]
+    cols = st.columns([4, 1])
+    query = cols[0].text_input("Search the Wikileaks documents", key="wikileaks_query")
+    page = cols[1].number_input("Page", min_value=1, value=1, step=1, key="wikileaks_page")
+    if not query.strip():
+        return
+    with span("search"):
+        hits = wikileaks_search.search(query, page)
+    if not hits["total"]:
+        st.info("No Wikileaks documents match this search.")
+        return
+    st.caption(f"{hits['total']} documents (page {hits['page']} of {hits['pages']})")
+    for doc_key, score in zip(hits["keys"], hits["scores"]):
+        st.markdown(f"**{sim_data['key_to_category'].get(doc_key, 'N/A')}** · score {score:.2f}")
+        st.write(wikileaks_search.snippet(doc_key, query, width=300))
+
+def similarity_view():
+    similarity_analysis(selected_news_link, view_option, category_option, sim_data)
+    rank_pasted_article(sim_data)
+    search_wikileaks(sim_data)
+
+# Only the active view runs; unlike st.tabs, the other views' data prep and charts are skipped.
+VIEWS = {
+    "Wikileaks Similarity Analysis": similarity_view,
+    "Analysis Dashboard": lambda: threat_analysis(selected_news_link, sim_data),
+    "Threat Heatmap": geographical_heatmap,
+}
+
 st.title("Combined Analysis Dashboard")
-tabs = st.tabs(["Wikileaks Similarity Analysis", "Analysis Dashboard", "Threat Heatmap"])
+active_view = st.radio("View", list(VIEWS), horizontal=True, key="active_view", label_visibility="collapsed")
+TRACE.view = active_view
+with span(f"view: {active_view}"), timed("view", active_view):
+    VIEWS[active_view]()
 
-with tabs[0]:
-    similarity_analysis(selected_news_link, view_option, category_option, sim_data)
+#############################################
+# Startup Profile (STARTUP_PROFILE=1)
+#############################################
 
-with tabs[1]:
-    threat_analysis(selected_news_link, sim_data)
+startup_profile.PROFILE.record("run", "first script run", time.perf_counter() - RUN_START)
+if startup_profile.ENABLED:
+    with st.sidebar.expander("Startup profile"):
+        st.caption("First import of each module and first (uncached) run of each loader in this process.")
+        st.dataframe(pd.DataFrame(startup_profile.PROFILE.report()), hide_index=True)
+
+#############################################
+# Debug Panel (DEBUG_PANEL=1 or ?debug=1)
+#############################################
 
-with tabs[2]:
-    geographical_heatmap()
+# Every rerun is logged to instrumentation.LOG_FILE when it is set; the panel shows the same timings.
+rerun = instrumentation.write_log(TRACE)
+history = st.session_state.setdefault("debug_history", [])
+history.append({"time": rerun["time"], "view": rerun["view"], "total_ms": rerun["total_ms"]})
+del history[:-instrumentation.HISTORY_SIZE]
+if instrumentation.DEBUG_PANEL or st.query_params.get("debug") == "1":
+    with st.sidebar.expander("Debug: rerun timings"):
+        st.caption(f"This rerun: {rerun['total_ms']:.0f} ms (view: {rerun['view']}).")
+        spans = pd.DataFrame(rerun["spans"])
+        spans["name"] = ["\u2003" * depth + name for depth, name in zip(spans["depth"], spans["name"])]
+        st.dataframe(spans.drop(columns="depth"), hide_index=True)
+        st.markdown("**Cache hits / misses since process start**")
+        st.dataframe(pd.DataFrame.from_dict(instrumentation.cache_totals(), orient="index"))
+        st.markdown("**Recent reruns in this session**")
+        st.dataframe(pd.DataFrame(history[::-1]), hide_index=True)
@@ -0,0 +1,232 @@
+import argparse
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from cooccurrence import DEFAULT_TOP_N, article_cooccurrence
+from graph_store import GRAPH_DIR, GraphStore, news_doc, sync_graph
+
+#############################################
+# Settings
+#############################################
+
+# Pre-rendered artifacts live under one sub-directory per data store build, so a rebuilt
+# store never serves stale images: data/artifacts/v<build version>/<kind>/<hash of news_Link>.<ext>
+# Appends (ingest.py) keep the build version, as they do not change existing articles.
+ARTIFACT_DIR = "./data/artifacts"
+MAX_ITEMS = 512
+MAX_BYTES = 256 * 1024 * 1024
+
+WORDCLOUD = "wordcloud"
+ENTITY_GRAPH = "entity_graph"
+COOCCURRENCE = "cooccurrence"
+ARTIFACT_EXTENSIONS = {WORDCLOUD: "png", ENTITY_GRAPH: "html", COOCCURRENCE: "png"}
+
+def link_hash(news_link: str) -> str:
+    return hashlib.sha1(str(news_link).encode("utf-8")).hexdigest()
+
+def _read_artifact(path: str):
+    if path.endswith(".png"):
+        with open(path, "rb") as f:
+            return f.read()
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+#############################################
+# LRU Artifact Cache
+#############################################
+
+class ArtifactCache:
+    """
+    Thread-safe LRU cache of rendered artifacts (PNG bytes or HTML strings) keyed by
+    (visualization type, news_Link), capped by both item count and total size in bytes.
+    Misses fall back to the pre-rendered files written by the CLI before rendering.
+    Artifacts are returned as values, never through shared files, so concurrent sessions
+    cannot overwrite each other's output.
+    """
+
+    def __init__(self, max_items: int = MAX_ITEMS, max_bytes: int = MAX_BYTES, disk_dir: str = None):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.items = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.items)
+
+    def disk_path(self, kind: str, news_link: str) -> str:
+        return os.path.join(self.disk_dir, kind, f"{link_hash(news_link)}.{ARTIFACT_EXTENSIONS[kind]}")
+
+    def get(self, kind: str, news_link: str):
+        key = (kind, news_link)
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return self.items[key]
+            self.misses += 1
+        if self.disk_dir is not None:
+            path = self.disk_path(kind, news_link)
+            if os.path.exists(path):
+                value = _read_artifact(path)
+                self.put(kind, news_link, value)
+                return value
+        return None
+
+    def put(self, kind: str, news_link: str, value):
+        key = (kind, news_link)
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.items:
+                self.size -= len(self.items.pop(key))
+            self.items[key] = value
+            self.size += size
+            while len(self.items) > self.max_items or self.size > self.max_bytes:
+                _, evicted = self.items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def get_or_render(self, kind: str, news_link: str, render, *args):
+        """Returns the cached artifact, rendering it with render(*args) on a miss."""
+        value = self.get(kind, news_link)
+        if value is None:
+            value = render(*args)
+            if value is not None:
+                self.put(kind, news_link, value)
+        return value
+
+    def stats(self) -> dict:
+        return {"items": len(self.items), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+#############################################
+# Renderers
+#############################################
+# Renderers use the object-oriented Matplotlib API (no pyplot state), so sessions rendering
+# at the same time do not draw into each other's figures.
+
+def _figure_png(fig) -> bytes:
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    return buffer.getvalue()
+
+def render_wordcloud(text: str):
+    """Word cloud of the article text as PNG bytes (None if there is no text)."""
+    from matplotlib.figure import Figure
+    from wordcloud import WordCloud
+
+    if not text:
+        return None
+    wordcloud = WordCloud(width=800, height=400, background_color='white').generate(text)
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots()
+    ax.imshow(wordcloud, interpolation='bilinear')
+    ax.axis("off")
+    return _figure_png(fig)
+
+def build_entity_relationship_graph(triples: list):
+    """Entity -> relation -> entity graph from graph store (subject, relation, object, key) triples."""
+    import networkx as nx
+
+    G = nx.Graph()
+    for subject, relation, obj, key in triples:
+        G.add_node(subject, label=subject, type="entity")
+        G.add_node(obj, label=obj, type="entity")
+        rel_node_id = f"rel_{key}"
+        G.add_node(rel_node_id, label=relation, shape="box", type="relation")
+        G.add_edge(subject, rel_node_id)
+        G.add_edge(rel_node_id, obj)
+    return G
+
+def render_entity_graph(triples: list) -> str:
+    """Pyvis entity-relationship graph as an HTML string, generated in memory."""
+    from pyvis.network import Network
+
+    net = Network(height="500px", width="100%", notebook=False)
+    net.from_nx(build_entity_relationship_graph(triples))
+    net.repulsion(node_distance=200, central_gravity=0.3)
+    return net.generate_html(notebook=False)
+
+def render_cooccurrence(news_entities: list, top_n: int = DEFAULT_TOP_N):
+    """Entity co-occurrence heatmap of the top_n most frequent entities as PNG bytes (None if there are none)."""
+    import seaborn as sns
+    from matplotlib.figure import Figure
+
+    if not news_entities:
+        return None
+    co_occurrence = article_cooccurrence(news_entities, top_n=top_n)
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots()
+    sns.heatmap(co_occurrence, annot=True, cmap="YlGnBu", fmt="d", ax=ax)
+    return _figure_png(fig)
+
+#############################################
+# Offline Prerender
+#############################################
+
+def version_dir(store_version: int, artifact_dir: str = ARTIFACT_DIR) -> str:
+    return os.path.join(artifact_dir, f"v{store_version}")
+
+def _write_atomic(path: str, value):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    if isinstance(value, bytes):
+        with open(temp_path, "wb") as f:
+            f.write(value)
+    else:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(value)
+    os.replace(temp_path, path)
+
+def prerender_all(artifact_dir: str = ARTIFACT_DIR, kinds: list = None, overwrite: bool = False) -> dict:
+    """
+    Renders every artifact type for every news article in the store into the directory for the
+    current store build. Existing files are skipped unless overwrite=True.
+    Returns the number of artifacts written per type.
+    """
+    from data_store import build_version, load_table, to_tuples
+
+    kinds = kinds or list(ARTIFACT_EXTENSIONS)
+    cache = ArtifactCache(disk_dir=version_dir(build_version(), artifact_dir))
+    graph = sync_graph(GraphStore.load(GRAPH_DIR))
+    # The app shows the first row for a link, so duplicates are rendered once.
+    news_df = load_table("news", columns=["Link", "Text", "entities"]).drop_duplicates(subset="Link")
+    written = dict.fromkeys(kinds, 0)
+    for link, text, entities in zip(news_df["Link"], news_df["Text"], news_df["entities"]):
+        renderers = {
+            WORDCLOUD: lambda: render_wordcloud(text),
+            ENTITY_GRAPH: lambda: render_entity_graph(graph.triples(graph.doc_edges(news_doc(link)))),
+            COOCCURRENCE: lambda: render_cooccurrence(to_tuples(entities)),
+        }
+        for kind in kinds:
+            path = cache.disk_path(kind, link)
+            if not overwrite and os.path.exists(path):
+                continue
+            value = renderers[kind]()
+            if value is not None:
+                _write_atomic(path, value)
+                written[kind] += 1
+    return written
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-render per-article visualizations for the dashboard.")
+    parser.add_argument("--artifact-dir", default=ARTIFACT_DIR)
+    parser.add_argument("--kind", action="append", choices=sorted(ARTIFACT_EXTENSIONS),
+                        help="Artifact type to render (repeatable; default: all).")
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    written = prerender_all(args.artifact_dir, args.kind, args.overwrite)
+    print(f"Wrote {written} to {args.artifact_dir} in {time.perf_counter() - start:.1f}s")
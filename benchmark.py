@@ -0,0 +1,395 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import citations
+import cooccurrence
+import data_store
+import search_index
+import test as threat_counts
+import text_matching
+import tfidf_model
+import threat_scanner
+import vector_index
+from gazetteer import load_gazetteer
+from graph_store import GraphStore, news_doc, wikileaks_doc
+from similarity_index import ALL_CATEGORIES, SIMILARITY_COLUMNS, get_filtered_df, prepare_similarity_data
+
+#############################################
+# Settings
+#############################################
+
+RESULTS_DIR = "./data/benchmarks"
+SCALES = [1, 10, 100]
+
+# Size of the current corpus (scale 1): news excerpts, Wikileaks documents and the number of
+# Wikileaks matches kept per news link in the fuzzy and BERT results.
+BASE_NEWS = 1506
+BASE_WIKILEAKS = 143
+PAIRS_PER_NEWS = text_matching.DEFAULT_TOP_K
+NEWS_WORDS = 120
+WIKILEAKS_WORDS = 170
+EMBEDDING_DIM = 384
+LOOKUPS = 1000  # per-article filter calls timed per run
+
+NEWS_TOPICS = ["corruption", "fraud", "terrorism", "cybercrime", "labor and human rights",
+               "environment", "trafficking", "money laundering", "politics"]
+NEWS_SECTORS = ["Allegation", "Investigative Details", "Background Information", "Charges",
+                "Sentencing", "Criminal Violations"]
+WIKILEAKS_CATEGORIES = ["Allegation", "Investigative Details", "Background Information",
+                        "Criminal Violations", "Charges"]
+FILLER_WORDS = (
+    "the of and to in a for on that with was by said report official government company court "
+    "police investigation minister contract payment bank money public office agency million "
+    "state tender audit staff project security case evidence statement board law"
+).split()
+VERBS = ["said", "accused", "paid", "signed", "found", "arrested", "charged", "reported", "approved", "denied"]
+
+#############################################
+# Synthetic Corpus
+#############################################
+
+def _texts(rng, count: int, mean_words: int, vocabulary: np.ndarray, weights: np.ndarray) -> list:
+    lengths = np.maximum(rng.poisson(mean_words, count), 10)
+    words = vocabulary[rng.choice(len(vocabulary), size=int(lengths.sum()), p=weights)]
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    return [" ".join(words[bounds[i]:bounds[i + 1]]) + "." for i in range(count)]
+
+def _entities(rng, count: int, countries: np.ndarray, names: np.ndarray, per_doc: int = 8) -> list:
+    documents = []
+    for n in rng.poisson(per_doc, count):
+        gpe = [(str(c), "GPE") for c in rng.choice(countries, size=max(1, n // 3))]
+        other = [(str(p), label) for p, label in zip(rng.choice(names, size=n), rng.choice(["PERSON", "ORG"], size=n))]
+        documents.append(gpe + other)
+    return documents
+
+def _relationships(rng, entities: list) -> list:
+    documents = []
+    for doc_entities in entities:
+        names = [name for name, _ in doc_entities]
+        relationships = []
+        for index in range(len(names) // 2):
+            subject, obj = rng.choice(names, size=2)
+            verb = str(rng.choice(VERBS))
+            relationships += [(str(subject), verb, index), (str(obj), verb, index)]
+        documents.append(relationships)
+    return documents
+
+def synthetic_corpus(scale: float = 1, seed: int = 0) -> dict:
+    """
+    News, Wikileaks and fuzzy/BERT similarity tables shaped like the real ones, at `scale`
+    times the current corpus size. Texts mix filler words with threat keywords and country
+    names at realistic rates, so the scanners and the gazetteer see matches.
+    """
+    rng = np.random.default_rng(seed)
+    n_news = max(1, int(BASE_NEWS * scale))
+    n_wikileaks = max(1, int(BASE_WIKILEAKS * scale))
+    countries = load_gazetteer()[0]["country"].to_numpy()
+    keywords = np.array([word for words in threat_scanner.THREAT_KEYWORDS.values() for word in words])
+    vocabulary = np.concatenate([FILLER_WORDS, keywords, countries[:40]])
+    weights = np.concatenate([
+        np.full(len(FILLER_WORDS), 0.94 / len(FILLER_WORDS)),
+        np.full(len(keywords), 0.02 / len(keywords)),
+        np.full(40, 0.04 / 40),
+    ])
+    names = np.array([f"Entity {i}" for i in range(int(2000 * np.sqrt(scale)))])
+
+    news_entities = _entities(rng, n_news, countries, names)
+    news = pd.DataFrame({
+        "Link": [f"https://news.example/{i:08d}" for i in range(n_news)],
+        "Text": _texts(rng, n_news, NEWS_WORDS, vocabulary, weights),
+        "entities": news_entities,
+        "relationships": _relationships(rng, news_entities),
+        "Category_x": rng.choice(NEWS_TOPICS, n_news),
+        "Category_y": rng.choice(NEWS_SECTORS, n_news),
+    })
+    wikileaks_entities = _entities(rng, n_wikileaks, countries, names, per_doc=12)
+    wikileaks = pd.DataFrame({
+        "PDF Path": [f"{i // 3 + 1}.pdf" for i in range(n_wikileaks)],
+        "Text": _texts(rng, n_wikileaks, WIKILEAKS_WORDS, vocabulary, weights),
+        "entities": wikileaks_entities,
+        "relationships": _relationships(rng, wikileaks_entities),
+        "Category": rng.choice(WIKILEAKS_CATEGORIES, n_wikileaks),
+        "key": np.arange(1, n_wikileaks + 1),
+    })
+
+    k = min(PAIRS_PER_NEWS, n_wikileaks)
+    news_pos = np.repeat(np.arange(n_news), k)
+    wiki_pos = np.concatenate([rng.choice(n_wikileaks, size=k, replace=False) for _ in range(n_news)])
+    pairs = pd.DataFrame({
+        "news_Link": news["Link"].to_numpy()[news_pos],
+        "news_entities": [news_entities[i] for i in news_pos],
+        "news_relationships": [news["relationships"].iat[i] for i in news_pos],
+        "news_Category_x": news["Category_x"].to_numpy()[news_pos],
+        "news_Category_y": news["Category_y"].to_numpy()[news_pos],
+        "wikileaks_Category": wikileaks["Category"].to_numpy()[wiki_pos],
+    })
+    fuzzy = pairs.assign(wikileaks_Text=wikileaks["Text"].to_numpy()[wiki_pos],
+                         content_similarity=rng.integers(0, 100, len(pairs)))
+    bert = pairs.assign(wikileaks_Text=wikileaks["key"].to_numpy()[wiki_pos],
+                        content_similarity=rng.random(len(pairs)) * 100)
+    return {"scale": scale, "news": news, "wikileaks": wikileaks, "fuzzy": fuzzy, "bert": bert}
+
+#############################################
+# Benchmark Cases
+#############################################
+# Each case takes the corpus and a scratch directory, does its untimed setup and returns
+# (callable to time, number of items it processes).
+
+def case_store_build(corpus: dict, scratch: str):
+    sources = {}
+    for name in ["fuzzy", "bert", "news", "wikileaks"]:
+        sources[name] = [os.path.join(scratch, f"{name}.pkl")]
+        corpus[name].to_pickle(sources[name][0])
+    store_dir = os.path.join(scratch, "store")
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            data_store.build_store(store_dir, sources)
+    return run, sum(len(corpus[n]) for n in sources)
+
+def case_store_load(corpus: dict, scratch: str):
+    store_dir = os.path.join(scratch, "store")
+    if not data_store.has_table("fuzzy", store_dir):
+        case_store_build(corpus, scratch)[0]()
+
+    def run():
+        data_store.load_table("fuzzy", SIMILARITY_COLUMNS, store_dir=store_dir)
+        data_store.load_table("bert", SIMILARITY_COLUMNS, store_dir=store_dir)
+        data_store.load_table("news", ["Link", "Text"], store_dir=store_dir)
+        data_store.load_table("wikileaks", ["key", "Text", "Category", "entities"], store_dir=store_dir)
+    return run, len(corpus["fuzzy"]) + len(corpus["bert"])
+
+def _similarity_inputs(corpus: dict):
+    return (corpus["fuzzy"][SIMILARITY_COLUMNS], corpus["bert"][SIMILARITY_COLUMNS],
+            corpus["news"][["Link", "Text"]], corpus["wikileaks"][["key", "Text", "Category", "entities"]])
+
+def case_prepare_similarity(corpus: dict, scratch: str):
+    inputs = _similarity_inputs(corpus)
+    return lambda: prepare_similarity_data(*inputs), len(corpus["fuzzy"]) + len(corpus["bert"])
+
+def case_filter_article(corpus: dict, scratch: str):
+    sim_data = prepare_similarity_data(*_similarity_inputs(corpus))
+    rng = np.random.default_rng(1)
+    links = rng.choice(corpus["news"]["Link"].to_numpy(), LOOKUPS)
+    categories = rng.choice([ALL_CATEGORIES] + WIKILEAKS_CATEGORIES, LOOKUPS)
+    methods = rng.choice(list(sim_data["sorted_frames"]), LOOKUPS)
+
+    def run():
+        for method, link, category in zip(methods, links, categories):
+            get_filtered_df(sim_data, method, link, category, 3)
+            get_filtered_df(sim_data, method, link, category, 30)
+    return run, LOOKUPS
+
+def case_threat_scan(corpus: dict, scratch: str):
+    texts = corpus["news"]["Text"]
+    threat_scanner.default_scanner()
+    return lambda: threat_scanner.scan_series(texts), len(texts)
+
+def case_threat_counts(corpus: dict, scratch: str):
+    news = corpus["news"][["Text", "entities"]]
+    return lambda: threat_counts.count_threats(news), len(news)
+
+def case_cooccurrence_article(corpus: dict, scratch: str):
+    entity_lists = corpus["news"]["entities"].head(LOOKUPS).tolist()
+
+    def run():
+        for entities in entity_lists:
+            cooccurrence.article_cooccurrence(entities, top_n=cooccurrence.DEFAULT_TOP_N)
+    return run, len(entity_lists)
+
+def case_cooccurrence_corpus(corpus: dict, scratch: str):
+    entity_lists = corpus["news"]["entities"]
+    return lambda: cooccurrence.corpus_cooccurrence(entity_lists, top_n=cooccurrence.DEFAULT_TOP_N), len(entity_lists)
+
+def case_fuzzy_match(corpus: dict, scratch: str):
+    news, wikileaks = corpus["news"], corpus["wikileaks"]
+    return lambda: text_matching.match_corpora(news, wikileaks), len(news)
+
+def case_tfidf_match(corpus: dict, scratch: str):
+    wikileaks, news = corpus["wikileaks"], corpus["news"]
+
+    def run():
+        model = tfidf_model.TfidfModel.fit(wikileaks["Text"], wikileaks["key"])
+        tfidf_model.match_news(model, news, k=5)
+    return run, len(news)
+
+def case_sbert_search(corpus: dict, scratch: str):
+    # Random unit vectors stand in for Sentence-BERT embeddings: this times the index search,
+    # not the model.
+    rng = np.random.default_rng(2)
+    documents = rng.standard_normal((len(corpus["wikileaks"]), EMBEDDING_DIM)).astype(np.float32)
+    queries = rng.standard_normal((len(corpus["news"]), EMBEDDING_DIM)).astype(np.float32)
+    index = vector_index.FlatIndex(documents, corpus["wikileaks"]["key"].to_numpy())
+    return lambda: index.search(queries, k=5), len(queries)
+
+def case_citations(corpus: dict, scratch: str):
+    wikileaks, news = corpus["wikileaks"], corpus["news"]
+    return lambda: citations.cite(wikileaks, news, threshold=0.2), len(wikileaks) * len(news)
+
+def case_text_search(corpus: dict, scratch: str):
+    index = search_index.SearchIndex(corpus["news"]["Text"], corpus["news"]["Link"])
+    queries = ["money laundering", "police invest", "contract tender audit", "minister"]
+    return lambda: [index.search(query) for query in queries], len(queries)
+
+def case_graph_build(corpus: dict, scratch: str):
+    documents = (
+        [(news_doc(link), rels) for link, rels in zip(corpus["news"]["Link"], corpus["news"]["relationships"])]
+        + [(wikileaks_doc(key), rels) for key, rels in zip(corpus["wikileaks"]["key"], corpus["wikileaks"]["relationships"])]
+    )
+
+    def run():
+        graph = GraphStore()
+        graph.append(documents)
+        graph.adjacency()
+    return run, len(documents)
+
+CASES = {
+    "store_build": case_store_build,
+    "store_load": case_store_load,
+    "prepare_similarity": case_prepare_similarity,
+    "filter_article": case_filter_article,
+    "threat_scan": case_threat_scan,
+    "threat_counts": case_threat_counts,
+    "cooccurrence_article": case_cooccurrence_article,
+    "cooccurrence_corpus": case_cooccurrence_corpus,
+    "fuzzy_match": case_fuzzy_match,
+    "tfidf_match": case_tfidf_match,
+    "sbert_search": case_sbert_search,
+    "citations": case_citations,
+    "text_search": case_text_search,
+    "graph_build": case_graph_build,
+}
+
+#############################################
+# Runner
+#############################################
+
+def max_rss_bytes() -> int:
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+def measure(run, repeat: int = 3) -> dict:
+    """
+    Wall time of `repeat` runs (median and min), then one more run under tracemalloc for the
+    peak Python/NumPy heap; timing runs are not traced, so tracing overhead does not skew them.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": statistics.median(times), "min_seconds": min(times), "runs": repeat,
+            "peak_traced_bytes": peak, "max_rss_bytes": max_rss_bytes()}
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+def run_benchmarks(scales: list = None, cases: list = None, repeat: int = 3, seed: int = 0) -> dict:
+    """Runs every case at every scale on a fresh synthetic corpus; returns the JSON-ready results."""
+    scales = scales or SCALES
+    cases = cases or list(CASES)
+    results = []
+    for scale in scales:
+        start = time.perf_counter()
+        corpus = synthetic_corpus(scale, seed)
+        print(f"Scale {scale}x: {len(corpus['news'])} news, {len(corpus['wikileaks'])} Wikileaks, "
+              f"{len(corpus['fuzzy'])} pairs per method (generated in {time.perf_counter() - start:.1f}s)")
+        with tempfile.TemporaryDirectory() as scratch:
+            for name in cases:
+                run, items = CASES[name](corpus, scratch)
+                result = {"case": name, "scale": scale, "items": items, **measure(run, repeat)}
+                result["items_per_second"] = items / result["seconds"] if result["seconds"] else None
+                results.append(result)
+                print(f"  {name:<22} {result['seconds'] * 1000:10.1f} ms  "
+                      f"peak {result['peak_traced_bytes'] / 2**20:8.1f} MiB")
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "settings": {"scales": scales, "repeat": repeat, "seed": seed},
+        "results": results,
+    }
+
+def write_results(report: dict, path: str = None) -> str:
+    path = path or os.path.join(RESULTS_DIR, f"benchmark-{report['generated_at'].replace(':', '')}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+def compare(baseline_path: str, current_path: str) -> pd.DataFrame:
+    """Per (case, scale): baseline vs current median seconds and traced peak, with ratios (current / baseline)."""
+    frames = []
+    for path in [baseline_path, current_path]:
+        with open(path, "r", encoding="utf-8") as f:
+            frames.append(pd.DataFrame(json.load(f)["results"]).set_index(["case", "scale"]))
+    baseline, current = frames
+    table = pd.DataFrame({
+        "baseline_s": baseline["seconds"],
+        "current_s": current["seconds"],
+        "baseline_peak_mib": baseline["peak_traced_bytes"] / 2**20,
+        "current_peak_mib": current["peak_traced_bytes"] / 2**20,
+    }).dropna()
+    table["time_ratio"] = table["current_s"] / table["baseline_s"]
+    table["peak_ratio"] = table["current_peak_mib"] / table["baseline_peak_mib"]
+    return table.round(4)
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks of the pipeline and dashboard hot paths on synthetic data.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run")
+    run_parser.add_argument("--scales", type=float, nargs="+", default=SCALES,
+                            help="Corpus sizes as multiples of the current data (default: 1 10 100).")
+    run_parser.add_argument("--case", action="append", choices=list(CASES), help="Case to run (repeatable; default: all).")
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--output", default=None, help=f"JSON file (default: {RESULTS_DIR}/benchmark-<time>.json).")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two result files.")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        scales = [int(s) if float(s).is_integer() else s for s in args.scales]
+        report = run_benchmarks(scales, args.case, args.repeat, args.seed)
+        print(f"Results written to {write_results(report, args.output)}")
+    else:
+        print(compare(args.baseline, args.current).to_string())
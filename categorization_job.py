@@ -0,0 +1,231 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+#############################################
+# Settings
+#############################################
+
+MODEL_NAME = "facebook/bart-large-mnli"
+CANDIDATE_LABELS = ['Allegation', 'Investigative Details', 'Background Information', 'Charges', 'Sentencing', 'Criminal Violations']
+BATCH_SIZE = 16
+REPORT_EVERY = 30  # seconds between throughput reports
+
+def text_hash(text: str, model_name: str = MODEL_NAME, labels: list = CANDIDATE_LABELS) -> str:
+    """Checkpoint key: hash of the model, the candidate labels and the text."""
+    payload = "\0".join([model_name, "|".join(labels), text])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+#############################################
+# Classifier (one per worker)
+#############################################
+
+_worker = threading.local()
+
+def make_classifier(model_name: str = MODEL_NAME, torch_threads: int = None, device=None):
+    """
+    Loads the zero-shot pipeline (on `device` if given, else transformers' default).
+    transformers/torch are imported lazily, as they are heavy.
+    """
+    from transformers import pipeline
+
+    if torch_threads:
+        import torch
+        torch.set_num_threads(torch_threads)
+    options = {} if device is None else {"device": device}
+    return pipeline('zero-shot-classification', model=model_name, **options)
+
+def _init_worker(model_name: str, torch_threads: int, device):
+    _worker.settings = (model_name, torch_threads, device)
+
+def _classify_batch(texts: list, labels: list, batch_size: int) -> list:
+    """Classifies one length bucket in a worker; returns one {label: score} dict per text."""
+    if getattr(_worker, "classifier", None) is None:
+        _worker.classifier = make_classifier(*_worker.settings)
+    results = _worker.classifier(texts, labels, batch_size=batch_size)
+    if isinstance(results, dict):
+        results = [results]
+    return [dict(zip(result["labels"], result["scores"])) for result in results]
+
+#############################################
+# Checkpoint Log
+#############################################
+
+def read_checkpoint(path: str) -> dict:
+    """
+    Reads the append-only checkpoint log ({hash: {"label", "scores"}}). A line left half-written
+    by an interrupted run is ignored, so that text is simply classified again.
+    """
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done[record["hash"]] = record
+    return done
+
+def open_checkpoint(path: str):
+    """
+    Opens the checkpoint log for appending. A half-written last line left by an interrupted run
+    (no trailing newline) is truncated first, so the next record does not join onto it.
+    """
+    f = open(path, "a+b")
+    size = f.seek(0, os.SEEK_END)
+    if size:
+        # Scan back from the end for the last complete line.
+        end = size
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end < size:
+            f.truncate(end)
+    f.close()
+    return open(path, "a", encoding="utf-8")
+
+def append_checkpoint(f, records: list):
+    f.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+    f.flush()
+    os.fsync(f.fileno())
+
+#############################################
+# Job
+#############################################
+
+def length_buckets(items: list, batch_size: int) -> list:
+    """Sorts (hash, text) items by text length and cuts them into batches of similar length."""
+    ordered = sorted(items, key=lambda item: len(item[1]))
+    return [ordered[start:start + batch_size] for start in range(0, len(ordered), batch_size)]
+
+def categorize(texts, checkpoint_path: str, model_name: str = MODEL_NAME, labels: list = None,
+               batch_size: int = BATCH_SIZE, workers: int = 1, executor: str = "thread", device=None) -> pd.DataFrame:
+    """
+    Zero-shot classifies `texts`, skipping every text whose hash is already in the checkpoint log.
+    Pending texts are de-duplicated, bucketed by length and classified by a pool of `workers`
+    (threads or processes, each with its own pipeline); every finished bucket is appended to the
+    log before the next is merged. Returns a frame aligned with `texts` with the top Category
+    and its score.
+    """
+    labels = labels or CANDIDATE_LABELS
+    texts = pd.Series(texts).fillna("").astype(str)
+    hashes = [text_hash(text, model_name, labels) for text in texts]
+    done = read_checkpoint(checkpoint_path)
+    pending = {h: t for h, t in zip(hashes, texts) if h not in done and t.strip()}
+    print(f"{len(texts)} rows: {len(texts) - len(pending)} already done, duplicate or empty; {len(pending)} to classify")
+
+    if pending:
+        buckets = length_buckets(list(pending.items()), batch_size)
+        cpu_count = os.cpu_count() or 1
+        pool_class = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+        torch_threads = max(1, cpu_count // workers) if executor == "process" else None
+        start = last_report = time.perf_counter()
+        finished = 0
+        with open_checkpoint(checkpoint_path) as log, \
+                pool_class(max_workers=workers, initializer=_init_worker,
+                           initargs=(model_name, torch_threads, device)) as pool:
+            remaining = iter(buckets)
+            in_flight = {}
+            while True:
+                # Keep two buckets per worker queued, so memory does not grow with the input.
+                for bucket in remaining:
+                    future = pool.submit(_classify_batch, [text for _, text in bucket], labels, batch_size)
+                    in_flight[future] = bucket
+                    if len(in_flight) >= 2 * workers:
+                        break
+                if not in_flight:
+                    break
+                completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    bucket = in_flight.pop(future)
+                    records = [
+                        {"hash": h, "label": max(scores, key=scores.get), "scores": scores}
+                        for (h, _), scores in zip(bucket, future.result())
+                    ]
+                    append_checkpoint(log, records)
+                    done.update((record["hash"], record) for record in records)
+                    finished += len(records)
+                now = time.perf_counter()
+                if now - last_report >= REPORT_EVERY:
+                    print(f"{finished}/{len(pending)} classified, {finished / (now - start):.2f} rows/sec")
+                    last_report = now
+        elapsed = time.perf_counter() - start
+        print(f"Classified {finished} texts in {elapsed:.1f}s ({finished / elapsed:.2f} rows/sec)")
+
+    records = [done.get(h) for h in hashes]
+    return pd.DataFrame({
+        "Category": [record["label"] if record else None for record in records],
+        "Category_score": [record["scores"][record["label"]] if record else None for record in records],
+    }, index=texts.index)
+
+#############################################
+# File Input/Output
+#############################################
+
+def read_input(path: str) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    return pd.read_excel(path)
+
+def write_output(df: pd.DataFrame, path: str):
+    """Writes the categorised rows once, at the end (temporary file, then rename)."""
+    root, ext = os.path.splitext(path)
+    temp_path = f"{root}.tmp{ext}"
+    if ext == ".parquet":
+        df.to_parquet(temp_path, index=False)
+    elif ext == ".csv":
+        df.to_csv(temp_path, index=False)
+    else:
+        df.to_excel(temp_path, index=False)
+    os.replace(temp_path, path)
+
+def categorize_file(input_path: str, output_path: str, text_column: str = "Text", category_column: str = "Category",
+                    checkpoint_path: str = None, **options) -> pd.DataFrame:
+    """
+    Categorises the text column of an Excel/CSV/Parquet file and writes it with a category column.
+    The checkpoint log defaults to `<output>.checkpoint.jsonl`; re-running resumes from it.
+    """
+    checkpoint_path = checkpoint_path or f"{output_path}.checkpoint.jsonl"
+    data = read_input(input_path)
+    result = categorize(data[text_column], checkpoint_path, **options)
+    data[category_column] = result["Category"].values
+    write_output(data, output_path)
+    print(f"Categorization complete and saved to '{output_path}'")
+    return data
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batched, resumable zero-shot categorization of a text column.")
+    parser.add_argument("input", help="Excel, CSV or Parquet file with the texts.")
+    parser.add_argument("output", help="Output file (same formats); a .checkpoint.jsonl log is kept next to it.")
+    parser.add_argument("--text-column", default="Text")
+    parser.add_argument("--category-column", default="Category")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread",
+                        help="Processes load one model each but avoid contention on torch's thread pool.")
+    parser.add_argument("--device", default=None, help='Pipeline device, e.g. "cpu", "cuda:0" or "mps" (default: auto).')
+    args = parser.parse_args()
+
+    categorize_file(args.input, args.output, args.text_column, args.category_column,
+                    model_name=args.model, batch_size=args.batch_size, workers=args.workers,
+                    executor=args.executor, device=args.device)
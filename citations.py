@@ -0,0 +1,200 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from data_store import to_tuples
+
+#############################################
+# Settings
+#############################################
+
+DEFAULT_THRESHOLD = 0.5
+# Each block of the similarity matrix is at most BLOCK_CELLS floats (32 MB at float64), so the
+# full Wikileaks x news matrix is never held at once.
+BLOCK_CELLS = 1 << 22
+
+# Output columns, as written by the notebook's categorize_and_cite (similarity_results.xlsx).
+CITATION_COLUMNS = [
+    "Wikileaks PDF Path", "Wikileaks Text", "News Link", "News Text",
+    "Similarity Score", "Entities Matched", "Relationships Matched",
+]
+
+#############################################
+# Similarity Blocks and Threshold Extraction
+#############################################
+
+def fit_tfidf(wikileaks_df: pd.DataFrame, news_df: pd.DataFrame) -> tuple:
+    """Word TF-IDF fitted on both corpora, as in the notebook's calculate_similarity. Returns (wikileaks, news) matrices."""
+    wikileaks_texts = wikileaks_df["Text"].fillna("").astype(str)
+    news_texts = news_df["Text"].fillna("").astype(str)
+    matrix = TfidfVectorizer().fit_transform(pd.concat([wikileaks_texts, news_texts], ignore_index=True))
+    return matrix[:len(wikileaks_texts)], matrix[len(wikileaks_texts):]
+
+def _block_rows(n_columns: int, block_cells: int) -> int:
+    return max(1, block_cells // max(n_columns, 1))
+
+def matrix_blocks(matrix, block_cells: int = BLOCK_CELLS):
+    """Yields (first row, dense row block) of a precomputed dense or sparse similarity matrix."""
+    rows = _block_rows(matrix.shape[1], block_cells)
+    for start in range(0, matrix.shape[0], rows):
+        block = matrix[start:start + rows]
+        yield start, block.toarray() if sparse.issparse(block) else np.asarray(block)
+
+def product_blocks(left, right, block_cells: int = BLOCK_CELLS):
+    """
+    Yields (first row, dense block of left @ right.T) one row block at a time. Rows of TF-IDF
+    matrices are L2-normalised, so the blocks are cosine similarities.
+    """
+    right_t = right.T.tocsc() if sparse.issparse(right) else right.T
+    rows = _block_rows(right.shape[0], block_cells)
+    for start in range(0, left.shape[0], rows):
+        block = left[start:start + rows] @ right_t
+        yield start, block.toarray() if sparse.issparse(block) else np.asarray(block)
+
+def threshold_pairs(blocks, threshold: float = DEFAULT_THRESHOLD):
+    """
+    Yields (rows, columns, scores) of the cells >= threshold in each block, with one vectorised
+    nonzero per block. Within a block, pairs come in row-major order, as in the nested loop.
+    """
+    for start, block in blocks:
+        rows, columns = np.nonzero(block >= threshold)
+        yield rows + start, columns, block[rows, columns]
+
+#############################################
+# Entity/Relationship Overlap
+#############################################
+
+def incidence_matrices(left_lists, right_lists) -> tuple:
+    """
+    Binary sparse (documents x items) incidence matrices of two sides over one shared item
+    vocabulary, built from the flattened lists in one pass. Items are any hashable values
+    (entity or relationship tuples). Returns (left, right, labels).
+    """
+    left_lists, right_lists = list(left_lists), list(right_lists)
+    item_lists = left_lists + right_lists
+    lengths = np.fromiter((len(items) for items in item_lists), dtype=np.int64, count=len(item_lists))
+    flat = pd.Series([item for items in item_lists for item in items], dtype=object).to_numpy()
+    # Factorising the ndarray (not the Series) keeps tuple items as plain objects in `labels`.
+    codes, labels = pd.factorize(flat)
+    docs = np.repeat(np.arange(len(item_lists)), lengths)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(codes), dtype=np.int8), (docs, codes)), shape=(len(item_lists), len(labels)),
+    )
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix[:len(left_lists)], matrix[len(left_lists):], labels
+
+def shared_items(left, right, labels, left_positions, right_positions) -> tuple:
+    """
+    Items shared by each (left row, right row) pair, from the element-wise product of the paired
+    incidence rows. Returns (counts, lists): the overlap size and the shared items per pair.
+    """
+    shared = left[left_positions].multiply(right[right_positions]).tocsr()
+    shared.eliminate_zeros()
+    shared.sort_indices()
+    items = labels[shared.indices].tolist()
+    bounds = shared.indptr.tolist()
+    return np.diff(shared.indptr), [items[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+#############################################
+# Citations
+#############################################
+
+def categorize_and_cite(similarity_matrix, wikileaks_df: pd.DataFrame, news_df: pd.DataFrame,
+                        threshold: float = DEFAULT_THRESHOLD, block_cells: int = BLOCK_CELLS) -> pd.DataFrame:
+    """
+    Every (Wikileaks document, news excerpt) pair whose similarity is >= threshold, with the
+    entities and relationships they share, in the notebook's output columns and order.
+    `similarity_matrix` is a precomputed (Wikileaks x news) matrix, dense or sparse.
+    """
+    return build_citations(matrix_blocks(similarity_matrix, block_cells), wikileaks_df, news_df, threshold)
+
+def cite(wikileaks_df: pd.DataFrame, news_df: pd.DataFrame, threshold: float = DEFAULT_THRESHOLD,
+         block_cells: int = BLOCK_CELLS) -> pd.DataFrame:
+    """categorize_and_cite over TF-IDF cosine similarities computed block by block, never as one dense matrix."""
+    wikileaks_tfidf, news_tfidf = fit_tfidf(wikileaks_df, news_df)
+    return build_citations(product_blocks(wikileaks_tfidf, news_tfidf, block_cells), wikileaks_df, news_df, threshold)
+
+def build_citations(blocks, wikileaks_df: pd.DataFrame, news_df: pd.DataFrame,
+                    threshold: float = DEFAULT_THRESHOLD) -> pd.DataFrame:
+    """
+    Citation rows from (first row, dense block) similarity blocks. Entity and relationship
+    values are parsed once per document, and the overlaps of all pairs in a block come from
+    one sparse product, so the per-pair work is proportional to the number of matches.
+    """
+    wikileaks_df = wikileaks_df.reset_index(drop=True)
+    news_df = news_df.reset_index(drop=True)
+    wiki_entities, news_entities, entity_labels = incidence_matrices(
+        wikileaks_df["entities"].map(to_tuples), news_df["entities"].map(to_tuples))
+    wiki_relationships, news_relationships, relationship_labels = incidence_matrices(
+        wikileaks_df["relationships"].map(to_tuples), news_df["relationships"].map(to_tuples))
+
+    frames = []
+    for wiki_pos, news_pos, scores in threshold_pairs(blocks, threshold):
+        if not len(scores):
+            continue
+        _, entities = shared_items(wiki_entities, news_entities, entity_labels, wiki_pos, news_pos)
+        _, relationships = shared_items(
+            wiki_relationships, news_relationships, relationship_labels, wiki_pos, news_pos)
+        wiki_rows = wikileaks_df.iloc[wiki_pos]
+        news_rows = news_df.iloc[news_pos]
+        frames.append(pd.DataFrame({
+            "Wikileaks PDF Path": wiki_rows["PDF Path"].values,
+            "Wikileaks Text": wiki_rows["Text"].values,
+            "News Link": news_rows["Link"].values,
+            "News Text": news_rows["Text"].values,
+            "Similarity Score": scores,
+            "Entities Matched": [set(items) for items in entities],
+            "Relationships Matched": [set(items) for items in relationships],
+        }, columns=CITATION_COLUMNS))
+    if not frames:
+        return pd.DataFrame(columns=CITATION_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+def categorize_and_cite_loop(similarity_matrix, wikileaks_df: pd.DataFrame, news_df: pd.DataFrame,
+                             threshold: float = DEFAULT_THRESHOLD) -> pd.DataFrame:
+    """The original notebook loop over every Wikileaks x news pair. Kept for benchmarking."""
+    results = []
+    for i, wikileaks_row in wikileaks_df.reset_index(drop=True).iterrows():
+        for j, news_row in news_df.reset_index(drop=True).iterrows():
+            similarity_score = similarity_matrix[i, j]
+            if similarity_score >= threshold:
+                results.append({
+                    "Wikileaks PDF Path": wikileaks_row["PDF Path"],
+                    "Wikileaks Text": wikileaks_row["Text"],
+                    "News Link": news_row["Link"],
+                    "News Text": news_row["Text"],
+                    "Similarity Score": similarity_score,
+                    "Entities Matched": set(to_tuples(wikileaks_row["entities"])) & set(to_tuples(news_row["entities"])),
+                    "Relationships Matched": (set(to_tuples(wikileaks_row["relationships"]))
+                                              & set(to_tuples(news_row["relationships"]))),
+                })
+    return pd.DataFrame(results, columns=CITATION_COLUMNS)
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wikileaks/news citation pairs above a TF-IDF similarity threshold.")
+    parser.add_argument("--wikileaks", default=None, help="Wikileaks Excel file (default: the data store table).")
+    parser.add_argument("--news", default=None, help="News Excel file (default: the data store table).")
+    parser.add_argument("--output", default="similarity_results.xlsx")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--block-cells", type=int, default=BLOCK_CELLS)
+    args = parser.parse_args()
+
+    from data_store import load_table
+
+    start = time.perf_counter()
+    columns = ["Text", "entities", "relationships"]
+    wikileaks_df = pd.read_excel(args.wikileaks) if args.wikileaks else load_table("wikileaks", ["PDF Path"] + columns)
+    news_df = pd.read_excel(args.news) if args.news else load_table("news", ["Link"] + columns)
+    results_df = cite(wikileaks_df, news_df, args.threshold, args.block_cells)
+    results_df.to_excel(args.output, index=False)
+    print(f"{len(results_df)} pairs >= {args.threshold} out of {len(wikileaks_df) * len(news_df)} "
+          f"saved to {args.output} in {time.perf_counter() - start:.1f}s")
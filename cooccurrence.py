@@ -0,0 +1,124 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+#############################################
+# Settings
+#############################################
+
+# Heatmaps show at most this many entities (the most frequent ones).
+DEFAULT_TOP_N = 30
+
+def entity_names(entities) -> list:
+    """Entity names from (name, label) tuples; plain strings are kept as they are."""
+    return [ent[0] if isinstance(ent, (list, tuple)) else ent for ent in entities]
+
+#############################################
+# Per-Article Co-occurrence
+#############################################
+
+def article_cooccurrence(entities, top_n: int = None) -> pd.DataFrame:
+    """
+    Co-occurrence counts for one article's entity list, as a frame indexed by entity name
+    (sorted). Off-diagonal cells count the pairs of mentions of the two entities; the diagonal
+    holds each entity's mention count. Names are factorised once and the matrix is the outer
+    product of the mention counts, so the cost is linear in the number of mentions plus the
+    size of the output. With top_n, only the most frequent entities are kept.
+    """
+    names = entity_names(entities)
+    codes, labels = pd.factorize(pd.Series(names, dtype=object), sort=True)
+    counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+    keep = _top_positions(counts, top_n)
+    counts = counts[keep]
+    matrix = np.outer(counts, counts)
+    np.fill_diagonal(matrix, counts)
+    labels = labels[keep]
+    return pd.DataFrame(matrix, index=labels, columns=labels)
+
+def _top_positions(frequencies: np.ndarray, top_n: int = None) -> np.ndarray:
+    """Positions of the top_n most frequent entries (all if top_n is None), in their original order."""
+    if top_n is None or top_n >= len(frequencies):
+        return np.arange(len(frequencies))
+    # Stable sort so ties keep label order.
+    return np.sort(np.argsort(-frequencies, kind="stable")[:top_n])
+
+#############################################
+# Corpus-Wide Co-occurrence
+#############################################
+
+def incidence_matrix(entity_lists, binary: bool = False):
+    """
+    Builds the sparse (documents x entities) mention-count matrix in one pass over the
+    flattened entity lists. Returns (matrix, labels) with labels sorted by name.
+    With binary=True each cell is 1 if the document mentions the entity at all.
+    """
+    names_per_doc = [entity_names(entities) for entities in entity_lists]
+    lengths = np.fromiter((len(names) for names in names_per_doc), dtype=np.int64, count=len(names_per_doc))
+    flat_names = pd.Series([name for names in names_per_doc for name in names], dtype=object)
+    codes, labels = pd.factorize(flat_names, sort=True)
+    docs = np.repeat(np.arange(len(names_per_doc)), lengths)
+    valid = codes >= 0
+    matrix = sparse.csr_matrix(
+        (np.ones(int(valid.sum()), dtype=np.int64), (docs[valid], codes[valid])),
+        shape=(len(names_per_doc), len(labels)),
+    )
+    matrix.sum_duplicates()
+    if binary:
+        matrix.data[:] = 1
+    return matrix, pd.Index(labels)
+
+def corpus_cooccurrence(entity_lists, binary: bool = False, top_n: int = None):
+    """
+    Corpus-wide co-occurrence as X.T @ X over the incidence matrix X. Off-diagonal cells sum
+    the per-document pair counts (with binary=True: the number of documents mentioning both);
+    the diagonal holds total mentions (documents mentioning the entity). With top_n, the matrix
+    is pruned to the most frequent entities before the product. Returns (sparse matrix, labels).
+    """
+    incidence, labels = incidence_matrix(entity_lists, binary)
+    frequencies = np.asarray(incidence.sum(axis=0)).ravel()
+    keep = _top_positions(frequencies, top_n)
+    incidence = incidence[:, keep]
+    matrix = (incidence.T @ incidence).tocsr()
+    matrix.setdiag(frequencies[keep])
+    return matrix, labels[keep]
+
+def to_frame(matrix, labels) -> pd.DataFrame:
+    """Dense labelled frame for plotting a (pruned) co-occurrence matrix."""
+    return pd.DataFrame(matrix.toarray(), index=labels, columns=labels)
+
+def top_pairs(matrix, labels, n: int = 20) -> pd.DataFrame:
+    """The n most frequent distinct entity pairs from a sparse co-occurrence matrix."""
+    upper = sparse.triu(matrix, k=1).tocoo()
+    order = np.argsort(-upper.data, kind="stable")[:n]
+    return pd.DataFrame({
+        "entity_1": labels[upper.row[order]],
+        "entity_2": labels[upper.col[order]],
+        "count": upper.data[order],
+    })
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    from data_store import load_table, to_tuples
+
+    parser = argparse.ArgumentParser(description="Corpus-wide entity co-occurrence for the news or Wikileaks table.")
+    parser.add_argument("--table", choices=["news", "wikileaks"], default="news")
+    parser.add_argument("--top-n", type=int, default=DEFAULT_TOP_N, help="Keep the N most frequent entities.")
+    parser.add_argument("--binary", action="store_true", help="Count documents instead of mention pairs.")
+    parser.add_argument("--pairs", type=int, default=20, help="Number of top entity pairs to print.")
+    parser.add_argument("--output", default=None, help="Optional CSV path for the pruned matrix.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    entity_lists = load_table(args.table, columns=["entities"])["entities"].map(to_tuples)
+    matrix, labels = corpus_cooccurrence(entity_lists, binary=args.binary, top_n=args.top_n)
+    print(top_pairs(matrix, labels, args.pairs).to_string(index=False))
+    if args.output:
+        to_frame(matrix, labels).to_csv(args.output)
+        print(f"Wrote {len(labels)} x {len(labels)} matrix to {args.output}")
+    print(f"Done in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,390 @@
+import argparse
+import ast
+import json
+import os
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+#############################################
+# Store Layout
+#############################################
+
+# The store is a directory of Parquet tables, one sub-directory per table:
+#   data/store/_manifest.json
+#   data/store/<table>/part-00000.parquet, part-00001.parquet, ...
+# Files starting with "_" or "." are ignored by the Parquet reader, so new
+# parts can be written under a temporary name and renamed into place.
+# The manifest lists each table's part files; readers only read listed parts, so
+# parts appended by ingest.py become visible together, when the manifest is replaced.
+STORE_DIR = "./data/store"
+MANIFEST_FILE = "_manifest.json"
+ROW_GROUP_SIZE = 4096
+
+# Source files for each table, in order of preference.
+TABLE_SOURCES = {
+    "fuzzy": ["./data/fuzzy_clean.pkl", "./data/cited_judgments_with_news_articles.xlsx"],
+    "bert": ["./data/bert_clean.pkl", "./data/sentencebert_results.xlsx"],
+    "news": ["./data/parsed_news_clean.pkl", "./data/processed_news_excerpts_parsed_with_category.xlsx"],
+    "wikileaks": ["./data/wikileaks_mapping_clean.pkl", "./data/processed_wikileaks_parsed_with_category.xlsx"],
+}
+
+# Column holding the news link for each table; tables are sorted on it so that
+# Parquet row-group statistics can skip row groups for link predicates.
+LINK_COLUMNS = {
+    "fuzzy": "news_Link",
+    "bert": "news_Link",
+    "news": "Link",
+}
+
+ENTITY_TYPE = pa.list_(pa.struct([("text", pa.string()), ("label", pa.string())]))
+RELATIONSHIP_TYPE = pa.list_(pa.struct([("token", pa.string()), ("verb", pa.string()), ("index", pa.int64())]))
+
+# Columns stored as nested lists instead of stringified Python literals.
+NESTED_COLUMNS = {
+    "entities": ENTITY_TYPE,
+    "relationships": RELATIONSHIP_TYPE,
+    "news_entities": ENTITY_TYPE,
+    "news_relationships": RELATIONSHIP_TYPE,
+    "wikileaks_entities": ENTITY_TYPE,
+    "wikileaks_relationships": RELATIONSHIP_TYPE,
+    "common_entities": ENTITY_TYPE,
+    "common_relationships": RELATIONSHIP_TYPE,
+}
+
+#############################################
+# Nested Value Helpers
+#############################################
+
+def parse_literal(value):
+    """
+    Parses an entity/relationship value into a list of tuples. Accepts stringified lists,
+    plain lists and values read back from the store (arrays of dicts).
+    Returns None for missing or malformed values.
+    """
+    if isinstance(value, str):
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return None
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    return [
+        tuple(item.values()) if isinstance(item, dict)
+        else tuple(item) if isinstance(item, (list, tuple))
+        else (item,)
+        for item in value
+    ]
+
+def to_tuples(value) -> list:
+    """Normalises an entity/relationship value to a list of tuples (empty if missing)."""
+    return parse_literal(value) or []
+
+def _nested_array(values, arrow_type):
+    struct_fields = [field.name for field in arrow_type.value_type]
+    rows = []
+    for value in values:
+        parsed = parse_literal(value)
+        if parsed is None:
+            rows.append(None)
+            continue
+        rows.append([
+            dict(zip(struct_fields, item))
+            for item in parsed
+            if len(item) == len(struct_fields)
+        ])
+    return pa.array(rows, type=arrow_type)
+
+def to_arrow(df: pd.DataFrame) -> pa.Table:
+    """Converts a frame to an Arrow table, storing entity/relationship columns as nested lists."""
+    nested = [column for column in df.columns if column in NESTED_COLUMNS]
+    table = pa.Table.from_pandas(df.drop(columns=nested), preserve_index=False)
+    for column in nested:
+        table = table.append_column(column, _nested_array(df[column], NESTED_COLUMNS[column]))
+    return table.select(list(df.columns))
+
+#############################################
+# Build Step
+#############################################
+
+def read_source(path: str) -> pd.DataFrame:
+    """Reads a pickle or Excel source file."""
+    if path.endswith(".pkl"):
+        return pd.read_pickle(path)
+    return pd.read_excel(path)
+
+def prepare_table(name: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Applies per-table fixes before writing: stable keys and link ordering."""
+    if name == "wikileaks" and "key" not in df.columns:
+        df = df.assign(key=range(1, len(df) + 1))
+    link_column = LINK_COLUMNS.get(name)
+    if link_column is not None:
+        by = [link_column]
+        ascending = [True]
+        if "content_similarity" in df.columns:
+            by.append("content_similarity")
+            ascending.append(False)
+        df = df.sort_values(by=by, ascending=ascending, kind="mergesort")
+    return df.reset_index(drop=True)
+
+def table_dir(name: str, store_dir: str = STORE_DIR) -> str:
+    return os.path.join(store_dir, name)
+
+def write_part(name: str, df: pd.DataFrame, store_dir: str = STORE_DIR, part: int = 0,
+               schema: pa.Schema = None) -> str:
+    """
+    Writes one Parquet part for a table atomically (temporary file, then rename).
+    With `schema`, the part is conformed to it (column order, types, missing columns as nulls),
+    so an appended part matches the table's existing parts.
+    """
+    directory = table_dir(name, store_dir)
+    os.makedirs(directory, exist_ok=True)
+    final_path = os.path.join(directory, f"part-{part:05d}.parquet")
+    temp_path = os.path.join(directory, f"_part-{part:05d}.parquet.tmp")
+    if schema is not None:
+        df = df.reindex(columns=schema.names)
+        # Scores appended to a table stored with integer scores are rounded, not truncated.
+        for field in schema:
+            if pa.types.is_integer(field.type) and pd.api.types.is_float_dtype(df[field.name]):
+                df[field.name] = df[field.name].round()
+        table = to_arrow(df).cast(schema)
+    else:
+        table = to_arrow(df)
+    pq.write_table(table, temp_path, row_group_size=ROW_GROUP_SIZE)
+    os.replace(temp_path, final_path)
+    return final_path
+
+def read_manifest(store_dir: str = STORE_DIR) -> dict:
+    path = os.path.join(store_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"version": 0, "tables": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def write_manifest(manifest: dict, store_dir: str = STORE_DIR):
+    """Writes the manifest atomically; readers use its version to detect new data."""
+    path = os.path.join(store_dir, MANIFEST_FILE)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_path, path)
+
+def build_store(store_dir: str = STORE_DIR, sources: dict = None) -> dict:
+    """
+    Builds the columnar store from the offline pickles (or Excel files as a fallback).
+    Entity and relationship literals are parsed once here, so loaders never call literal_eval.
+    """
+    sources = sources or TABLE_SOURCES
+    os.makedirs(store_dir, exist_ok=True)
+    manifest = read_manifest(store_dir)
+    for name, candidates in sources.items():
+        path = next((p for p in candidates if os.path.exists(p)), None)
+        if path is None:
+            print(f"Skipping table '{name}': none of {candidates} exist.")
+            continue
+        start = time.perf_counter()
+        df = prepare_table(name, read_source(path))
+        directory = table_dir(name, store_dir)
+        if os.path.isdir(directory):
+            for stale in os.listdir(directory):
+                os.remove(os.path.join(directory, stale))
+        part_path = write_part(name, df, store_dir)
+        manifest["tables"][name] = {
+            "source": path, "rows": len(df), "parts": 1, "files": [os.path.basename(part_path)],
+        }
+        print(f"Wrote table '{name}' ({len(df)} rows) from {path} in {time.perf_counter() - start:.1f}s")
+    manifest["version"] = manifest.get("version", 0) + 1
+    manifest["build_version"] = manifest["version"]
+    write_manifest(manifest, store_dir)
+    return manifest
+
+#############################################
+# Append Step
+#############################################
+
+def _next_part(directory: str) -> int:
+    parts = [f for f in os.listdir(directory) if f.startswith("part-") and f.endswith(".parquet")]
+    return max((int(f[5:10]) for f in parts), default=-1) + 1
+
+def append_parts(frames: dict, store_dir: str = STORE_DIR, source: str = None) -> dict:
+    """
+    Appends one new part per table ({table: frame}) and publishes them together by replacing the
+    manifest with a bumped version. Until then the new parts are not listed, so readers see either
+    none or all of them. Assumes a single writer (one ingest process per store).
+    """
+    manifest = read_manifest(store_dir)
+    written = {}
+    try:
+        for name, df in frames.items():
+            if df is None or df.empty:
+                continue
+            files = table_files(name, store_dir)
+            if not files:
+                raise FileNotFoundError(
+                    f"Table '{name}' not found in {store_dir}. Run `python data_store.py build` first."
+                )
+            directory = table_dir(name, store_dir)
+            part_path = write_part(name, prepare_table(name, df), store_dir, _next_part(directory),
+                                   schema=pq.read_schema(files[0]))
+            written[name] = (os.path.basename(part_path), len(df))
+    except Exception:
+        # Nothing was published; remove the parts of this append so they are not left behind.
+        for name, (part_file, _) in written.items():
+            os.remove(os.path.join(table_dir(name, store_dir), part_file))
+        raise
+    if not written:
+        return manifest
+    for name, (part_file, rows) in written.items():
+        entry = manifest["tables"].setdefault(name, {"rows": 0, "parts": 0})
+        entry["files"] = [os.path.basename(f) for f in table_files(name, store_dir)] + [part_file]
+        entry["rows"] = entry.get("rows", 0) + rows
+        entry["parts"] = len(entry["files"])
+        if source is not None:
+            entry["last_append"] = source
+    manifest["version"] = manifest.get("version", 0) + 1
+    write_manifest(manifest, store_dir)
+    return manifest
+
+def compact_table(name: str, store_dir: str = STORE_DIR) -> dict:
+    """
+    Rewrites a table's parts as one part (re-sorted on the news link) and publishes it with a new
+    manifest version. Keeps reads fast after many appends. The replaced parts stay on disk until
+    the table's next compaction, so a reader holding the previous manifest can still open them.
+    """
+    files = table_files(name, store_dir)
+    if len(files) <= 1:
+        return read_manifest(store_dir)
+    schema = pq.read_schema(files[0])
+    df = pq.read_table(files, memory_map=True).to_pandas()
+    part_path = write_part(name, prepare_table(name, df), store_dir, _next_part(table_dir(name, store_dir)),
+                           schema=schema)
+    manifest = read_manifest(store_dir)
+    entry = manifest["tables"].setdefault(name, {})
+    retired = entry.get("retired", [])
+    entry.update({
+        "rows": len(df), "parts": 1, "files": [os.path.basename(part_path)],
+        "retired": [os.path.basename(path) for path in files],
+    })
+    manifest["version"] = manifest.get("version", 0) + 1
+    write_manifest(manifest, store_dir)
+    for part_file in retired:
+        path = os.path.join(table_dir(name, store_dir), part_file)
+        if os.path.exists(path):
+            os.remove(path)
+    return manifest
+
+#############################################
+# Loader API
+#############################################
+
+def store_version(store_dir: str = STORE_DIR) -> int:
+    """Returns the current store version (0 if the store has not been built); bumped by every build and append."""
+    return read_manifest(store_dir).get("version", 0)
+
+def build_version(store_dir: str = STORE_DIR) -> int:
+    """The store version of the last full build. Appends add rows but do not change existing ones."""
+    manifest = read_manifest(store_dir)
+    return manifest.get("build_version", manifest.get("version", 0))
+
+def table_files(name: str, store_dir: str = STORE_DIR) -> list:
+    """Paths of a table's published parts: those listed in the manifest, else every part on disk."""
+    directory = table_dir(name, store_dir)
+    files = read_manifest(store_dir).get("tables", {}).get(name, {}).get("files")
+    if files is None:
+        files = sorted(f for f in os.listdir(directory) if f.endswith(".parquet")) if os.path.isdir(directory) else []
+    return [os.path.join(directory, f) for f in files]
+
+def manifest_parts(name: str, manifest: dict, store_dir: str = STORE_DIR) -> list:
+    """Like `table_files`, but from a manifest snapshot, so several tables are read consistently."""
+    files = manifest.get("tables", {}).get(name, {}).get("files")
+    if files is None:
+        return table_files(name, store_dir)
+    return [os.path.join(table_dir(name, store_dir), part_file) for part_file in files]
+
+def new_parts(name: str, read_files, manifest: dict = None, store_dir: str = STORE_DIR):
+    """
+    Paths of a table's parts published since a reader read the part files named in `read_files`,
+    from one manifest snapshot. A compacted part counts as read when every part it replaced was
+    read. Returns None when parts the reader read were compacted together with parts it has not
+    read (or were replaced by a rebuild), so the table has to be read again in full.
+    """
+    manifest = manifest or read_manifest(store_dir)
+    entry = manifest.get("tables", {}).get(name, {})
+    paths = manifest_parts(name, manifest, store_dir)
+    read = set(read_files)
+    current = [os.path.basename(path) for path in paths]
+    gone = read.difference(current)
+    if not gone:
+        return [path for path, part_file in zip(paths, current) if part_file not in read]
+    retired = set(entry.get("retired", []))
+    if paths and retired and retired.issubset(read) and gone.issubset(retired):
+        # The first part is the last compaction's output, made only of parts already read.
+        return [path for path, part_file in zip(paths[1:], current[1:]) if part_file not in read]
+    return None
+
+def read_parts(paths: list, columns: list = None) -> pd.DataFrame:
+    """Reads the given part files (e.g. from new_parts) as one DataFrame."""
+    return pq.read_table(paths, columns=columns, memory_map=True).to_pandas()
+
+def has_table(name: str, store_dir: str = STORE_DIR) -> bool:
+    return bool(table_files(name, store_dir))
+
+def load_arrow(name: str, columns: list = None, news_links=None, store_dir: str = STORE_DIR) -> pa.Table:
+    """
+    Reads a table from the store as Arrow, memory-mapping the Parquet files.
+    `columns` projects the read to the given columns; `news_links` keeps only rows for
+    those links and is pushed down to the Parquet reader, which skips row groups whose
+    link statistics do not match.
+    """
+    if not has_table(name, store_dir):
+        raise FileNotFoundError(
+            f"Table '{name}' not found in {store_dir}. Run `python data_store.py build` first."
+        )
+    filters = None
+    if news_links is not None:
+        if name not in LINK_COLUMNS:
+            raise ValueError(f"Table '{name}' has no news link column to filter on.")
+        if isinstance(news_links, str):
+            news_links = [news_links]
+        filters = [(LINK_COLUMNS[name], "in", list(news_links))]
+    return pq.read_table(table_files(name, store_dir), columns=columns, filters=filters, memory_map=True)
+
+def load_table(name: str, columns: list = None, news_links=None, store_dir: str = STORE_DIR) -> pd.DataFrame:
+    """Reads a table from the store as a DataFrame. See `load_arrow` for the arguments."""
+    return load_arrow(name, columns, news_links, store_dir).to_pandas()
+
+def iter_batches(name: str, columns: list = None, batch_size: int = 65536, store_dir: str = STORE_DIR):
+    """
+    Streams a table from the store as DataFrames of at most `batch_size` rows, part by part,
+    so callers can process tables larger than memory.
+    """
+    if not has_table(name, store_dir):
+        raise FileNotFoundError(
+            f"Table '{name}' not found in {store_dir}. Run `python data_store.py build` first."
+        )
+    for path in table_files(name, store_dir):
+        parquet_file = pq.ParquetFile(path, memory_map=True)
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            yield batch.to_pandas()
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or inspect the columnar data store.")
+    parser.add_argument("command", choices=["build", "info", "compact"])
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_store(args.store_dir)
+    elif args.command == "compact":
+        for name in TABLE_SOURCES:
+            if len(table_files(name, args.store_dir)) > 1:
+                compact_table(name, args.store_dir)
+        print(json.dumps(read_manifest(args.store_dir), indent=2))
+    else:
+        print(json.dumps(read_manifest(args.store_dir), indent=2))
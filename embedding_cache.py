@@ -0,0 +1,151 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+#############################################
+# Settings
+#############################################
+
+CACHE_DIR = "./data/embedding_cache"
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+def text_key(text: str, model_name: str) -> str:
+    """Content address of an embedding: hash of the model name and the text."""
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+#############################################
+# Embedding Cache
+#############################################
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache for one model. Vectors are appended to a raw float32 file that is
+    read back as a memory-mapped (rows x dim) matrix; `keys.txt` holds one content key per row.
+    Only texts whose key is not already cached are sent to the model.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, cache_dir: str = CACHE_DIR, model=None):
+        self.model_name = model_name
+        self.directory = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+        self.keys_path = os.path.join(self.directory, "keys.txt")
+        self.meta_path = os.path.join(self.directory, "meta.json")
+        self._model = model
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self.dim = None
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"]
+        self.index = {}
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, "r", encoding="utf-8") as f:
+                keys = f.read().split()
+            rows = min(len(keys), self._stored_rows())
+            if rows != len(keys) or rows != self._stored_rows():
+                self._truncate(keys, rows)
+            self.index = {key: row for row, key in enumerate(keys[:rows])}
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def report(self) -> str:
+        return (f"Embedding cache ({self.model_name}): {self.hits} hits, {self.misses} misses, "
+                f"hit rate {self.hit_rate:.1%}, {len(self)} vectors stored")
+
+    def _stored_rows(self) -> int:
+        if self.dim is None or not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (4 * self.dim)
+
+    def _truncate(self, keys: list, rows: int):
+        """Drops rows left half-written by an interrupted run, so keys and vectors stay aligned."""
+        with open(self.vectors_path, "r+b") as f:
+            f.truncate(rows * 4 * self.dim)
+        with open(self.keys_path, "w", encoding="utf-8") as f:
+            f.write("".join(f"{key}\n" for key in keys[:rows]))
+
+    def vectors(self) -> np.ndarray:
+        """Returns all cached vectors as a read-only memory-mapped matrix."""
+        rows = self._stored_rows()
+        if rows == 0:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+
+    def _append(self, keys: list, vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            with open(self.meta_path, "w", encoding="utf-8") as f:
+                json.dump({"model_name": self.model_name, "dim": self.dim}, f)
+        start = len(self.index)
+        with open(self.vectors_path, "ab") as f:
+            f.write(vectors.tobytes())
+        with open(self.keys_path, "a", encoding="utf-8") as f:
+            f.write("".join(f"{key}\n" for key in keys))
+        for offset, key in enumerate(keys):
+            self.index[key] = start + offset
+
+    def encode(self, texts, batch_size: int = 64) -> np.ndarray:
+        """
+        Returns embeddings for `texts` (in order), encoding only texts not already cached.
+        Missing texts are de-duplicated and sorted by length before batching, so each batch
+        pads to similar lengths. A miss is counted per text actually encoded; repeats of it in
+        the same call are hits.
+        """
+        texts = ["" if t is None else str(t) for t in texts]
+        keys = [text_key(t, self.model_name) for t in texts]
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self.index and key not in missing:
+                missing[key] = text
+        self.misses += len(missing)
+        self.hits += len(keys) - len(missing)
+
+        if missing:
+            ordered = sorted(missing.items(), key=lambda item: len(item[1]))
+            for start in range(0, len(ordered), batch_size * 16):
+                chunk = ordered[start:start + batch_size * 16]
+                embeddings = self.model.encode([text for _, text in chunk], batch_size=batch_size,
+                                               convert_to_numpy=True)
+                self._append([key for key, _ in chunk], embeddings)
+
+        if not keys:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.asarray(self.vectors()[[self.index[key] for key in keys]])
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    from data_store import load_table
+
+    parser = argparse.ArgumentParser(description="Warm the embedding cache for the news and Wikileaks texts.")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    cache = EmbeddingCache(args.model)
+    for table in ("wikileaks", "news"):
+        texts = load_table(table, columns=["Text"])["Text"].tolist()
+        cache.encode(texts, batch_size=args.batch_size)
+        print(f"{table}: {len(texts)} texts")
+    print(cache.report())
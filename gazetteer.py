@@ -0,0 +1,135 @@
+import os
+import re
+import time
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+#############################################
+# Offline Country/Region Gazetteer
+#############################################
+
+# Bundled centroid table: ISO codes, canonical name, latitude/longitude and
+# ";"-separated aliases. Resolution never needs network access.
+GAZETTEER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "country_centroids.csv")
+RESULT_COLUMNS = ["iso3", "country", "latitude", "longitude"]
+# The only abbreviations that resolve, matched on the upper-case text with dots removed
+# ("U.S." -> "US"). ISO codes are not matched in general, since entity text such as "AI",
+# "IT" or "IN" would otherwise resolve to Anguilla, Italy or India.
+ABBREVIATIONS = {
+    "US": "USA", "USA": "USA", "UK": "GBR", "UAE": "ARE", "PRC": "CHN", "DPRK": "PRK",
+    "ROK": "KOR", "DRC": "COD", "KSA": "SAU", "HKSAR": "HKG", "AUS": "AUS",
+}
+
+def normalize_name(name: str) -> str:
+    """Case-, accent- and punctuation-insensitive form of a place name ("the U.S." -> "us")."""
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = text.casefold().replace("&", " and ").replace(".", "").replace("’", "'")
+    text = re.sub(r"\s+", " ", text).strip()
+    return re.sub(r"^the ", "", text)
+
+@lru_cache(maxsize=None)
+def load_gazetteer(path: str = GAZETTEER_FILE):
+    """
+    Loads the centroid table and builds the lookups used by `resolve`: normalised
+    names/aliases -> ISO3, and the ABBREVIATIONS allowlist -> ISO3.
+    """
+    table = pd.read_csv(path, keep_default_na=False, na_values=[""], dtype={"aliases": str})
+    name_lookup = {}
+    for iso3, name, aliases in zip(table["iso3"], table["name"], table["aliases"].fillna("")):
+        for alias in [name] + [a for a in aliases.split(";") if a]:
+            # Upper-case aliases ("UAE", "U.K.") are abbreviations; they only match via the allowlist,
+            # so lower-case words like "us" or "car" do not resolve.
+            if not _abbreviation(alias):
+                name_lookup.setdefault(normalize_name(alias), iso3)
+    code_lookup = dict(ABBREVIATIONS)
+    table = table.set_index("iso3").rename(columns={"name": "country"})
+    return table, name_lookup, code_lookup
+
+def _abbreviation(name: str):
+    """Upper-case text with dots and spaces removed ("U.S." -> "US"), or None for other names."""
+    compact = re.sub(r"[.\s]", "", name)
+    return compact if compact.isalpha() and compact.isupper() else None
+
+def _resolve_iso3(name, name_lookup: dict, code_lookup: dict):
+    if name is None or (isinstance(name, float) and np.isnan(name)):
+        return None
+    stripped = str(name).strip()
+    abbreviation = _abbreviation(stripped)
+    if abbreviation in code_lookup:
+        return code_lookup[abbreviation]
+    return name_lookup.get(normalize_name(stripped))
+
+def resolve(names) -> pd.DataFrame:
+    """
+    Bulk lookup: returns a frame aligned with `names` with columns iso3, country (canonical
+    name), latitude and longitude; unresolved names get NaN. Each distinct name is resolved
+    once and the results are broadcast back with a vectorised take.
+    """
+    table, name_lookup, code_lookup = load_gazetteer()
+    names = pd.Series(names)
+    codes, uniques = pd.factorize(names, use_na_sentinel=True)
+    iso3 = pd.Index([_resolve_iso3(u, name_lookup, code_lookup) for u in uniques] + [None])
+    # Missing values (code -1) take the trailing None entry.
+    resolved = table.reindex(iso3[np.where(codes < 0, len(uniques), codes)])
+    result = resolved[["country", "latitude", "longitude"]].reset_index()
+    result.columns = RESULT_COLUMNS
+    result.index = names.index
+    return result
+
+def resolve_country(name):
+    """Resolves a single name; returns a dict with iso3, country, latitude, longitude or None."""
+    table, name_lookup, code_lookup = load_gazetteer()
+    iso3 = _resolve_iso3(name, name_lookup, code_lookup)
+    if iso3 is None:
+        return None
+    row = table.loc[iso3]
+    return {"iso3": iso3, "country": row["country"], "latitude": row["latitude"], "longitude": row["longitude"]}
+
+def is_country(name) -> bool:
+    """Return True if the given name is a known country/region (by name, alias or allowlisted abbreviation)."""
+    return resolve_country(name) is not None
+
+#############################################
+# Optional Online Fallback
+#############################################
+
+_geolocator = None
+
+def geocode_online(name: str):
+    """
+    Geocodes a name with Nominatim (requires geopy and network access). Only meant as a
+    fallback for names missing from the bundled table; returns (None, None) on failure.
+    """
+    global _geolocator
+    try:
+        if _geolocator is None:
+            from geopy.geocoders import Nominatim
+            _geolocator = Nominatim(user_agent="smubia_datathon_dashboard")
+        time.sleep(1)  # Avoid rate limiting
+        location = _geolocator.geocode(name)
+    except Exception:
+        return None, None
+    if location:
+        return location.latitude, location.longitude
+    return None, None
+
+def coordinates(names, online_fallback: bool = False, geocoder=geocode_online) -> pd.DataFrame:
+    """
+    Like `resolve`, but optionally fills unresolved names with `geocoder` (the geopy path).
+    Each distinct unresolved name is geocoded once.
+    """
+    result = resolve(names)
+    if online_fallback:
+        names = pd.Series(names, index=result.index)
+        missing = result["latitude"].isna() & names.notna()
+        for name in names[missing].unique():
+            lat, lon = geocoder(name)
+            if lat is not None and lon is not None:
+                rows = missing & (names == name)
+                result.loc[rows, ["latitude", "longitude"]] = [lat, lon]
+                result.loc[rows, "country"] = name
+    return result
@@ -0,0 +1,335 @@
+import argparse
+import json
+import os
+import time
+from collections import defaultdict
+
+import numpy as np
+
+#############################################
+# Settings
+#############################################
+
+GRAPH_DIR = "./data/graph_store"
+META_FILE = "meta.json"
+ARRAY_FILES = ["edge_src", "edge_dst", "edge_rel", "doc_ptr"]
+NAME_FILES = ["node_names", "relation_names", "doc_names"]
+
+def news_doc(link) -> str:
+    return f"news:{link}"
+
+def wikileaks_doc(key) -> str:
+    return f"wikileaks:{key}"
+
+# Data store tables read into the graph: table -> (document key column, document name function).
+DOC_TABLES = {"news": ("Link", news_doc), "wikileaks": ("key", wikileaks_doc)}
+
+def relationship_triples(relationships) -> list:
+    """
+    Groups (token, verb, index) relationship tuples by index and returns one
+    (subject, relation, object, index) triple per group of exactly two tokens, in order of appearance.
+    """
+    groups = defaultdict(list)
+    for rel in relationships:
+        groups[rel[2]].append(rel)
+    return [
+        (group[0][0], group[0][1], group[1][0], key)
+        for key, group in groups.items()
+        if len(group) == 2
+    ]
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenation of arange(s, e) for every (s, e) pair, without a Python loop."""
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(total)
+
+#############################################
+# Graph Store
+#############################################
+
+class GraphStore:
+    """
+    Corpus-wide entity-relationship graph. Entities, relation labels and documents are interned
+    to integer ids; each subject -relation-> object triple is one edge in parallel int32 arrays.
+    Edges are stored grouped by document (doc_ptr[d]:doc_ptr[d + 1] are document d's edges),
+    so appending a document only adds to the ends of the arrays. A CSR adjacency over entity
+    nodes is built lazily for neighbourhood and k-hop queries.
+    """
+
+    def __init__(self):
+        self.node_names, self.relation_names, self.doc_names = [], [], []
+        self.node_ids, self.relation_ids, self.doc_ids = {}, {}, {}
+        self.edge_src = np.empty(0, dtype=np.int32)
+        self.edge_dst = np.empty(0, dtype=np.int32)
+        self.edge_rel = np.empty(0, dtype=np.int32)
+        self.doc_ptr = np.zeros(1, dtype=np.int64)
+        # Data store part files already read, per table, and the store build they belong to;
+        # sync_graph only reads parts not listed here.
+        self.store_files = {}
+        self.store_build = None
+        self._adjacency = None
+
+    def __len__(self):
+        return len(self.edge_src)
+
+    def __contains__(self, doc: str):
+        return doc in self.doc_ids
+
+    @staticmethod
+    def _intern(name, ids: dict, names: list) -> int:
+        if name not in ids:
+            ids[name] = len(names)
+            names.append(name)
+        return ids[name]
+
+    def append(self, documents) -> int:
+        """
+        Adds documents given as (doc name, relationship tuples) pairs. Documents already in the
+        store are skipped. Returns the number of documents added.
+        """
+        src, dst, rel, counts = [], [], [], []
+        for doc, relationships in documents:
+            if doc in self.doc_ids:
+                continue
+            self._intern(doc, self.doc_ids, self.doc_names)
+            triples = relationship_triples(relationships)
+            for subject, relation, obj, _ in triples:
+                src.append(self._intern(subject, self.node_ids, self.node_names))
+                rel.append(self._intern(relation, self.relation_ids, self.relation_names))
+                dst.append(self._intern(obj, self.node_ids, self.node_names))
+            counts.append(len(triples))
+        if counts:
+            self.edge_src = np.concatenate([self.edge_src, np.asarray(src, dtype=np.int32)])
+            self.edge_dst = np.concatenate([self.edge_dst, np.asarray(dst, dtype=np.int32)])
+            self.edge_rel = np.concatenate([self.edge_rel, np.asarray(rel, dtype=np.int32)])
+            self.doc_ptr = np.concatenate([self.doc_ptr, self.doc_ptr[-1] + np.cumsum(counts)])
+            self._adjacency = None
+        return len(counts)
+
+    #############################################
+    # Queries
+    #############################################
+
+    def adjacency(self):
+        """Undirected CSR adjacency over entity nodes: (indptr, neighbour ids, edge ids)."""
+        if self._adjacency is None:
+            edge_ids = np.arange(len(self.edge_src))
+            rows = np.concatenate([self.edge_src, self.edge_dst])
+            cols = np.concatenate([self.edge_dst, self.edge_src])
+            order = np.argsort(rows, kind="stable")
+            indptr = np.zeros(len(self.node_names) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(rows, minlength=len(self.node_names)), out=indptr[1:])
+            self._adjacency = (indptr, cols[order], np.concatenate([edge_ids, edge_ids])[order])
+        return self._adjacency
+
+    def doc_edges(self, doc: str) -> np.ndarray:
+        """Edge ids of one document (empty if the document is unknown)."""
+        d = self.doc_ids.get(doc)
+        if d is None:
+            return np.empty(0, dtype=np.int64)
+        return np.arange(self.doc_ptr[d], self.doc_ptr[d + 1])
+
+    def doc_nodes(self, doc: str) -> np.ndarray:
+        edges = self.doc_edges(doc)
+        return np.unique(np.concatenate([self.edge_src[edges], self.edge_dst[edges]]))
+
+    def node_ids_for(self, names) -> np.ndarray:
+        return np.array([self.node_ids[n] for n in names if n in self.node_ids], dtype=np.int64)
+
+    def neighbours(self, name: str) -> list:
+        """Entities directly connected to `name` by any relation."""
+        ids = self.node_ids_for([name])
+        if len(ids) == 0:
+            return []
+        indptr, neighbours, _ = self.adjacency()
+        return [self.node_names[i] for i in np.unique(neighbours[indptr[ids[0]]:indptr[ids[0] + 1]])]
+
+    def k_hop(self, names, k: int = 1) -> np.ndarray:
+        """Node ids reachable from `names` within k hops (breadth-first over the CSR arrays)."""
+        indptr, neighbours, _ = self.adjacency()
+        seen = np.zeros(len(self.node_names), dtype=bool)
+        frontier = np.unique(self.node_ids_for(names))
+        seen[frontier] = True
+        for _ in range(k):
+            if len(frontier) == 0:
+                break
+            reached = np.unique(neighbours[_ranges(indptr[frontier], indptr[frontier + 1])])
+            frontier = reached[~seen[reached]]
+            seen[frontier] = True
+        return np.flatnonzero(seen)
+
+    def subgraph_edges(self, node_ids) -> np.ndarray:
+        """Edge ids with both endpoints in `node_ids`."""
+        inside = np.zeros(len(self.node_names), dtype=bool)
+        inside[np.asarray(node_ids, dtype=np.int64)] = True
+        return np.flatnonzero(inside[self.edge_src] & inside[self.edge_dst])
+
+    def shared_nodes(self, doc: str, others) -> dict:
+        """
+        Relationship tokens that `doc` shares with each of the `others` documents: {other: [names]}.
+        Nodes are raw relationship tokens (pronouns included); for named-entity overlaps use the
+        (text, label) entity columns instead.
+        """
+        nodes = self.doc_nodes(doc)
+        return {
+            other: [self.node_names[i] for i in np.intersect1d(nodes, self.doc_nodes(other), assume_unique=True)]
+            for other in others
+        }
+
+    def triples(self, edge_ids) -> list:
+        """(subject, relation, object, edge id) for each edge, for rendering."""
+        return [
+            (self.node_names[s], self.relation_names[r], self.node_names[o], int(e))
+            for s, r, o, e in zip(self.edge_src[edge_ids], self.edge_rel[edge_ids], self.edge_dst[edge_ids], edge_ids)
+        ]
+
+    #############################################
+    # Persistence
+    #############################################
+
+    def save(self, directory: str = GRAPH_DIR, store_version: int = None):
+        """Saves the arrays and vocabularies; meta.json is written last, so readers see a complete store."""
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAY_FILES:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        for name in NAME_FILES:
+            with open(os.path.join(directory, f"{name}.json"), "w", encoding="utf-8") as f:
+                json.dump(getattr(self, name), f, ensure_ascii=False)
+        meta = {"nodes": len(self.node_names), "edges": len(self), "documents": len(self.doc_names),
+                "store_version": store_version, "store_build": self.store_build, "store_files": self.store_files}
+        temp_path = os.path.join(directory, META_FILE + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(temp_path, os.path.join(directory, META_FILE))
+
+    @classmethod
+    def load(cls, directory: str = GRAPH_DIR):
+        """Loads a saved graph store, or returns None if none has been built."""
+        if not os.path.exists(os.path.join(directory, META_FILE)):
+            return None
+        store = cls()
+        for name in ARRAY_FILES:
+            setattr(store, name, np.load(os.path.join(directory, f"{name}.npy")))
+        for name, ids in zip(NAME_FILES, ["node_ids", "relation_ids", "doc_ids"]):
+            with open(os.path.join(directory, f"{name}.json"), "r", encoding="utf-8") as f:
+                names = json.load(f)
+            setattr(store, name, names)
+            setattr(store, ids, {n: i for i, n in enumerate(names)})
+        with open(os.path.join(directory, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        store.store_files, store.store_build = meta.get("store_files", {}), meta.get("store_build")
+        return store
+
+#############################################
+# Building from the Data Store
+#############################################
+
+def store_documents(files: list, key_column: str, doc_name, known=()):
+    """
+    Yields (doc name, relationships) for the documents in the given data store part files that
+    are not in `known`. The key column is read first; relationships are read only for new
+    documents, with the key filter pushed down to the Parquet reader.
+    """
+    import pyarrow.parquet as pq
+    from data_store import to_tuples
+
+    if not files:
+        return
+    keys = pq.read_table(files, columns=[key_column], memory_map=True).column(0).unique().to_pylist()
+    new_keys = [key for key in keys if key is not None and doc_name(key) not in known]
+    if not new_keys:
+        return
+    df = pq.read_table(files, columns=[key_column, "relationships"], filters=[(key_column, "in", new_keys)],
+                       memory_map=True).to_pandas()
+    for key, relationships in zip(df[key_column], df["relationships"]):
+        yield doc_name(key), to_tuples(relationships)
+
+def sync_graph(graph: GraphStore = None, store_dir: str = None) -> GraphStore:
+    """
+    Appends the data store documents not yet in the graph (a full build if graph is None, or if
+    it was built from an earlier store build).
+    Only the part files published since the graph was last synced are read, so an append by
+    ingest.py costs one small part, not the whole table. A compacted part is read once, for its
+    keys only, unless the graph had already read every part it replaced.
+    """
+    from data_store import STORE_DIR, manifest_parts, new_parts, read_manifest
+
+    store_dir = store_dir or STORE_DIR
+    graph = graph or GraphStore()
+    manifest = read_manifest(store_dir)
+    build = manifest.get("build_version", manifest.get("version", 0))
+    if graph.store_build != build:
+        # A rebuild can change or remove documents the graph already holds, and append only adds
+        # new ones, so a graph from an earlier build is replaced by a fresh one.
+        graph = GraphStore()
+        graph.store_build = build
+    for table, (key_column, doc_name) in DOC_TABLES.items():
+        read = graph.store_files.get(table, [])
+        paths = new_parts(table, read, manifest, store_dir)
+        if paths is None:
+            # Read parts were compacted with unread ones: scan them all (known documents are skipped).
+            paths = new_parts(table, [], manifest, store_dir)
+        graph.append(store_documents(paths, key_column, doc_name, graph))
+        graph.store_files[table] = [os.path.basename(path) for path in manifest_parts(table, manifest, store_dir)]
+    return graph
+
+def sankey_links(triples) -> tuple:
+    """
+    Sankey nodes and links for subject -> relation -> object triples. Relation labels are shared
+    nodes. Returns (labels, sources, targets, values).
+    """
+    labels, index, sources, targets = [], {}, [], []
+
+    def add_node(label):
+        if label not in index:
+            index[label] = len(labels)
+            labels.append(label)
+        return index[label]
+
+    for subject, relation, obj, _ in triples:
+        subj_idx, rel_idx, obj_idx = add_node(subject), add_node(relation), add_node(obj)
+        sources += [subj_idx, rel_idx]
+        targets += [rel_idx, obj_idx]
+    return labels, sources, targets, [1] * len(sources)
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    from data_store import store_version
+
+    parser = argparse.ArgumentParser(description="Build, update or query the entity-relationship graph store.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="Build the graph from scratch.")
+    build_parser.add_argument("--directory", default=GRAPH_DIR)
+    update_parser = subparsers.add_parser("update", help="Append documents added to the data store since the last build.")
+    update_parser.add_argument("--directory", default=GRAPH_DIR)
+    query_parser = subparsers.add_parser("query", help="k-hop neighbourhood of an entity.")
+    query_parser.add_argument("entity")
+    query_parser.add_argument("--hops", type=int, default=1)
+    query_parser.add_argument("--directory", default=GRAPH_DIR)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command in ("build", "update"):
+        graph = GraphStore.load(args.directory) if args.command == "update" else None
+        before = len(graph.doc_names) if graph is not None else 0
+        graph = sync_graph(graph)
+        graph.save(args.directory, store_version())
+        print(f"{len(graph.doc_names) - before} documents added; {len(graph.doc_names)} documents, "
+              f"{len(graph.node_names)} entities, {len(graph)} edges in {time.perf_counter() - start:.1f}s")
+    else:
+        graph = GraphStore.load(args.directory)
+        if graph is None:
+            raise SystemExit(f"No graph store in {args.directory}. Run `python graph_store.py build` first.")
+        nodes = graph.k_hop([args.entity], args.hops)
+        edges = graph.subgraph_edges(nodes)
+        print(f"{len(nodes)} entities, {len(edges)} edges within {args.hops} hop(s) of {args.entity!r} "
+              f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+        for subject, relation, obj, _ in graph.triples(edges)[:50]:
+            print(f"  {subject} -{relation}-> {obj}")
@@ -0,0 +1,397 @@
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+import traceback
+
+import numpy as np
+import pandas as pd
+
+import data_store
+from data_store import STORE_DIR, to_tuples
+
+#############################################
+# Settings
+#############################################
+
+# New excerpt files are dropped into DROP_DIR (.csv, .jsonl, .json, .xlsx or .parquet with at
+# least Link and Text columns). Writers should write under a name starting with "_" or "." and
+# rename it into place; such names are ignored. A claimed file is moved to PROCESSING_DIR, then
+# to DONE_DIR or FAILED_DIR (with a .error.txt), so the drop directory doubles as a queue.
+DROP_DIR = "./data/inbox"
+PROCESSING_DIR = "processing"
+DONE_DIR = "done"
+FAILED_DIR = "failed"
+FILE_EXTENSIONS = (".csv", ".jsonl", ".json", ".xlsx", ".parquet")
+POLL_INTERVAL = 2.0  # seconds between scans of the drop directory
+MAX_BATCH_FILES = 50  # files merged into one store append
+COMPACT_PARTS = 32  # compact a table once it has this many parts
+
+# Matching, as in the pipeline's fuzzy and Sentence-BERT stages. No similarity threshold by
+# default: reranked SequenceMatcher ratios between excerpts and whole documents stay in the
+# single digits, so a percentage cut-off would drop every pair.
+TOP_K = 30
+MIN_SIMILARITY = None
+SPACY_MODEL = "en_core_web_sm"
+CATEGORIZERS = ["zero-shot", "keyword"]
+CATEGORY_CHECKPOINT = "./data/ingest_categories.checkpoint.jsonl"
+
+#############################################
+# Reading Drop Files
+#############################################
+
+def ready_files(drop_dir: str) -> list:
+    """Files waiting in the drop directory, oldest first; temporary names are skipped."""
+    if not os.path.isdir(drop_dir):
+        return []
+    paths = [
+        os.path.join(drop_dir, f) for f in os.listdir(drop_dir)
+        if f.endswith(FILE_EXTENSIONS) and not f.startswith(("_", "."))
+    ]
+    return sorted((p for p in paths if os.path.isfile(p)), key=os.path.getmtime)
+
+def read_excerpts(path: str) -> pd.DataFrame:
+    """Reads one drop file; rows without a Link or Text are dropped, and both are stripped."""
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    elif path.endswith(".csv"):
+        df = pd.read_csv(path)
+    elif path.endswith(".jsonl"):
+        df = pd.read_json(path, lines=True)
+    elif path.endswith(".json"):
+        df = pd.read_json(path)
+    else:
+        df = pd.read_excel(path)
+    missing = {"Link", "Text"} - set(df.columns)
+    if missing:
+        raise ValueError(f"{path} has no {sorted(missing)} column(s).")
+    df = df.dropna(subset=["Link", "Text"])
+    return df.assign(Link=df["Link"].astype(str).str.strip(), Text=df["Text"].astype(str).str.strip())
+
+def _move(path: str, directory: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    target = os.path.join(directory, os.path.basename(path))
+    os.replace(path, target)
+    return target
+
+#############################################
+# Tagging
+#############################################
+
+def _has_values(df: pd.DataFrame, column: str) -> bool:
+    return column in df.columns and df[column].notna().all()
+
+def load_nlp(model: str = SPACY_MODEL):
+    import spacy
+
+    return spacy.load(model)
+
+def extract_entities(texts, nlp) -> tuple:
+    """
+    spaCy entities as (text, label) and subject/object -> verb relationships as
+    (token, verb, verb index), the shape of the parsed tables' entity and relationship columns.
+    """
+    entities, relationships = [], []
+    for doc in nlp.pipe(texts, batch_size=32):
+        entities.append([(ent.text, ent.label_) for ent in doc.ents])
+        relationships.append([
+            (token.text, token.head.text, token.head.i) for token in doc
+            if token.dep_ in ("nsubj", "nsubjpass", "dobj") and token.head.pos_ == "VERB"
+        ])
+    return entities, relationships
+
+def categorize_texts(texts, categorizer: str = "zero-shot") -> list:
+    """Category_y per text: zero-shot labels (categorization_job, checkpointed) or the keyword categorizer."""
+    if categorizer == "keyword":
+        from sentence_categorizer import KeywordCategorizer
+
+        return list(KeywordCategorizer().categorize(texts, mode="max"))
+    from categorization_job import categorize
+
+    return categorize(texts, CATEGORY_CHECKPOINT)["Category"].tolist()
+
+def tag_excerpts(df: pd.DataFrame, nlp_loader=load_nlp, categorizer: str = "zero-shot") -> pd.DataFrame:
+    """
+    Fills in what the offline notebooks add to a news excerpt: content length, entities and
+    relationships (spaCy, unless the file already has them) and Category_y (unless given).
+    Category_x (the topic category) is kept from the file when present. Threat levels are not
+    stored per excerpt; they only feed the aggregate in update_threat_counts.
+    """
+    df = df.reset_index(drop=True)
+    df = df.assign(content_length=df["Text"].str.len())
+    if not (_has_values(df, "entities") and _has_values(df, "relationships")):
+        entities, relationships = extract_entities(df["Text"].tolist(), nlp_loader())
+        df = df.assign(entities=entities, relationships=relationships)
+    df = df.assign(entities=df["entities"].map(to_tuples), relationships=df["relationships"].map(to_tuples))
+    if not _has_values(df, "Category_y"):
+        df["Category_y"] = categorize_texts(df["Text"], categorizer)
+    if "Category_x" not in df.columns:
+        df["Category_x"] = None
+    return df
+
+#############################################
+# Matching New Rows
+#############################################
+
+class Matcher:
+    """
+    Top-k Wikileaks matches for new excerpts only. The char n-gram vectorizer is fitted on the
+    Wikileaks texts (and the texts transformed) once, again only when the Wikileaks table
+    changes, so candidate scores use the Wikileaks IDF rather than a refit per batch; the Sentence-BERT
+    index is the saved one (vector_index.py build) and is skipped if it or the model is missing.
+    """
+
+    def __init__(self, store_dir: str = STORE_DIR, top_k: int = TOP_K, min_similarity: float = MIN_SIMILARITY,
+                 rerank: bool = True):
+        self.store_dir = store_dir
+        self.top_k = top_k
+        self.min_similarity = min_similarity
+        self.rerank = rerank
+        self.files = None
+        self.wikileaks_df = None
+        self.vectorizer = None
+        self.wikileaks_matrix = None
+        self.bert_index = None
+
+    def refresh(self):
+        files = data_store.table_files("wikileaks", self.store_dir)
+        if files == self.files:
+            return
+        from text_matching import fit_vectorizer
+
+        self.wikileaks_df = data_store.load_table(
+            "wikileaks", ["key", "Text", "entities", "relationships", "Category"], store_dir=self.store_dir)
+        texts = self.wikileaks_df["Text"].fillna("").astype(str)
+        self.vectorizer = fit_vectorizer(texts)
+        self.wikileaks_matrix = self.vectorizer.transform(texts)
+        if importlib.util.find_spec("sentence_transformers") is not None:
+            import vector_index
+
+            self.bert_index = vector_index.load_index(vector_index.INDEX_DIR)
+        self.files = files
+
+    def fuzzy(self, news_df: pd.DataFrame) -> pd.DataFrame:
+        from text_matching import match_corpora
+
+        return match_corpora(news_df, self.wikileaks_df, self.top_k, self.min_similarity, self.rerank,
+                             vectorizer=self.vectorizer, wikileaks_matrix=self.wikileaks_matrix)
+
+    def bert(self, news_df: pd.DataFrame):
+        """Sentence-BERT pairs in the fuzzy schema (wikileaks_Text holds the document key), or None."""
+        if self.bert_index is None:
+            return None
+        from text_matching import FUZZY_COLUMNS
+        from vector_index import encode_texts
+
+        keys, scores = self.bert_index.search(
+            encode_texts(news_df["Text"].tolist(), self.bert_index.model_name), k=self.top_k)
+        k = keys.shape[1]
+        news_rows = news_df.iloc[np.repeat(np.arange(len(news_df)), k)]
+        wiki_rows = self.wikileaks_df.set_index("key").loc[keys.ravel()]
+        news_entities, wiki_entities = news_rows["entities"].map(to_tuples), wiki_rows["entities"].map(to_tuples)
+        news_rels, wiki_rels = news_rows["relationships"].map(to_tuples), wiki_rows["relationships"].map(to_tuples)
+        return pd.DataFrame({
+            "news_Link": news_rows["Link"].values,
+            "news_Text": news_rows["Text"].values,
+            "news_entities": news_entities.values,
+            "news_relationships": news_rels.values,
+            "news_Category_x": news_rows["Category_x"].values,
+            "news_Category_y": news_rows["Category_y"].values,
+            "wikileaks_Text": keys.ravel(),
+            "wikileaks_entities": wiki_entities.values,
+            "wikileaks_relationships": wiki_rels.values,
+            "wikileaks_Category": wiki_rows["Category"].values,
+            "common_entities": [list(set(a) & set(b)) for a, b in zip(news_entities, wiki_entities)],
+            "common_relationships": [list(set(a) & set(b)) for a, b in zip(news_rels, wiki_rels)],
+            "content_similarity": scores.ravel().astype(float) * 100,
+        }, columns=FUZZY_COLUMNS)
+
+#############################################
+# Threat Counts
+#############################################
+
+def update_threat_counts(df: pd.DataFrame, path: str = None):
+    """Adds the new excerpts' per-country threat counts to the aggregate written by test.py."""
+    import test as threat_counts
+
+    path = path or threat_counts.OUTPUT_FILE
+    total, rows = {}, 0
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+        total = {entry["country"]: {level: entry.get(level, 0) for level in threat_counts.THREAT_LEVELS}
+                 for entry in result["countries"]}
+        rows = result.get("rows", 0)
+    threat_counts.merge_counts(total, threat_counts.count_threats(df))
+    threat_counts.write_results(total, path, "data_store:news", rows + len(df))
+
+#############################################
+# Ingestion
+#############################################
+
+class Ingestor:
+    """
+    Turns batches of drop files into one atomic data store append of the new news rows and their
+    fuzzy and Sentence-BERT matches, then updates the threat counts and compacts tables. Links
+    already in the store (or earlier in the batch) are skipped, so re-dropping a file is harmless.
+    """
+
+    def __init__(self, store_dir: str = STORE_DIR, categorizer: str = "zero-shot", matcher: Matcher = None,
+                 threat_counts_path: str = None, compact_parts: int = COMPACT_PARTS):
+        self.store_dir = store_dir
+        self.categorizer = categorizer
+        self.matcher = matcher or Matcher(store_dir)
+        self.threat_counts_path = threat_counts_path
+        self.compact_parts = compact_parts
+        self.known_links = set(data_store.load_table("news", ["Link"], store_dir=store_dir)["Link"])
+        self._nlp = None
+
+    def nlp(self):
+        if self._nlp is None:
+            self._nlp = load_nlp()
+        return self._nlp
+
+    def ingest(self, df: pd.DataFrame, source: str = None) -> dict:
+        """Tags, matches and appends the unseen rows of `df`. Returns per-step counts and timings."""
+        timings, start = {}, time.perf_counter()
+        df = df.drop_duplicates(subset="Link")
+        df = df[~df["Link"].isin(self.known_links)]
+        report = {"rows": len(df), "fuzzy": 0, "bert": 0, "version": None}
+        if df.empty:
+            return report
+        df = tag_excerpts(df, self.nlp, self.categorizer)
+        timings["tag"] = time.perf_counter() - start
+
+        self.matcher.refresh()
+        fuzzy = self.matcher.fuzzy(df)
+        timings["fuzzy"] = time.perf_counter() - start - sum(timings.values())
+        bert = self.matcher.bert(df)
+        timings["bert"] = time.perf_counter() - start - sum(timings.values())
+
+        manifest = data_store.append_parts({"news": df, "fuzzy": fuzzy, "bert": bert}, self.store_dir, source)
+        self.known_links.update(df["Link"])
+        timings["append"] = time.perf_counter() - start - sum(timings.values())
+
+        # The rows are live from here on, so the remaining steps are best-effort: a failure is
+        # logged and reported, but does not fail the batch's files.
+        errors = []
+        if self.threat_counts_path != "":
+            try:
+                update_threat_counts(df, self.threat_counts_path)
+            except Exception:
+                errors.append(f"threat counts: {traceback.format_exc()}")
+        timings["threat_counts"] = time.perf_counter() - start - sum(timings.values())
+        for name in ("news", "fuzzy", "bert"):
+            try:
+                if len(data_store.table_files(name, self.store_dir)) >= self.compact_parts:
+                    manifest = data_store.compact_table(name, self.store_dir)
+            except Exception:
+                errors.append(f"compacting {name}: {traceback.format_exc()}")
+        for error in errors:
+            print(f"Rows of {source} were published, but {error}", file=sys.stderr)
+        report.update({
+            "errors": len(errors),
+            "fuzzy": len(fuzzy), "bert": 0 if bert is None else len(bert), "version": manifest["version"],
+            "timings": {step: round(seconds, 3) for step, seconds in timings.items()},
+        })
+        return report
+
+    def ingest_files(self, paths: list, drop_dir: str) -> dict:
+        """
+        Claims the files (moves them to processing/), ingests them as one batch and files them
+        under done/ or failed/. A file that cannot be read fails on its own; if the batch fails,
+        every file in it does.
+        """
+        claimed = [_move(path, os.path.join(drop_dir, PROCESSING_DIR)) for path in paths]
+        frames, readable = [], []
+        for path in claimed:
+            try:
+                frames.append(read_excerpts(path))
+                readable.append(path)
+            except Exception:
+                _fail(path, drop_dir)
+        if not frames:
+            return {"files": 0, "rows": 0}
+        try:
+            report = self.ingest(pd.concat(frames, ignore_index=True),
+                                 source=",".join(os.path.basename(p) for p in readable))
+        except Exception:
+            for path in readable:
+                _fail(path, drop_dir)
+            raise
+        for path in readable:
+            _move(path, os.path.join(drop_dir, DONE_DIR))
+        return {"files": len(readable), **report}
+
+def _fail(path: str, drop_dir: str):
+    target = _move(path, os.path.join(drop_dir, FAILED_DIR))
+    with open(target + ".error.txt", "w", encoding="utf-8") as f:
+        f.write(traceback.format_exc())
+
+def watch(drop_dir: str = DROP_DIR, interval: float = POLL_INTERVAL, once: bool = False, **options):
+    """
+    Polls the drop directory and ingests the waiting files in batches. Files left in processing/
+    by an interrupted run are requeued at start-up.
+    """
+    processing = os.path.join(drop_dir, PROCESSING_DIR)
+    os.makedirs(processing, exist_ok=True)
+    for name in os.listdir(processing):
+        _move(os.path.join(processing, name), drop_dir)
+
+    ingestor = Ingestor(**options)
+    print(f"Watching {drop_dir} (store version {data_store.store_version(ingestor.store_dir)})")
+    while True:
+        paths = ready_files(drop_dir)[:MAX_BATCH_FILES]
+        if paths:
+            start = time.perf_counter()
+            try:
+                report = ingestor.ingest_files(paths, drop_dir)
+                print(f"{time.strftime('%H:%M:%S')} {report['files']} files, {report['rows']} new rows, "
+                      f"{report.get('fuzzy', 0)} fuzzy / {report.get('bert', 0)} bert pairs -> "
+                      f"version {report.get('version')} in {time.perf_counter() - start:.2f}s {report.get('timings', '')}")
+            except Exception:
+                traceback.print_exc()
+        elif once:
+            return
+        if not paths:
+            time.sleep(interval)
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest new news excerpt files into the data store while the app runs.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    watch_parser = subparsers.add_parser("watch", help="Poll a drop directory and ingest new files.")
+    watch_parser.add_argument("--drop-dir", default=DROP_DIR)
+    watch_parser.add_argument("--interval", type=float, default=POLL_INTERVAL)
+    watch_parser.add_argument("--once", action="store_true", help="Drain the drop directory, then exit.")
+
+    add_parser = subparsers.add_parser("add", help="Ingest the given files once (they are not moved).")
+    add_parser.add_argument("files", nargs="+")
+
+    for sub in (watch_parser, add_parser):
+        sub.add_argument("--store-dir", default=STORE_DIR)
+        sub.add_argument("--categorizer", choices=CATEGORIZERS, default="zero-shot",
+                         help="How Category_y is assigned when a file does not provide it.")
+        sub.add_argument("--top-k", type=int, default=TOP_K)
+        sub.add_argument("--min-similarity", type=float, default=MIN_SIMILARITY,
+                         help="Drop pairs scoring below this percentage (default: keep every top-k pair).")
+        sub.add_argument("--no-rerank", action="store_true",
+                         help="Keep the char n-gram cosine instead of re-scoring the top-k with SequenceMatcher.")
+    args = parser.parse_args()
+
+    options = {
+        "store_dir": args.store_dir, "categorizer": args.categorizer,
+        "matcher": Matcher(args.store_dir, args.top_k, args.min_similarity, not args.no_rerank),
+    }
+    if args.command == "watch":
+        watch(args.drop_dir, args.interval, args.once, **options)
+    else:
+        ingestor = Ingestor(**options)
+        frame = pd.concat([read_excerpts(path) for path in args.files], ignore_index=True)
+        print(json.dumps(ingestor.ingest(frame, source=",".join(map(os.path.basename, args.files))), indent=2))
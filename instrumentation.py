@@ -0,0 +1,205 @@
+import argparse
+import functools
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+#############################################
+# Settings
+#############################################
+
+# The log is opt-in: with INSTRUMENTATION_LOG set to a path (e.g. ./data/instrumentation.jsonl),
+# every rerun's spans are appended to it as one JSON line. Once the file reaches LOG_MAX_BYTES it
+# is rotated to <path>.1 (replacing the previous one), so at most two files are kept.
+# The debug panel is hidden unless DEBUG_PANEL=1 or the URL has ?debug=1.
+DEFAULT_LOG_FILE = "./data/instrumentation.jsonl"
+LOG_FILE = os.environ.get("INSTRUMENTATION_LOG", "")
+LOG_MAX_BYTES = int(os.environ.get("INSTRUMENTATION_LOG_MAX_BYTES", 10 * 2**20))
+DEBUG_PANEL = os.environ.get("DEBUG_PANEL", "0") == "1"
+HISTORY_SIZE = 20  # reruns kept per session for the debug panel
+
+#############################################
+# Spans
+#############################################
+
+class RerunTrace:
+    """
+    Timings of one script run: a flat list of spans in start order, each with its nesting
+    depth, plus the cache hits and misses seen during the run.
+    """
+
+    def __init__(self, session: str = None, view: str = None):
+        self.session = session
+        self.view = view
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans = []
+        self.cache = Counter()
+        self._depth = 0
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        record = {"name": name, "depth": self._depth, "ms": None, **attrs}
+        self.spans.append(record)
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["ms"] = round((time.perf_counter() - start) * 1000, 3)
+            self._depth -= 1
+
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self.start) * 1000, 3)
+
+    def to_dict(self) -> dict:
+        return {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "session": self.session,
+            "view": self.view,
+            "total_ms": self.total_ms(),
+            "spans": self.spans,
+            "cache": {f"{name}:{outcome}": n for (name, outcome), n in self.cache.items()},
+        }
+
+# Streamlit runs each session's script in its own thread, so the current trace is thread-local.
+_local = threading.local()
+_lock = threading.Lock()
+CACHE_TOTALS = Counter()  # process-wide (function, "hit"/"miss") counts
+
+def start_trace(session: str = None, view: str = None) -> RerunTrace:
+    _local.trace = RerunTrace(session, view)
+    return _local.trace
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+@contextmanager
+def span(name: str, **attrs):
+    """Times the block as a span of the current rerun; a no-op outside a traced run."""
+    trace = current_trace()
+    if trace is None:
+        yield None
+        return
+    with trace.span(name, **attrs) as record:
+        yield record
+
+#############################################
+# Cache Hit/Miss Counters
+#############################################
+
+def counted_cache(cache_decorator, name: str = None):
+    """
+    Applies a Streamlit cache decorator (e.g. st.cache_data(show_spinner=False)) and counts
+    hits and misses: the function body only runs on a miss, so the inner wrapper marks the call
+    as a miss and the outer one times it as a span tagged cache=hit/miss. The cache key and the
+    "_"-prefixed unhashed arguments are unchanged, since both wrappers keep the signature.
+    """
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            calls = getattr(_local, "cache_calls", None)
+            if calls:
+                calls[-1] = "miss"
+            return func(*args, **kwargs)
+
+        cached = cache_decorator(compute)
+
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            calls = _local.__dict__.setdefault("cache_calls", [])
+            calls.append("hit")
+            record = None
+            try:
+                with span(label) as record:
+                    return cached(*args, **kwargs)
+            finally:
+                outcome = calls.pop()
+                if record is not None:
+                    record["cache"] = outcome
+                    current_trace().cache[(label, outcome)] += 1
+                with _lock:
+                    CACHE_TOTALS[(label, outcome)] += 1
+
+        call.clear = cached.clear
+        return call
+    return decorate
+
+def cache_totals() -> dict:
+    """{function: {"hit": n, "miss": n}} since the process started."""
+    with _lock:
+        totals = {}
+        for (label, outcome), n in CACHE_TOTALS.items():
+            totals.setdefault(label, {"hit": 0, "miss": 0})[outcome] = n
+        return totals
+
+#############################################
+# Structured Log
+#############################################
+
+def write_log(trace: RerunTrace, path: str = LOG_FILE, max_bytes: int = LOG_MAX_BYTES) -> dict:
+    """
+    Appends the rerun as one JSON line to `path` (skipped if `path` is empty), rotating the file
+    to <path>.1 once it reaches `max_bytes`, and returns the entry.
+    """
+    entry = trace.to_dict()
+    if path:
+        line = json.dumps(entry, default=str) + "\n"
+        directory = os.path.dirname(path)
+        with _lock:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if max_bytes and os.path.exists(path) and os.path.getsize(path) >= max_bytes:
+                os.replace(path, path + ".1")
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+    return entry
+
+def read_log(path: str = LOG_FILE) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def summarize(entries: list):
+    """Per span name: count, mean, p95 and max milliseconds over the logged reruns, slowest first."""
+    import pandas as pd
+
+    spans = pd.DataFrame([
+        {"name": s["name"], "ms": s["ms"], "cache": s.get("cache")}
+        for entry in entries for s in entry["spans"] if s["ms"] is not None
+    ])
+    if spans.empty:
+        return spans
+    summary = spans.groupby("name")["ms"].agg(
+        count="count", mean_ms="mean", p95_ms=lambda ms: ms.quantile(0.95), max_ms="max",
+    )
+    misses = spans.assign(miss=spans["cache"] == "miss").groupby("name")["miss"].sum()
+    summary["cache_misses"] = misses.where(spans.groupby("name")["cache"].count() > 0)
+    return summary.sort_values("p95_ms", ascending=False).round(2)
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarise the dashboard's per-rerun span log.")
+    parser.add_argument("--log", default=LOG_FILE or DEFAULT_LOG_FILE)
+    parser.add_argument("--slowest", type=int, default=10, help="Also list the N slowest reruns.")
+    args = parser.parse_args()
+
+    entries = read_log(args.log)
+    print(f"{len(entries)} reruns in {args.log}")
+    if entries:
+        print(summarize(entries).to_string())
+        print(f"\nSlowest {args.slowest} reruns:")
+        for entry in sorted(entries, key=lambda e: e["total_ms"], reverse=True)[:args.slowest]:
+            top = max((s for s in entry["spans"] if s["depth"] == 0 and s["ms"] is not None),
+                      key=lambda s: s["ms"], default=None)
+            slowest = f"{top['name']} {top['ms']:.0f} ms" if top else "-"
+            print(f"  {entry['time']}  {entry['view'] or '-':<32} {entry['total_ms']:9.1f} ms  (top: {slowest})")
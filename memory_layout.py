@@ -0,0 +1,189 @@
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+#############################################
+# Settings
+#############################################
+
+# Repeated string columns of the similarity frames, stored as categoricals. Both methods'
+# frames share one dtype (and so one categories array) per column.
+CATEGORICAL_COLUMNS = ["news_Link", "news_Category_x", "news_Category_y", "wikileaks_Category"]
+# Per-article columns, identical on every pair row of a news link; rows share one value per link.
+PER_LINK_COLUMNS = ["news_entities", "news_relationships"]
+TEXT_COLUMN = "wikileaks_Text"
+KEY_COLUMN = "wikileaks_key"
+
+#############################################
+# Compact Similarity Frames
+#############################################
+
+def shared_dtype(frames, column: str) -> pd.CategoricalDtype:
+    """One categorical dtype (sorted categories) covering `column` in all frames."""
+    values = [df[column].dropna().unique() for df in frames if column in df.columns]
+    return pd.CategoricalDtype(pd.Index(np.concatenate(values) if values else []).unique().sort_values())
+
+def share_per_link(frames, column: str) -> dict:
+    """news_Link -> the first value of `column` seen for that link across all frames."""
+    values = {}
+    for df in frames:
+        if column in df.columns:
+            firsts = df.drop_duplicates(subset="news_Link")
+            for link, value in zip(firsts["news_Link"], firsts[column]):
+                values.setdefault(link, value)
+    return values
+
+def wikileaks_lookups(wikileaks_df: pd.DataFrame):
+    """key -> text and key -> category Series; each Wikileaks text is held once, here."""
+    keys = pd.Index(wikileaks_df["key"].to_numpy(), name="key")
+    key_to_text = pd.Series(wikileaks_df["Text"].to_numpy(), index=keys, name="Text")
+    key_to_category = pd.Series(wikileaks_df["Category"].astype("category").to_numpy(), index=keys, name="Category")
+    return key_to_text, key_to_category
+
+def text_keys(values: pd.Series, key_to_text: pd.Series):
+    """
+    Maps a wikileaks_Text column to document keys. Columns that already hold keys (the
+    Sentence-BERT results) are kept; texts are looked up in key_to_text (the last key wins
+    for duplicate texts, as with a text -> key dict). Texts missing from the mapping get new
+    keys, which are appended to the returned key_to_text.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(), key_to_text
+    text_to_key = pd.Series(key_to_text.index.to_numpy(), index=pd.Index(key_to_text.to_numpy()))
+    text_to_key = text_to_key[~text_to_key.index.duplicated(keep="last")]
+    missing = pd.Index(values.dropna().unique()).difference(text_to_key.index)
+    if len(missing):
+        start = int(key_to_text.index.max()) + 1 if len(key_to_text) else 1
+        new_keys = np.arange(start, start + len(missing))
+        key_to_text = pd.concat([key_to_text, pd.Series(missing.to_numpy(), index=pd.Index(new_keys, name="key"))])
+        text_to_key = pd.concat([text_to_key, pd.Series(new_keys, index=missing)])
+    return text_to_key.reindex(values).fillna(-1).to_numpy(dtype=np.int64), key_to_text
+
+def compact_similarity_frames(frames: dict, wikileaks_df: pd.DataFrame):
+    """
+    Converts the per-method similarity frames to a memory-lean layout:
+    repeated strings become categoricals with shared dtypes, the per-article entity and
+    relationship lists are held once per link (every row of a link references the same
+    object), wikileaks_Text is replaced by an integer wikileaks_key into key_to_text, and
+    content_similarity is downcast to float32.
+    Returns (frames, key_to_text, key_to_category).
+    """
+    key_to_text, key_to_category = wikileaks_lookups(wikileaks_df)
+    dtypes = {column: shared_dtype(frames.values(), column) for column in CATEGORICAL_COLUMNS}
+    compact, key_to_text = compact_frames(frames, dtypes, key_to_text)
+    return compact, key_to_text, key_to_category
+
+def extended_dtype(dtype: pd.CategoricalDtype, frames, column: str) -> pd.CategoricalDtype:
+    """
+    `dtype` with the values of `column` it lacks appended (sorted) to its categories. Existing
+    categories keep their codes, so frames already using `dtype` convert without recoding.
+    """
+    values = [df[column].dropna().unique() for df in frames if column in df.columns]
+    new = pd.Index(np.concatenate(values) if values else []).unique().difference(dtype.categories)
+    return pd.CategoricalDtype(dtype.categories.append(new.sort_values())) if len(new) else dtype
+
+def compact_frames(frames: dict, dtypes: dict, key_to_text: pd.Series):
+    """The per-frame part of compact_similarity_frames, with given dtypes. Returns (frames, key_to_text)."""
+    per_link = {column: share_per_link(frames.values(), column) for column in PER_LINK_COLUMNS}
+    compact = {}
+    for method, df in frames.items():
+        df = df.copy()
+        for column, values in per_link.items():
+            if column in df.columns:
+                df[column] = pd.Series([values.get(link) for link in df["news_Link"]], index=df.index, dtype=object)
+        for column, dtype in dtypes.items():
+            if column in df.columns:
+                df[column] = df[column].astype(dtype)
+        if TEXT_COLUMN in df.columns:
+            keys, key_to_text = text_keys(df.pop(TEXT_COLUMN), key_to_text)
+            df[KEY_COLUMN] = pd.to_numeric(pd.Series(keys, index=df.index), downcast="integer")
+        if "content_similarity" in df.columns:
+            df["content_similarity"] = df["content_similarity"].astype(np.float32)
+        compact[method] = df
+    return compact, key_to_text
+
+#############################################
+# Memory Report
+#############################################
+
+def _object_bytes(value, seen: dict) -> int:
+    if id(value) in seen:
+        return 0
+    # Keep a reference, so the id of a temporary (e.g. a column Series) is not reused.
+    seen[id(value)] = value
+    if isinstance(value, pd.DataFrame):
+        return sum(_object_bytes(value[column], seen) for column in value.columns) + _object_bytes(value.index, seen)
+    if isinstance(value, pd.Series):
+        values = value.to_numpy() if value.dtype == object else value.array
+        return _object_bytes(values, seen) + _object_bytes(value.index, seen)
+    if isinstance(value, pd.Categorical):
+        # Categories are shared between frames and counted once.
+        return value.codes.nbytes + _object_bytes(value.categories, seen)
+    if isinstance(value, pd.Index):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return value.nbytes + sum(_object_bytes(item, seen) for item in value)
+        return value.nbytes
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_object_bytes(k, seen) + _object_bytes(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_object_bytes(item, seen) for item in value)
+    return sys.getsizeof(value)
+
+def deep_bytes(objects: dict) -> dict:
+    """
+    Bytes held by each named object, following references; an object (e.g. a shared
+    categories array) reachable from several entries is counted at its first occurrence only.
+    """
+    seen = {}
+    return {name: _object_bytes(value, seen) for name, value in objects.items()}
+
+def memory_report(before: dict, after: dict) -> pd.DataFrame:
+    """Before/after bytes per component, with a total row."""
+    before, after = deep_bytes(before), deep_bytes(after)
+    report = pd.DataFrame({"before_bytes": pd.Series(before), "after_bytes": pd.Series(after)}).fillna(0).astype(np.int64)
+    report.loc["total"] = report.sum()
+    report["after/before"] = (report["after_bytes"] / report["before_bytes"].replace(0, np.nan)).round(3)
+    return report
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    from data_store import load_table
+
+    parser = argparse.ArgumentParser(description="Per-worker memory of the similarity data, before and after compaction.")
+    parser.add_argument("--columns", nargs="+", default=[
+        "news_Link", "news_entities", "news_relationships", "news_Category_x", "news_Category_y",
+        "wikileaks_Text", "wikileaks_Category", "content_similarity",
+    ], help="Columns loaded per similarity table (the app's SIMILARITY_COLUMNS).")
+    args = parser.parse_args()
+
+    frames = {"fuzzy": load_table("fuzzy", columns=args.columns), "bert": load_table("bert", columns=args.columns)}
+    wikileaks_df = load_table("wikileaks", columns=["key", "Text", "Category"])
+
+    # Previous layout: object columns plus plain dict copies of the Wikileaks text.
+    before = {
+        "fuzzy_df": frames["fuzzy"],
+        "bert_df": frames["bert"],
+        "key_to_text": dict(zip(wikileaks_df["key"], wikileaks_df["Text"])),
+        "key_to_category": dict(zip(wikileaks_df["key"], wikileaks_df["Category"])),
+        "text_to_key": dict(zip(wikileaks_df["Text"], wikileaks_df["key"])),
+    }
+    compact, key_to_text, key_to_category = compact_similarity_frames(frames, wikileaks_df)
+    after = {
+        "fuzzy_df": compact["fuzzy"],
+        "bert_df": compact["bert"],
+        "key_to_text": key_to_text,
+        "key_to_category": key_to_category,
+    }
+    report = memory_report(before, after)
+    print(report.to_string())
+    print(f"Per worker: {report.loc['total', 'before_bytes'] / 2**20:.1f} MiB -> "
+          f"{report.loc['total', 'after_bytes'] / 2**20:.1f} MiB")
@@ -0,0 +1,413 @@
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+#############################################
+# Settings
+#############################################
+
+# Stage fingerprints and file hashes from the last run. File hashes are reused while a file's
+# (size, mtime) is unchanged, so a no-op refresh only stats the files.
+STATE_FILE = "./data/pipeline_state.json"
+WORK_DIR = "./data/pipeline"
+DEFAULT_WORKERS = 2
+HASH_BLOCK = 1 << 20
+
+def _work(name: str) -> str:
+    return os.path.join(WORK_DIR, name)
+
+#############################################
+# Stage Definitions
+#############################################
+
+class Stage:
+    """
+    One pipeline step: `func(inputs, outputs, **params)` reads the files in `inputs` and writes
+    every file in `outputs` (both {role: path} dicts). Stages depend on the stages that produce
+    their input files; stages with no path between them may run at the same time.
+    """
+
+    def __init__(self, name: str, func, inputs: dict, outputs: dict, params: dict = None):
+        self.name = name
+        self.func = func
+        self.inputs = inputs
+        self.outputs = outputs
+        self.params = params or {}
+
+    def code_hash(self) -> str:
+        """Hash of the stage function's source, so editing a stage reruns it."""
+        try:
+            source = inspect.getsource(self.func)
+        except (OSError, TypeError):
+            source = self.func.__qualname__
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+    def fingerprint(self, input_hashes: dict) -> str:
+        payload = {
+            "code": self.code_hash(),
+            "params": self.params,
+            "inputs": {role: input_hashes[path] for role, path in sorted(self.inputs.items())},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+#############################################
+# Content Hashes and State
+#############################################
+
+class PipelineState:
+    """
+    The state file: {"files": {path: [size, mtime_ns, sha256]}, "stages": {name: record}}.
+    Writes are serialised by a lock and replace the file atomically.
+    """
+
+    def __init__(self, path: str = STATE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {"files": {}, "stages": {}}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.data.update(json.load(f))
+
+    def file_hash(self, path: str):
+        """sha256 of a file's content (None if it does not exist), recomputed only if its size or mtime changed."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        with self.lock:
+            cached = self.data["files"].get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK), b""):
+                digest.update(block)
+        with self.lock:
+            self.data["files"][path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def stage(self, name: str) -> dict:
+        with self.lock:
+            return self.data["stages"].get(name)
+
+    def record(self, name: str, record: dict):
+        with self.lock:
+            self.data["stages"][name] = record
+        self.save()
+
+    def save(self):
+        with self.lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, indent=2)
+            os.replace(temp_path, self.path)
+
+#############################################
+# Runner
+#############################################
+
+def upstream(stages: list) -> dict:
+    """{stage name: names of the stages producing its inputs}."""
+    producers = {path: stage.name for stage in stages for path in stage.outputs.values()}
+    return {
+        stage.name: {producers[path] for path in stage.inputs.values() if path in producers and producers[path] != stage.name}
+        for stage in stages
+    }
+
+def is_current(stage: Stage, state: PipelineState) -> tuple:
+    """
+    (up to date?, fingerprint, reason). A stage is current if its fingerprint (code, params and
+    input content hashes) matches the last successful run and its outputs are unchanged since.
+    """
+    input_hashes = {path: state.file_hash(path) for path in stage.inputs.values()}
+    missing = [path for path, digest in input_hashes.items() if digest is None]
+    if missing:
+        return False, None, f"missing input {missing[0]}"
+    fingerprint = stage.fingerprint(input_hashes)
+    record = state.stage(stage.name)
+    if record is None:
+        return False, fingerprint, "never run"
+    if record["fingerprint"] != fingerprint:
+        return False, fingerprint, "inputs, code or parameters changed"
+    for path, digest in record["outputs"].items():
+        if state.file_hash(path) != digest:
+            return False, fingerprint, f"output {path} missing or modified"
+    return True, fingerprint, "up to date"
+
+def run_stage(stage: Stage, state: PipelineState, fingerprint: str) -> dict:
+    for path in stage.outputs.values():
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+    stage.func(stage.inputs, stage.outputs, **stage.params)
+    seconds = time.perf_counter() - start
+    record = {
+        "fingerprint": fingerprint,
+        "outputs": {path: state.file_hash(path) for path in stage.outputs.values()},
+        "seconds": round(seconds, 3),
+        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    missing = [path for path, digest in record["outputs"].items() if digest is None]
+    if missing:
+        raise RuntimeError(f"Stage '{stage.name}' did not write {missing}")
+    state.record(stage.name, record)
+    return record
+
+def run_pipeline(stages: list = None, targets: list = None, force: list = None, workers: int = DEFAULT_WORKERS,
+                 dry_run: bool = False, state_path: str = STATE_FILE) -> dict:
+    """
+    Runs `targets` (default: every stage) and their upstream stages. A stage is checked once all
+    of its upstream stages have finished, and reruns only if it is not current (see is_current)
+    or is listed in `force`. Independent stages run concurrently on `workers` threads; a failed
+    stage skips everything downstream of it. Returns {stage name: status}.
+    """
+    stages = stages or default_stages()
+    by_name = {stage.name: stage for stage in stages}
+    deps = upstream(stages)
+    selected, pending = set(), list(targets or by_name)
+    while pending:
+        name = pending.pop()
+        if name not in by_name:
+            raise KeyError(f"Unknown stage {name!r}; expected one of {sorted(by_name)}")
+        if name not in selected:
+            selected.add(name)
+            pending.extend(deps[name])
+    force = set(force or [])
+    state = PipelineState(state_path)
+    status, in_flight = {}, {}
+
+    def ready():
+        return [name for name in by_name if name in selected and name not in status
+                and name not in in_flight.values() and deps[name] <= set(status)]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while len(status) < len(selected):
+            for name in ready():
+                if any(status[dep] in ("failed", "skipped") for dep in deps[name]):
+                    status[name] = "skipped"
+                    print(f"[{name}] skipped: an upstream stage failed")
+                    continue
+                stage = by_name[name]
+                current, fingerprint, reason = is_current(stage, state)
+                if dry_run and any(status[dep] == "would run" for dep in deps[name]):
+                    status[name] = "would run"
+                    print(f"[{name}] would run (if upstream outputs change)")
+                elif current and name not in force:
+                    status[name] = "cached"
+                    print(f"[{name}] up to date")
+                elif fingerprint is None:
+                    # Inputs not available here (e.g. workbooks not checked out): existing outputs are
+                    # used as they are, so downstream stages can still run from them.
+                    if all(os.path.exists(path) for path in stage.outputs.values()):
+                        status[name] = "kept"
+                        print(f"[{name}] {reason}; keeping existing outputs")
+                    else:
+                        status[name] = "missing"
+                        print(f"[{name}] cannot run: {reason}")
+                elif dry_run:
+                    status[name] = "would run"
+                    print(f"[{name}] would run ({'forced' if current else reason})")
+                else:
+                    print(f"[{name}] running ({'forced' if current else reason})")
+                    in_flight[pool.submit(run_stage, stage, state, fingerprint)] = name
+            if not in_flight:
+                if not ready() and len(status) < len(selected):
+                    raise RuntimeError(f"Stage dependencies form a cycle: {sorted(selected - set(status))}")
+                continue
+            completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in completed:
+                name = in_flight.pop(future)
+                try:
+                    record = future.result()
+                except Exception as e:
+                    status[name] = "failed"
+                    print(f"[{name}] failed: {type(e).__name__}: {e}")
+                else:
+                    status[name] = "ran"
+                    print(f"[{name}] done in {record['seconds']:.1f}s")
+    state.save()
+    return status
+
+#############################################
+# Pipeline Stages (from categorise_data.ipynb)
+#############################################
+
+def write_frame(df: pd.DataFrame, path: str):
+    """Writes a pickle, Parquet or Excel file under a temporary name, then renames it into place."""
+    root, ext = os.path.splitext(path)
+    temp_path = f"{root}.tmp{ext}"
+    if ext == ".pkl":
+        df.to_pickle(temp_path)
+    elif ext == ".parquet":
+        df.to_parquet(temp_path, index=False)
+    else:
+        df.to_excel(temp_path, index=False)
+    os.replace(temp_path, path)
+
+def read_excel_stage(inputs: dict, outputs: dict):
+    """Reads a source workbook once; later stages read the pickled copy, which loads in a fraction of the time."""
+    write_frame(pd.read_excel(inputs["source"]), outputs["table"])
+
+def categorize_stage(inputs: dict, outputs: dict, id_column: str, batch_size: int = 16):
+    """Zero-shot Category per text (categorization_job), resuming from its checkpoint log."""
+    from categorization_job import categorize
+
+    df = pd.read_pickle(inputs["table"])[[id_column, "Text"]]
+    result = categorize(df["Text"], f"{outputs['categories']}.checkpoint.jsonl", batch_size=batch_size)
+    write_frame(df.assign(Category=result["Category"].values), outputs["categories"])
+
+def merge_category_stage(inputs: dict, outputs: dict, id_column: str, add_keys: bool = False):
+    """
+    Appends the zero-shot Category to the processed table on (id, Text), as in the notebook's
+    merge cells; a processed table that already has a Category ends up with Category_x
+    (original) and Category_y (zero-shot).
+    """
+    processed = pd.read_pickle(inputs["processed"])
+    categories = pd.read_pickle(inputs["categories"])
+    for df in (processed, categories):
+        df[id_column] = df[id_column].str.strip()
+        df["Text"] = df["Text"].str.strip()
+    merged = processed.merge(categories[[id_column, "Text", "Category"]], on=[id_column, "Text"], how="left")
+    if add_keys:
+        merged["key"] = np.arange(1, len(merged) + 1)
+    write_frame(merged, outputs["table"])
+
+def fuzzy_stage(inputs: dict, outputs: dict, top_k: int = 30, min_similarity: float = None, rerank: bool = True):
+    """
+    Char n-gram matching with SequenceMatcher re-ranking of the top-k (text_matching). Every
+    top-k pair is kept by default: excerpt-to-document ratios stay in the single digits, so a
+    percentage threshold would leave fuzzy_clean.pkl empty.
+    """
+    from text_matching import match_corpora
+
+    news_df, wikileaks_df = pd.read_pickle(inputs["news"]), pd.read_pickle(inputs["wikileaks"])
+    write_frame(match_corpora(news_df, wikileaks_df, top_k, min_similarity, rerank), outputs["pairs"])
+
+def sbert_stage(inputs: dict, outputs: dict, top_k: int = 30):
+    """
+    Sentence-BERT matching through the embedding cache and a flat index, in the fuzzy output
+    schema; wikileaks_Text holds the document key, as in bert_clean.pkl.
+    """
+    from data_store import to_tuples
+    from text_matching import FUZZY_COLUMNS
+    from vector_index import FlatIndex, encode_texts
+
+    news_df, wikileaks_df = pd.read_pickle(inputs["news"]), pd.read_pickle(inputs["wikileaks"])
+    index = FlatIndex(encode_texts(wikileaks_df["Text"].fillna("").astype(str)), np.arange(len(wikileaks_df)),
+                      normalized=True)
+    positions, scores = index.search(encode_texts(news_df["Text"].fillna("").astype(str)), k=top_k)
+    k = positions.shape[1]
+    news_rows = news_df.iloc[np.repeat(np.arange(len(news_df)), k)]
+    wiki_rows = wikileaks_df.iloc[positions.ravel()]
+    news_entities, wiki_entities = news_rows["entities"].map(to_tuples), wiki_rows["entities"].map(to_tuples)
+    news_rels, wiki_rels = news_rows["relationships"].map(to_tuples), wiki_rows["relationships"].map(to_tuples)
+    pairs = pd.DataFrame({
+        "news_Link": news_rows["Link"].values,
+        "news_Text": news_rows["Text"].values,
+        "news_entities": news_entities.values,
+        "news_relationships": news_rels.values,
+        "news_Category_x": news_rows["Category_x"].values,
+        "news_Category_y": news_rows["Category_y"].values,
+        "wikileaks_Text": wiki_rows["key"].values,
+        "wikileaks_entities": wiki_entities.values,
+        "wikileaks_relationships": wiki_rels.values,
+        "wikileaks_Category": wiki_rows["Category"].values,
+        "common_entities": [list(set(a) & set(b)) for a, b in zip(news_entities, wiki_entities)],
+        "common_relationships": [list(set(a) & set(b)) for a, b in zip(news_rels, wiki_rels)],
+        "content_similarity": scores.ravel().astype(np.float64) * 100,
+    }, columns=FUZZY_COLUMNS)
+    write_frame(pairs, outputs["pairs"])
+
+def top5_stage(inputs: dict, outputs: dict, k: int = 5):
+    """
+    Top-k matches per news link of each method (streaming top-k), rank-joined into one row per
+    (news_Link, rank) with both methods side by side (combined_top5_results.xlsx).
+    """
+    from topk import rank_join, resolve_wikileaks_keys, top_k_frame
+
+    wikileaks_df = pd.read_pickle(inputs["wikileaks"])
+    key_to_text = pd.Series(wikileaks_df["Text"].to_numpy(), index=wikileaks_df["key"].to_numpy())
+    tops = {
+        method: resolve_wikileaks_keys(top_k_frame(pd.read_pickle(inputs[method]), k), key_to_text)
+        for method in ("fuzzy", "bert")
+    }
+    write_frame(rank_join(tops), outputs["combined"])
+
+def store_stage(inputs: dict, outputs: dict):
+    """Rebuilds the columnar data store the app reads from the stage outputs."""
+    from data_store import build_store
+
+    store_dir = os.path.dirname(outputs["manifest"])
+    build_store(store_dir, {name: [path] for name, path in inputs.items()})
+
+def default_stages() -> list:
+    """
+    The notebook chain: read workbooks -> zero-shot category -> merge Category into the processed
+    tables -> fuzzy / Sentence-BERT matching -> combined top 5 and the data store the app reads.
+    """
+    from data_store import STORE_DIR, MANIFEST_FILE
+
+    stages = []
+    for corpus, id_column, source, processed, table in [
+        ("news", "Link", "./data/news_excerpts_parsed.xlsx", "./data/processed_news_excerpts_parsed.xlsx",
+         "./data/parsed_news_clean.pkl"),
+        ("wikileaks", "PDF Path", "./data/wikileaks_parsed.xlsx", "./data/processed_wikileaks_parsed.xlsx",
+         "./data/wikileaks_mapping_clean.pkl"),
+    ]:
+        stages += [
+            Stage(f"read_{corpus}", read_excel_stage, {"source": source}, {"table": _work(f"{corpus}_parsed.pkl")}),
+            Stage(f"read_processed_{corpus}", read_excel_stage, {"source": processed},
+                  {"table": _work(f"processed_{corpus}.pkl")}),
+            Stage(f"categorize_{corpus}", categorize_stage, {"table": _work(f"{corpus}_parsed.pkl")},
+                  {"categories": _work(f"{corpus}_categories.pkl")}, {"id_column": id_column}),
+            Stage(f"merge_{corpus}_category", merge_category_stage,
+                  {"processed": _work(f"processed_{corpus}.pkl"), "categories": _work(f"{corpus}_categories.pkl")},
+                  {"table": table}, {"id_column": id_column, "add_keys": corpus == "wikileaks"}),
+        ]
+    corpora = {"news": "./data/parsed_news_clean.pkl", "wikileaks": "./data/wikileaks_mapping_clean.pkl"}
+    stages += [
+        Stage("fuzzy", fuzzy_stage, corpora, {"pairs": "./data/fuzzy_clean.pkl"}),
+        Stage("sbert", sbert_stage, corpora, {"pairs": "./data/bert_clean.pkl"}),
+        Stage("top5", top5_stage, {"fuzzy": "./data/fuzzy_clean.pkl", "bert": "./data/bert_clean.pkl",
+                                   "wikileaks": corpora["wikileaks"]}, {"combined": "./combined_top5_results.xlsx"}),
+        Stage("store", store_stage, {"fuzzy": "./data/fuzzy_clean.pkl", "bert": "./data/bert_clean.pkl", **corpora},
+              {"manifest": os.path.join(STORE_DIR, MANIFEST_FILE)}),
+    ]
+    return stages
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    stage_names = [stage.name for stage in default_stages()]
+    parser = argparse.ArgumentParser(description="Incremental runner for the categorisation and matching pipeline.")
+    parser.add_argument("command", choices=["run", "status"], help="status: report what a run would do.")
+    parser.add_argument("targets", nargs="*", help=f"Stages to bring up to date, with their upstream stages "
+                                                   f"(default: all). One of: {', '.join(stage_names)}.")
+    parser.add_argument("--force", nargs="+", choices=stage_names, default=[], help="Rerun these stages even if current.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Stages run at the same time.")
+    parser.add_argument("--state", default=STATE_FILE)
+    args = parser.parse_args()
+
+    unknown = sorted(set(args.targets) - set(stage_names))
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+    start = time.perf_counter()
+    status = run_pipeline(targets=args.targets or None, force=args.force, workers=args.workers,
+                          dry_run=args.command == "status", state_path=args.state)
+    counts = pd.Series(status).value_counts()
+    print(", ".join(f"{n} {label}" for label, n in counts.items()) + f" ({time.perf_counter() - start:.1f}s)")
+    raise SystemExit(1 if "failed" in status.values() else 0)
@@ -0,0 +1,183 @@
+import argparse
+import re
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+#############################################
+# Settings
+#############################################
+
+TOKEN_PATTERN = r"\w+"
+K1 = 1.2
+B = 0.75
+PAGE_SIZE = 10
+PREFIX_MIN_LENGTH = 2  # shorter query tokens only match whole words
+SNIPPET_WIDTH = 120
+
+def tokenize(text: str) -> list:
+    return re.findall(TOKEN_PATTERN, str(text).lower())
+
+def _term_frequencies(texts: pd.Series) -> tuple:
+    """(sorted vocabulary, (documents x terms) CSR term counts) of the texts."""
+    tokens = texts.str.lower().str.findall(TOKEN_PATTERN).explode().dropna()
+    term_ids, vocabulary = pd.factorize(tokens, sort=True)
+    tf = sparse.csr_matrix(
+        (np.ones(len(term_ids), dtype=np.float32), (tokens.index.to_numpy(), term_ids)),
+        shape=(len(texts), len(vocabulary)),
+    )
+    tf.sum_duplicates()
+    return np.asarray(vocabulary, dtype=object), tf
+
+#############################################
+# BM25 Inverted Index
+#############################################
+
+class SearchIndex:
+    """
+    BM25 full-text index over a list of documents, built once at load time.
+    Term weights are precomputed into a sparse (documents x terms) matrix whose columns are in
+    sorted vocabulary order, so a query token is one column and a prefix is one contiguous
+    column range (found with searchsorted). A token scores each document by its best matching
+    term (the word itself or a word it prefixes); token scores are summed.
+    """
+
+    def __init__(self, texts, keys=None, k1: float = K1, b: float = B):
+        texts = pd.Series(list(texts), dtype=object).fillna("").astype(str)
+        self.k1, self.b = k1, b
+        self.texts = texts.to_numpy()
+        self.keys = np.asarray(keys) if keys is not None else np.arange(len(texts))
+        self.key_positions = {key: position for position, key in enumerate(self.keys)}
+        self.vocabulary, self.tf = _term_frequencies(texts)
+        self._weigh()
+
+    def _weigh(self):
+        """BM25 term weight of every (document, term) pair, computed on the non-zeros of tf only."""
+        tf, k1, b = self.tf, self.k1, self.b
+        lengths = np.asarray(tf.sum(axis=1)).ravel()
+        average = lengths.mean() if len(lengths) and lengths.mean() > 0 else 1.0
+        df = np.bincount(tf.indices, minlength=len(self.vocabulary))
+        idf = np.log1p((len(self.texts) - df + 0.5) / (df + 0.5)).astype(np.float32)
+        norm = np.repeat(k1 * (1 - b + b * lengths / average), np.diff(tf.indptr)).astype(np.float32)
+        weights = tf.copy()
+        weights.data = idf[tf.indices] * tf.data * (k1 + 1) / (tf.data + norm)
+        self.weights = weights.tocsc()
+
+    def extend(self, texts, keys):
+        """
+        A new index with `texts` (keyed by `keys`) added after the current documents. Only the
+        new texts are tokenized; the vocabularies are merged by remapping term columns, and the
+        BM25 weights (whose IDF and average length depend on the whole corpus) are recomputed
+        from the term frequencies. The current index is left unchanged.
+        """
+        texts = pd.Series(list(texts), dtype=object).fillna("").astype(str)
+        vocabulary, tf = _term_frequencies(texts)
+        merged = np.union1d(self.vocabulary, vocabulary).astype(object)
+        old_tf, new_tf = (
+            sparse.csr_matrix((m.data, np.searchsorted(merged, v)[m.indices], m.indptr), shape=(m.shape[0], len(merged)))
+            for m, v in ((self.tf, self.vocabulary), (tf, vocabulary))
+        )
+
+        index = SearchIndex.__new__(SearchIndex)
+        index.k1, index.b = self.k1, self.b
+        index.texts = np.concatenate([self.texts, texts.to_numpy()])
+        index.keys = np.concatenate([self.keys, np.asarray(keys)])
+        index.key_positions = {**self.key_positions,
+                               **{key: len(self.keys) + i for i, key in enumerate(np.asarray(keys))}}
+        index.vocabulary = merged
+        index.tf = sparse.vstack([old_tf, new_tf], format="csr")
+        index._weigh()
+        return index
+
+    def __len__(self):
+        return len(self.texts)
+
+    def term_range(self, token: str, prefix: bool = True) -> tuple:
+        """[start, stop) of the vocabulary columns matching `token` (as a word, or as a prefix)."""
+        start = int(np.searchsorted(self.vocabulary, token, side="left"))
+        if prefix and len(token) >= PREFIX_MIN_LENGTH:
+            stop = int(np.searchsorted(self.vocabulary, token + "\U0010ffff", side="left"))
+        else:
+            stop = start + int(start < len(self.vocabulary) and self.vocabulary[start] == token)
+        return start, stop
+
+    def scores(self, query: str, prefix: bool = True) -> np.ndarray:
+        """Dense BM25 score per document (0 for documents matching no query token)."""
+        total = np.zeros(len(self), dtype=np.float32)
+        for token in dict.fromkeys(tokenize(query)):
+            start, stop = self.term_range(token, prefix)
+            if stop > start:
+                total += self.weights[:, start:stop].max(axis=1).toarray().ravel()
+        return total
+
+    def search(self, query: str, page: int = 1, page_size: int = PAGE_SIZE, prefix: bool = True) -> dict:
+        """
+        One page of ranked hits: {"keys", "positions", "scores", "total", "page", "pages"}.
+        An empty query lists every document in corpus order. Pages are 1-based and clamped
+        to the available range.
+        """
+        if tokenize(query):
+            scores = self.scores(query, prefix)
+            matches = np.flatnonzero(scores > 0)
+            # Highest score first; ties keep corpus order.
+            ranked = matches[np.argsort(-scores[matches], kind="stable")]
+        else:
+            scores = np.zeros(len(self), dtype=np.float32)
+            ranked = np.arange(len(self))
+        pages = max(1, -(-len(ranked) // page_size))
+        page = min(max(1, int(page)), pages)
+        positions = ranked[(page - 1) * page_size:page * page_size]
+        return {
+            "keys": self.keys[positions].tolist(),
+            "positions": positions,
+            "scores": scores[positions],
+            "total": len(ranked),
+            "page": page,
+            "pages": pages,
+        }
+
+    def text(self, key) -> str:
+        """O(1) key -> document text."""
+        position = self.key_positions.get(key)
+        return self.texts[position] if position is not None else None
+
+    def snippet(self, key, query: str = "", width: int = SNIPPET_WIDTH) -> str:
+        """About `width` characters of a document, around the first query token it contains."""
+        text = self.text(key) or ""
+        start = 0
+        tokens = tokenize(query)
+        if tokens:
+            match = re.search(r"\b(" + "|".join(re.escape(t) for t in tokens) + r")", text, flags=re.IGNORECASE)
+            if match:
+                start = max(0, match.start() - width // 4)
+        end = start + width
+        return ("…" if start else "") + text[start:end].strip() + ("…" if end < len(text) else "")
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    from data_store import load_table
+
+    parser = argparse.ArgumentParser(description="BM25 search over the news excerpts or Wikileaks documents.")
+    parser.add_argument("query")
+    parser.add_argument("--corpus", choices=["news", "wikileaks"], default="news")
+    parser.add_argument("--page", type=int, default=1)
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    args = parser.parse_args()
+
+    key_column = "Link" if args.corpus == "news" else "key"
+    table = load_table(args.corpus, columns=[key_column, "Text"])
+    start = time.perf_counter()
+    index = SearchIndex(table["Text"], table[key_column])
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    results = index.search(args.query, args.page, args.page_size)
+    print(f"Indexed {len(index)} documents ({len(index.vocabulary)} terms) in {built * 1000:.0f} ms; "
+          f"{results['total']} hits in {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"(page {results['page']} of {results['pages']})")
+    for key, score in zip(results["keys"], results["scores"]):
+        print(f"  {score:7.3f}  {key}\n           {index.snippet(key, args.query)}")
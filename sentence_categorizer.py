@@ -0,0 +1,205 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from scipy import sparse
+
+#############################################
+# Settings
+#############################################
+
+# Define categories and keywords
+CATEGORIES = {
+    "Allegations": ["allegation", "irregularity", "accused", "suspected", "claimed"],
+    "Criminal Violations": ["criminal", "violation", "illegal", "fraud", "offense"],
+    "Sentencing": ["sentenced", "punishment", "penalty", "fined", "jailed"],
+    "Background Information": ["background", "context", "history", "information"],
+}
+OTHER = "Other"
+CHUNK_SIZE = 10000  # documents per chunk when splitting and writing
+
+#############################################
+# Vectorized Keyword Engine
+#############################################
+
+class KeywordCategorizer:
+    """
+    Scores a whole column of sentences against a fixed keyword vocabulary in one pass per keyword
+    over one Arrow string buffer (no per-sentence Python). Counts are plain substring
+    counts of the lower-cased sentence, as in `sentence.lower().count(keyword)`.
+
+    mode="first": the first category (in definition order) with any keyword, else "Other".
+    mode="max": the category with the highest total count (ties go to the earlier category,
+    as with `max(scores, key=scores.get)`).
+    """
+
+    def __init__(self, categories: dict = None):
+        categories = categories or CATEGORIES
+        self.categories = list(categories)
+        self.vocabulary = []
+        rows, cols = [], []
+        for c, keywords in enumerate(categories.values()):
+            for keyword in keywords:
+                rows.append(len(self.vocabulary))
+                cols.append(c)
+                self.vocabulary.append(keyword.lower())
+        # keyword -> category membership, so category scores are one sparse product.
+        self.membership = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(len(self.vocabulary), len(self.categories))
+        )
+
+    def keyword_counts(self, sentences) -> sparse.csr_matrix:
+        """
+        Sparse (sentences x keywords) matrix of substring counts. The lower-cased sentences are
+        NUL-terminated in one Arrow buffer, which is searched once per keyword with bytes.find;
+        match positions are mapped to sentences with a searchsorted over the Arrow offsets.
+        Matches never span sentences, since no keyword contains the terminator.
+        """
+        lowered = pc.utf8_lower(pa.array(pd.Series(sentences, dtype=object).fillna(""), type=pa.large_string()))
+        terminator, empty = pa.scalar("\0", pa.large_string()), pa.scalar("", pa.large_string())
+        terminated = pc.binary_join_element_wise(pc.replace_substring(lowered, "\0", " "), terminator, empty)
+        offsets = np.frombuffer(terminated.buffers()[1], dtype=np.int64)[terminated.offset:terminated.offset + len(terminated) + 1]
+        buffer = terminated.buffers()[2]
+        data = buffer.to_pybytes()[:offsets[-1]] if buffer is not None else b""
+
+        rows, cols = [], []
+        for k, keyword in enumerate(self.vocabulary):
+            needle = keyword.encode("utf-8")
+            positions = []
+            pos = data.find(needle)
+            while pos != -1:
+                positions.append(pos)
+                pos = data.find(needle, pos + len(needle))
+            rows.append(np.searchsorted(offsets, positions, side="right") - 1)
+            cols.append(np.full(len(positions), k))
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        cols = np.concatenate(cols) if cols else np.empty(0, dtype=np.int64)
+        counts = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(len(terminated), len(self.vocabulary))
+        )
+        counts.sum_duplicates()
+        return counts
+
+    def category_scores(self, sentences) -> pd.DataFrame:
+        """(sentences x categories) keyword score matrix."""
+        scores = (self.keyword_counts(sentences) @ self.membership).toarray()
+        return pd.DataFrame(scores, columns=self.categories)
+
+    def categorize(self, sentences, mode: str = "first") -> np.ndarray:
+        """One category per sentence; see the class docstring for the two modes."""
+        scores = self.category_scores(sentences).to_numpy()
+        labels = np.array(self.categories + [OTHER], dtype=object)
+        if mode == "max":
+            return labels[np.argmax(scores, axis=1)]
+        if mode != "first":
+            raise ValueError(f"Unknown mode {mode!r}; expected 'first' or 'max'.")
+        hits = scores > 0
+        return labels[np.where(hits.any(axis=1), hits.argmax(axis=1), len(self.categories))]
+
+def split_sentences(df: pd.DataFrame, text_column: str = "Text", id_columns: list = None) -> pd.DataFrame:
+    """One row per sentence (nltk's sent_tokenize), carrying the document's id columns."""
+    from nltk.tokenize import sent_tokenize
+
+    id_columns = [c for c in (id_columns or []) if c in df.columns]
+    sentences = df[text_column].fillna("").astype(str).map(sent_tokenize).explode().dropna()
+    result = df.loc[sentences.index, id_columns].reset_index(drop=True)
+    result["Sentence"] = sentences.values
+    return result
+
+#############################################
+# Streaming Writer
+#############################################
+
+class StreamingWriter:
+    """
+    Writes sentence-level output chunk by chunk to Parquet (one row group per chunk) or CSV,
+    so only one chunk is ever held in memory. The file is written under a temporary name and
+    renamed into place on close.
+    """
+
+    def __init__(self, path: str):
+        if not path.endswith((".parquet", ".csv")):
+            raise ValueError("Streaming output must be a .parquet or .csv file.")
+        self.path = path
+        self.temp_path = f"{path}.tmp"
+        self.rows = 0
+        self._writer = None
+        self._header = True
+
+    def write(self, df: pd.DataFrame):
+        if self.path.endswith(".parquet"):
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.temp_path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.temp_path, mode="w" if self._header else "a", header=self._header, index=False)
+            self._header = False
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self.temp_path):
+            os.replace(self.temp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            if self._writer is not None:
+                self._writer.close()
+            if os.path.exists(self.temp_path):
+                os.remove(self.temp_path)
+
+#############################################
+# File Categorization
+#############################################
+
+def categorize_documents(df: pd.DataFrame, output_path: str, mode: str = "first", text_column: str = "Text",
+                         id_columns: list = None, chunk_size: int = CHUNK_SIZE,
+                         categorizer: KeywordCategorizer = None) -> int:
+    """
+    Splits documents into sentences, categorises them and streams "<id columns>, Sentence, Category"
+    rows to `output_path`, `chunk_size` documents at a time. Returns the number of sentences written.
+    """
+    categorizer = categorizer or KeywordCategorizer()
+    id_columns = id_columns if id_columns is not None else ["PDF Path"]
+    with StreamingWriter(output_path) as writer:
+        for start in range(0, len(df), chunk_size):
+            sentences = split_sentences(df.iloc[start:start + chunk_size], text_column, id_columns)
+            sentences["Category"] = categorizer.categorize(sentences["Sentence"], mode)
+            writer.write(sentences)
+    return writer.rows
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keyword-based sentence categorization with streaming output.")
+    parser.add_argument("input", help="Excel, CSV or Parquet file with a text column.")
+    parser.add_argument("output", help="Output .parquet or .csv file (one row per sentence).")
+    parser.add_argument("--mode", choices=["first", "max"], default="first",
+                        help="first: first category with any keyword; max: highest keyword count.")
+    parser.add_argument("--text-column", default="Text")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if args.input.endswith(".parquet"):
+        documents = pd.read_parquet(args.input)
+    elif args.input.endswith(".csv"):
+        documents = pd.read_csv(args.input)
+    else:
+        documents = pd.read_excel(args.input)
+    start = time.perf_counter()
+    rows = categorize_documents(documents, args.output, args.mode, args.text_column, chunk_size=args.chunk_size)
+    print(f"Categorized data saved to {args.output} ({rows} sentences in {time.perf_counter() - start:.1f}s)")
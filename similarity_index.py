@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+
+import memory_layout
+from data_store import to_tuples
+from search_index import SearchIndex
+
+#############################################
+# Settings
+#############################################
+
+# Columns projected from the store for each similarity method.
+SIMILARITY_COLUMNS = [
+    "news_Link", "news_entities", "news_relationships", "news_Category_x", "news_Category_y",
+    "wikileaks_Text", "wikileaks_Category", "content_similarity",
+]
+
+# Method names used as the first component of the similarity index key.
+FUZZY_METHOD = "Fuzzy Matching"
+BERT_METHOD = "Sentence-BERT"
+ALL_CATEGORIES = "All"
+
+#############################################
+# Similarity Index
+#############################################
+
+def build_similarity_index(method_frames: dict):
+    """
+    Sorts each method's frame once by (news_Link, content_similarity desc) and maps every
+    (method, news_Link, wikileaks_Category) key to the positions of its rows in that order.
+    The category "All" holds every row for a link, so top-k lookups become O(k) slices.
+    """
+    sorted_frames = {}
+    index = {}
+    for method, df in method_frames.items():
+        ordered = df.sort_values(
+            by=["news_Link", "content_similarity"], ascending=[True, False], kind="mergesort"
+        ).reset_index(drop=True)
+        sorted_frames[method] = ordered
+        for link, positions in ordered.groupby("news_Link", sort=False).indices.items():
+            index[(method, link, ALL_CATEGORIES)] = positions
+        grouped = ordered.groupby(["news_Link", "wikileaks_Category"], sort=False)
+        for (link, category), positions in grouped.indices.items():
+            index[(method, link, category)] = positions
+    return sorted_frames, index
+
+def prepare_similarity_data(fuzzy_df: pd.DataFrame, bert_df: pd.DataFrame, parsed_news_df: pd.DataFrame,
+                            wikileaks_mapping_df: pd.DataFrame) -> dict:
+    """
+    Builds the lookup structures used by the dashboard's sidebar and views from the
+    similarity, news and Wikileaks tables (as projected by the app's loader).
+    """
+    # Repeated strings become shared categoricals and each Wikileaks text is held once, in
+    # key_to_text; both methods' frames reference it through an integer wikileaks_key.
+    compact_frames, key_to_text, key_to_category = memory_layout.compact_similarity_frames(
+        {FUZZY_METHOD: fuzzy_df, BERT_METHOD: bert_df}, wikileaks_mapping_df
+    )
+    sorted_frames, similarity_index = build_similarity_index(compact_frames)
+
+    def get_unique_links(df):
+        return df["news_Link"].drop_duplicates().tolist()
+
+    # News text lookups: first text per link, and a full-text index over each distinct excerpt
+    # (keyed by its first link) and over the Wikileaks documents (keyed by document key).
+    news_rows = parsed_news_df.dropna(subset=["Text"])
+    link_to_text = news_rows.drop_duplicates(subset="Link").set_index("Link")["Text"].to_dict()
+    first_link_per_text = news_rows.drop_duplicates(subset="Text")
+    # Entity (text, label) sets per Wikileaks document, for the pairwise shared-entity overlap.
+    key_to_entities = {}
+    if "entities" in wikileaks_mapping_df.columns:
+        key_to_entities = {
+            key: set(to_tuples(entities))
+            for key, entities in zip(wikileaks_mapping_df["key"], wikileaks_mapping_df["entities"])
+        }
+
+    return {
+        "fuzzy_df": sorted_frames[FUZZY_METHOD],
+        "bert_df": sorted_frames[BERT_METHOD],
+        "sorted_frames": sorted_frames,
+        "similarity_index": similarity_index,
+        "parsed_news_df": parsed_news_df,
+        "key_to_text": key_to_text,
+        "key_to_category": key_to_category,
+        "key_to_entities": key_to_entities,
+        "link_to_text": link_to_text,
+        "news_search": SearchIndex(first_link_per_text["Text"], first_link_per_text["Link"]),
+        "wikileaks_search": SearchIndex(key_to_text.to_numpy(), key_to_text.index.to_numpy()),
+        "categories": {
+            method: df["wikileaks_Category"].dropna().unique()
+            for method, df in sorted_frames.items()
+        },
+        "fuzzy_unique_links": get_unique_links(sorted_frames[FUZZY_METHOD]),
+        "bert_unique_links": get_unique_links(sorted_frames[BERT_METHOD])
+    }
+
+def extend_similarity_data(sim_data: dict, fuzzy_df: pd.DataFrame, bert_df: pd.DataFrame,
+                           parsed_news_df: pd.DataFrame) -> dict:
+    """
+    Returns prepare_similarity_data's result for the old tables plus newly appended rows
+    (e.g. the parts published by ingest.py), without redoing the work for the old rows.
+    Only the new rows are compacted, sorted and indexed, and only new excerpts are added to
+    the news search index. The Wikileaks table does not change on append. `sim_data` is
+    not modified.
+    """
+    old_frames = sim_data["sorted_frames"]
+    new_frames = {FUZZY_METHOD: fuzzy_df, BERT_METHOD: bert_df}
+    new_frames = {method: df for method, df in new_frames.items() if df is not None and len(df)}
+
+    # Categories the new rows add are appended to the shared dtypes, so old codes stay valid.
+    dtypes = {}
+    for column in memory_layout.CATEGORICAL_COLUMNS:
+        if column in old_frames[FUZZY_METHOD].columns:
+            dtypes[column] = memory_layout.extended_dtype(
+                old_frames[FUZZY_METHOD][column].dtype, new_frames.values(), column
+            )
+    compact, key_to_text = memory_layout.compact_frames(new_frames, dtypes, sim_data["key_to_text"])
+    added_frames, added_index = build_similarity_index(compact)
+
+    sorted_frames = {}
+    similarity_index = dict(sim_data["similarity_index"])
+    categories = dict(sim_data["categories"])
+    unique_links = {FUZZY_METHOD: sim_data["fuzzy_unique_links"], BERT_METHOD: sim_data["bert_unique_links"]}
+    for method, old in old_frames.items():
+        if method not in added_frames:
+            sorted_frames[method] = old
+            continue
+        added = added_frames[method]
+        old = old.astype({column: dtype for column, dtype in dtypes.items() if old[column].dtype != dtype})
+        sorted_frames[method] = pd.concat([old, added], ignore_index=True)
+        for key, positions in added_index.items():
+            if key[0] != method:
+                continue
+            positions = positions + len(old)
+            if key in similarity_index:
+                # Links already present keep their rows ordered by similarity, as in a full build.
+                positions = np.concatenate([similarity_index[key], positions])
+                similarities = sorted_frames[method]["content_similarity"].to_numpy()[positions]
+                positions = positions[np.argsort(-similarities, kind="stable")]
+            similarity_index[key] = positions
+        categories[method] = pd.Index(categories[method]).append(
+            pd.Index(added["wikileaks_Category"].dropna().unique())
+        ).unique().to_numpy()
+        seen = set(unique_links[method])
+        unique_links[method] = unique_links[method] + [
+            link for link in added["news_Link"].drop_duplicates() if link not in seen
+        ]
+
+    link_to_text = sim_data["link_to_text"]
+    news_search = sim_data["news_search"]
+    news_rows = parsed_news_df.dropna(subset=["Text"]) if parsed_news_df is not None else parsed_news_df
+    if news_rows is not None and len(news_rows):
+        first_rows = news_rows.drop_duplicates(subset="Link")
+        link_to_text = {
+            **{link: text for link, text in zip(first_rows["Link"], first_rows["Text"]) if link not in link_to_text},
+            **link_to_text,
+        }
+        first_link_per_text = news_rows.drop_duplicates(subset="Text")
+        first_link_per_text = first_link_per_text[~first_link_per_text["Text"].isin(news_search.texts)]
+        if len(first_link_per_text):
+            news_search = news_search.extend(first_link_per_text["Text"], first_link_per_text["Link"])
+        parsed_news_df = pd.concat([sim_data["parsed_news_df"], parsed_news_df], ignore_index=True)
+    else:
+        parsed_news_df = sim_data["parsed_news_df"]
+
+    wikileaks_search = sim_data["wikileaks_search"]
+    added_keys = key_to_text.index.difference(sim_data["key_to_text"].index)
+    if len(added_keys):
+        # Texts the Wikileaks table lacks get new keys, as in compact_similarity_frames.
+        wikileaks_search = wikileaks_search.extend(key_to_text[added_keys].to_numpy(), added_keys.to_numpy())
+
+    return {
+        **sim_data,
+        "fuzzy_df": sorted_frames[FUZZY_METHOD],
+        "bert_df": sorted_frames[BERT_METHOD],
+        "sorted_frames": sorted_frames,
+        "similarity_index": similarity_index,
+        "parsed_news_df": parsed_news_df,
+        "key_to_text": key_to_text,
+        "link_to_text": link_to_text,
+        "news_search": news_search,
+        "wikileaks_search": wikileaks_search,
+        "categories": categories,
+        "fuzzy_unique_links": unique_links[FUZZY_METHOD],
+        "bert_unique_links": unique_links[BERT_METHOD],
+    }
+
+def get_filtered_df(sim_data: dict, method: str, news_link: str, cat_option: str, n: int) -> pd.DataFrame:
+    """Returns the top-n rows for a news link (and optional category) from the similarity index."""
+    frame = sim_data["sorted_frames"][method]
+    positions = sim_data["similarity_index"].get((method, news_link, cat_option))
+    if positions is None:
+        return frame.iloc[0:0]
+    return frame.iloc[positions[:n]]
+
+def shared_entities(sim_data: dict, news_entities, doc_key) -> list:
+    """(text, label) entities found in both a news excerpt and a Wikileaks document, sorted."""
+    return sorted(set(to_tuples(news_entities)) & sim_data["key_to_entities"].get(doc_key, set()))
@@ -0,0 +1,88 @@
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+#############################################
+# Settings
+#############################################
+
+# Set STARTUP_PROFILE=1 to record import and data load times and show them in the app sidebar.
+ENABLED = os.environ.get("STARTUP_PROFILE", "0") == "1"
+PROCESS_START = time.perf_counter()
+
+#############################################
+# Startup Profile
+#############################################
+
+class StartupProfile:
+    """
+    Process-wide record of cold-start costs: the first import of each module and the first
+    (uncached) run of each data loader. Later occurrences are ignored, since they hit
+    sys.modules or the Streamlit cache.
+    """
+
+    def __init__(self):
+        self.records = {}
+        self.lock = threading.Lock()
+
+    def record(self, kind: str, name: str, seconds: float):
+        with self.lock:
+            if (kind, name) not in self.records:
+                self.records[(kind, name)] = {
+                    "kind": kind, "name": name, "seconds": round(seconds, 4),
+                    "since_process_start": round(time.perf_counter() - PROCESS_START, 4),
+                }
+                if ENABLED:
+                    print(f"[startup] {kind:<7} {name:<40} {seconds * 1000:9.1f} ms", file=sys.stderr)
+
+    @contextmanager
+    def timed(self, kind: str, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(kind, name, time.perf_counter() - start)
+
+    def import_module(self, name: str):
+        """importlib.import_module, timing the first import of `name` in this process."""
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        with self.timed("import", name):
+            return importlib.import_module(name)
+
+    def report(self) -> list:
+        """Records in the order they happened."""
+        with self.lock:
+            return sorted(self.records.values(), key=lambda record: record["since_process_start"])
+
+PROFILE = StartupProfile()
+
+def lazy_import(name: str):
+    """Imports a module on first use (e.g. when its tab renders), recording the import time."""
+    return PROFILE.import_module(name)
+
+def timed(kind: str, name: str):
+    return PROFILE.timed(kind, name)
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-import time of the dashboard's modules, one process each.")
+    parser.add_argument("modules", nargs="*", default=[
+        "streamlit", "pandas", "data_store", "memory_layout", "artifact_cache", "graph_store", "vector_index",
+        "altair", "plotly.express", "plotly.graph_objects", "folium", "tfidf_model",
+    ])
+    args = parser.parse_args()
+
+    for module in args.modules:
+        code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+        seconds = float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout)
+        print(f"{module:<24} {seconds * 1000:9.1f} ms")
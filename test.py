@@ -1,91 +1,149 @@
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
 import pandas as pd
-import ast
-import re
-import pycountry
-
-# Extended threat keywords for different levels.
-HIGH_THREAT_KEYWORDS = [
-    "terrorism", "cyberattack", "nuclear", "espionage", "assassination",
-    "bombing", "massacre", "extremism", "radicalism", "hostage"
-]
-MEDIUM_THREAT_KEYWORDS = [
-    "hacking", "surveillance", "fraud", "extortion", "incursion",
-    "unrest", "riot", "protest", "sabotage", "infiltration"
-]
-LOW_THREAT_KEYWORDS = [
-    "scam", "phishing", "misinformation", "fake news", "deception",
-    "hoax", "rumor", "manipulation", "propaganda", "misreporting"
-]
-
-# Compile regex patterns for each threat level. The patterns use word boundaries
-# to ensure we match whole words (case insensitive).
-def compile_patterns(keywords):
-    return [re.compile(r'\b' + re.escape(keyword) + r'\b', re.IGNORECASE) for keyword in keywords]
-
-high_patterns = compile_patterns(HIGH_THREAT_KEYWORDS)
-medium_patterns = compile_patterns(MEDIUM_THREAT_KEYWORDS)
-low_patterns = compile_patterns(LOW_THREAT_KEYWORDS)
-
-def determine_threat_level(text):
+from data_store import iter_batches, to_tuples
+from gazetteer import resolve
+from threat_scanner import THREAT_LEVELS, scan_series
+
+#############################################
+# Settings
+#############################################
+
+OUTPUT_FILE = "./data/threat_counts.json"
+CHUNK_SIZE = 50000
+INPUT_COLUMNS = ["Text", "entities"]
+
+#############################################
+# Counting (runs in the worker processes)
+#############################################
+
+def count_threats(df: pd.DataFrame) -> dict:
+    """
+    Returns {country: {"High": n, "Medium": n, "Low": n}} for one chunk of excerpts,
+    with countries in order of first appearance.
     """
-    Scans the text using extended keywords and returns the threat level (High, Medium, Low)
-    as soon as a match is found. If no threat keywords are found, returns None.
+    # Scan every excerpt once with the combined keyword pattern; only rows with a threat level count.
+    df = df.reset_index(drop=True)
+    scanned = scan_series(df["Text"])
+    threats = df.assign(threat_level=scanned["threat_level"]).dropna(subset=["threat_level"])
+
+    # Entities are stored as nested lists; normalise them to (name, entity_type) tuples and keep
+    # one row per GPE entity.
+    entities = threats["entities"].map(to_tuples).explode().dropna()
+    entities = entities[entities.map(lambda entity: isinstance(entity, tuple) and len(entity) >= 2 and entity[1] == "GPE")]
+    gpe = pd.DataFrame({
+        "name": entities.map(lambda entity: entity[0]),
+        "threat_level": threats["threat_level"].reindex(entities.index),
+    })
+
+    # Resolve all names against the offline gazetteer in one pass, so case variants and aliases
+    # ("SINGAPORE", "the U.S.") count towards one country.
+    gpe["country"] = resolve(gpe["name"])["country"]
+    level_counts = (
+        gpe.dropna(subset=["country"])
+        .groupby(["country", "threat_level"], sort=False).size()
+        .unstack(fill_value=0)
+        .reindex(columns=THREAT_LEVELS, fill_value=0)
+    )
+    return {
+        country: {level: int(n) for level, n in counts.items()}
+        for country, counts in level_counts.to_dict(orient="index").items()
+    }
+
+def merge_counts(total: dict, partial: dict) -> dict:
+    """Reduce step: adds one chunk's per-country counters into the running total."""
+    for country, counts in partial.items():
+        target = total.setdefault(country, dict.fromkeys(THREAT_LEVELS, 0))
+        for level, n in counts.items():
+            target[level] += n
+    return total
+
+#############################################
+# Batch Mode
+#############################################
+
+def iter_chunks(source: str = None, chunk_size: int = CHUNK_SIZE):
     """
-    # Check high threat keywords first.
-    for pattern in high_patterns:
-        if pattern.search(text):
-            return "High"
-    for pattern in medium_patterns:
-        if pattern.search(text):
-            return "Medium"
-    for pattern in low_patterns:
-        if pattern.search(text):
-            return "Low"
-    return None
-
-def is_country(name):
-    """Return True if the given name is recognized as a country using pycountry."""
-    try:
-        pycountry.countries.lookup(name)
-        return True
-    except LookupError:
-        return False
-
-# Load the Excel file.
-df = pd.read_excel("data/processed_news_excerpts_parsed_with_category.xlsx")
-
-# Initialize a dictionary to store threat counts by country.
-country_threat_counts = {}
-
-# Loop over each row in the DataFrame.
-for idx, row in df.iterrows():
-    text = row["Text"]
-    threat_level = determine_threat_level(text)
-    
-    # Only proceed if a threat keyword was detected.
-    if threat_level is not None:
-        # Get the 'entities' column; if it's a string, convert it to a Python list.
-        entities = row.get("entities", [])
-        if isinstance(entities, str):
-            try:
-                entities = ast.literal_eval(entities)
-            except Exception as e:
-                print(f"Error parsing entities on row {idx}: {e}")
-                continue
-        
-        # Look for any entity with a GPE tag and check if it's a valid country.
-        for entity in entities:
-            # Each entity is expected to be a tuple: (name, entity_type)
-            if isinstance(entity, (list, tuple)) and len(entity) >= 2 and entity[1] == "GPE":
-                entity_name = entity[0]
-                if is_country(entity_name):
-                    if entity_name not in country_threat_counts:
-                        country_threat_counts[entity_name] = {"High": 0, "Medium": 0, "Low": 0}
-                    country_threat_counts[entity_name][threat_level] += 1
-
-# Print out the results.
-print("Threat counts by country:")
-for country, counts in country_threat_counts.items():
-    print(f"\nCountry: {country}")
-    for level in ["High", "Medium", "Low"]:
-        print(f"  {level} Threats: {counts[level]}")
+    Streams the news excerpts in chunks: from the data store by default, or from a
+    .parquet/.csv/.xlsx file. Excel files cannot be streamed and are read whole.
+    """
+    if source is None:
+        yield from iter_batches("news", columns=INPUT_COLUMNS, batch_size=chunk_size)
+    elif source.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size, columns=INPUT_COLUMNS):
+            yield batch.to_pandas()
+    elif source.endswith(".csv"):
+        yield from pd.read_csv(source, usecols=INPUT_COLUMNS, chunksize=chunk_size)
+    else:
+        df = pd.read_excel(source, usecols=INPUT_COLUMNS)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+def run_batch(source: str = None, workers: int = None, chunk_size: int = CHUNK_SIZE):
+    """
+    Shards the chunks across a process pool and merges the per-chunk counters in input order.
+    At most two chunks per worker are in flight, so peak memory does not grow with the input.
+    Returns (country_threat_counts, rows).
+    """
+    workers = workers or os.cpu_count() or 1
+    total, rows = {}, 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in iter_chunks(source, chunk_size):
+            rows += len(chunk)
+            pending.append(executor.submit(count_threats, chunk))
+            if len(pending) >= 2 * workers:
+                merge_counts(total, pending.popleft().result())
+        while pending:
+            merge_counts(total, pending.popleft().result())
+    return total, rows
+
+def write_results(country_threat_counts: dict, path: str = OUTPUT_FILE, source: str = None, rows: int = 0):
+    """Writes the per-country counts as JSON (written to a temporary file, then renamed)."""
+    result = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "source": source or "data_store:news",
+        "rows": rows,
+        "levels": THREAT_LEVELS,
+        "countries": [{"country": country, **counts} for country, counts in country_threat_counts.items()],
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count High/Medium/Low threat excerpts per country.")
+    parser.add_argument("--input", default=None,
+                        help="A .parquet, .csv or .xlsx file of news excerpts (default: the data store's news table).")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores).")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--quiet", action="store_true", help="Do not print the per-country counts.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    country_threat_counts, rows = run_batch(args.input, args.workers, args.chunk_size)
+    write_results(country_threat_counts, args.output, args.input, rows)
+
+    # Print out the results.
+    if not args.quiet:
+        print("Threat counts by country:")
+        for country, counts in country_threat_counts.items():
+            print(f"\nCountry: {country}")
+            for level in ["High", "Medium", "Low"]:
+                print(f"  {level} Threats: {counts[level]}")
+    print(f"\nScanned {rows} excerpts in {time.perf_counter() - start:.1f}s; wrote {args.output}")
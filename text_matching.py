@@ -0,0 +1,232 @@
+import argparse
+import time
+from difflib import SequenceMatcher
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from data_store import load_table, to_tuples
+
+#############################################
+# Settings
+#############################################
+
+# Block sizes bound the dense score buffer to QUERY_BLOCK x CORPUS_BLOCK floats
+# (16 MB at the defaults) regardless of how large either corpus is.
+QUERY_BLOCK = 1024
+CORPUS_BLOCK = 4096
+DEFAULT_TOP_K = 30
+
+# Output columns, matching the fuzzy matching results (fuzzy_clean.pkl).
+FUZZY_COLUMNS = [
+    "news_Link", "news_Text", "news_entities", "news_relationships",
+    "news_Category_x", "news_Category_y",
+    "wikileaks_Text", "wikileaks_entities", "wikileaks_relationships", "wikileaks_Category",
+    "common_entities", "common_relationships", "content_similarity",
+]
+
+#############################################
+# Vectorization and Blocked Top-k
+#############################################
+
+def fit_vectorizer(texts, analyzer: str = "char_wb", ngram_range: tuple = (3, 5)) -> TfidfVectorizer:
+    """Fits a character n-gram TF-IDF vectorizer. Rows are L2-normalised, so dot products are cosines."""
+    vectorizer = TfidfVectorizer(
+        analyzer=analyzer, ngram_range=ngram_range, sublinear_tf=True, dtype=np.float32
+    )
+    vectorizer.fit(texts)
+    return vectorizer
+
+def blocked_topk(query, corpus, k: int, query_block: int = QUERY_BLOCK, corpus_block: int = CORPUS_BLOCK):
+    """
+    Returns the indices and scores of the k highest-scoring corpus rows for every query row,
+    sorted by score (descending). Scores are computed one block pair at a time with a sparse
+    matrix product; each row keeps only a running top-k buffer that is merged with the next
+    block via argpartition, so memory stays bounded by the block sizes.
+    """
+    n_query, n_corpus = query.shape[0], corpus.shape[0]
+    k = min(k, n_corpus)
+    top_indices = np.empty((n_query, k), dtype=np.int64)
+    top_scores = np.empty((n_query, k), dtype=np.float32)
+    if k == 0:
+        return top_indices, top_scores
+
+    corpus_blocks = [
+        (start, corpus[start:start + corpus_block].T.tocsr())
+        for start in range(0, n_corpus, corpus_block)
+    ]
+    for q_start in range(0, n_query, query_block):
+        q = query[q_start:q_start + query_block]
+        best_scores = np.empty((q.shape[0], 0), dtype=np.float32)
+        best_indices = np.empty((q.shape[0], 0), dtype=np.int64)
+        for c_start, block_t in corpus_blocks:
+            scores = (q @ block_t).toarray().astype(np.float32, copy=False)
+            indices = np.broadcast_to(np.arange(c_start, c_start + scores.shape[1]), scores.shape)
+            best_scores = np.hstack([best_scores, scores])
+            best_indices = np.hstack([best_indices, indices])
+            if best_scores.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_indices = np.take_along_axis(best_indices, keep, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        top_scores[q_start:q_start + q.shape[0]] = np.take_along_axis(best_scores, order, axis=1)
+        top_indices[q_start:q_start + q.shape[0]] = np.take_along_axis(best_indices, order, axis=1)
+    return top_indices, top_scores
+
+def sequence_ratio(text1: str, text2: str) -> float:
+    """Similarity between two texts using SequenceMatcher (the original notebook score)."""
+    return SequenceMatcher(None, text1, text2).ratio()
+
+#############################################
+# Matching
+#############################################
+
+def _overlap(left: list, right: list) -> list:
+    return list(set(left) & set(right))
+
+def match_corpora(news_df: pd.DataFrame, wikileaks_df: pd.DataFrame, top_k: int = DEFAULT_TOP_K,
+                  min_similarity: float = None, rerank: bool = False, vectorizer: TfidfVectorizer = None,
+                  query_block: int = QUERY_BLOCK, corpus_block: int = CORPUS_BLOCK,
+                  wikileaks_matrix=None) -> pd.DataFrame:
+    """
+    Matches every news excerpt against the Wikileaks documents and returns the top_k pairs per
+    news link in the fuzzy matching output schema. content_similarity is the char n-gram cosine
+    in percent; with rerank=True it is replaced by the SequenceMatcher ratio (in percent),
+    computed on the top_k candidates only. Pairs below min_similarity (percent) are dropped.
+    `wikileaks_matrix` is the Wikileaks texts already transformed with `vectorizer`, for callers
+    that match many small news batches against the same corpus.
+    """
+    news_df = news_df.reset_index(drop=True)
+    wikileaks_df = wikileaks_df.reset_index(drop=True)
+    news_texts = news_df["Text"].fillna("").astype(str)
+    wikileaks_texts = wikileaks_df["Text"].fillna("").astype(str)
+
+    if vectorizer is None:
+        vectorizer = fit_vectorizer(pd.concat([wikileaks_texts, news_texts], ignore_index=True))
+    if wikileaks_matrix is None:
+        wikileaks_matrix = vectorizer.transform(wikileaks_texts)
+    indices, scores = blocked_topk(
+        vectorizer.transform(news_texts), wikileaks_matrix,
+        top_k, query_block, corpus_block,
+    )
+    k = indices.shape[1]
+    news_pos = np.repeat(np.arange(len(news_df)), k)
+    wiki_pos = indices.ravel()
+    similarity = scores.ravel().astype(np.float64) * 100
+
+    if rerank:
+        similarity = np.array([
+            sequence_ratio(news_texts.iat[i], wikileaks_texts.iat[j]) * 100
+            for i, j in zip(news_pos, wiki_pos)
+        ])
+        order = np.lexsort((-similarity, news_pos))
+        news_pos, wiki_pos, similarity = news_pos[order], wiki_pos[order], similarity[order]
+
+    if min_similarity is not None:
+        keep = similarity >= min_similarity
+        news_pos, wiki_pos, similarity = news_pos[keep], wiki_pos[keep], similarity[keep]
+
+    # Parse entity/relationship values once per document, not once per pair.
+    news_entities = news_df["entities"].map(to_tuples).tolist()
+    news_relationships = news_df["relationships"].map(to_tuples).tolist()
+    wiki_entities = wikileaks_df["entities"].map(to_tuples).tolist()
+    wiki_relationships = wikileaks_df["relationships"].map(to_tuples).tolist()
+
+    news_rows = news_df.iloc[news_pos]
+    wiki_rows = wikileaks_df.iloc[wiki_pos]
+    return pd.DataFrame({
+        "news_Link": news_rows["Link"].values,
+        "news_Text": news_rows["Text"].values,
+        "news_entities": [news_entities[i] for i in news_pos],
+        "news_relationships": [news_relationships[i] for i in news_pos],
+        "news_Category_x": news_rows["Category_x"].values,
+        "news_Category_y": news_rows["Category_y"].values,
+        "wikileaks_Text": wiki_rows["Text"].values,
+        "wikileaks_entities": [wiki_entities[j] for j in wiki_pos],
+        "wikileaks_relationships": [wiki_relationships[j] for j in wiki_pos],
+        "wikileaks_Category": wiki_rows["Category"].values,
+        "common_entities": [_overlap(news_entities[i], wiki_entities[j]) for i, j in zip(news_pos, wiki_pos)],
+        "common_relationships": [
+            _overlap(news_relationships[i], wiki_relationships[j]) for i, j in zip(news_pos, wiki_pos)
+        ],
+        "content_similarity": similarity,
+    }, columns=FUZZY_COLUMNS)
+
+def sequence_matcher_loop(news_df: pd.DataFrame, wikileaks_df: pd.DataFrame, threshold: float = 0.5) -> list:
+    """The original notebook loop: SequenceMatcher on every news x Wikileaks pair. Kept for benchmarking."""
+    output = []
+    for _, news_row in news_df.iterrows():
+        for _, row in wikileaks_df.iterrows():
+            similarity = sequence_ratio(news_row["Text"], row["Text"])
+            if similarity > threshold:
+                output.append((news_row["Link"], row["PDF Path"], similarity))
+    return output
+
+#############################################
+# Benchmark
+#############################################
+
+def benchmark(news_df: pd.DataFrame, wikileaks_df: pd.DataFrame, news_sample: int = 10,
+              top_k: int = DEFAULT_TOP_K) -> dict:
+    """
+    Times the original SequenceMatcher loop on a sample of news rows (extrapolated to the full
+    corpus) against the blocked TF-IDF matcher, with and without re-ranking, on all rows.
+    """
+    sample = news_df.head(news_sample)
+    start = time.perf_counter()
+    sequence_matcher_loop(sample, wikileaks_df)
+    loop_seconds = time.perf_counter() - start
+    loop_estimate = loop_seconds / max(len(sample), 1) * len(news_df)
+
+    start = time.perf_counter()
+    match_corpora(news_df, wikileaks_df, top_k=top_k)
+    tfidf_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    match_corpora(news_df, wikileaks_df, top_k=top_k, rerank=True)
+    rerank_seconds = time.perf_counter() - start
+
+    return {
+        "news_rows": len(news_df),
+        "wikileaks_rows": len(wikileaks_df),
+        "top_k": top_k,
+        "sequence_matcher_loop_seconds_estimated": loop_estimate,
+        "tfidf_seconds": tfidf_seconds,
+        "tfidf_rerank_seconds": rerank_seconds,
+        "speedup": loop_estimate / tfidf_seconds if tfidf_seconds else float("inf"),
+        "speedup_with_rerank": loop_estimate / rerank_seconds if rerank_seconds else float("inf"),
+    }
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Blocked char n-gram TF-IDF matching of news against Wikileaks.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    match_parser = subparsers.add_parser("match", help="Write fuzzy matching results.")
+    match_parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K)
+    match_parser.add_argument("--min-similarity", type=float, default=None)
+    match_parser.add_argument("--rerank", action="store_true", help="Re-rank top-k candidates with SequenceMatcher.")
+    match_parser.add_argument("--output", default="./data/fuzzy_clean.pkl")
+
+    bench_parser = subparsers.add_parser("benchmark", help="Compare against the SequenceMatcher loop.")
+    bench_parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K)
+    bench_parser.add_argument("--news-sample", type=int, default=10,
+                              help="News rows to run through the slow loop (time is extrapolated).")
+
+    args = parser.parse_args()
+    news_df = load_table("news")
+    wikileaks_df = load_table("wikileaks")
+
+    if args.command == "match":
+        start = time.perf_counter()
+        results = match_corpora(news_df, wikileaks_df, top_k=args.top_k,
+                                min_similarity=args.min_similarity, rerank=args.rerank)
+        results.to_pickle(args.output)
+        print(f"Wrote {len(results)} pairs to {args.output} in {time.perf_counter() - start:.1f}s")
+    else:
+        for key, value in benchmark(news_df, wikileaks_df, args.news_sample, args.top_k).items():
+            print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
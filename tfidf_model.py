@@ -0,0 +1,209 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from text_matching import blocked_topk
+
+#############################################
+# Settings
+#############################################
+
+# Each fit is saved to its own sub-directory, data/tfidf_model/v<version>/, and LATEST_FILE
+# names the current one, so a reader never sees a half-written model.
+MODEL_DIR = "./data/tfidf_model"
+LATEST_FILE = "LATEST"
+META_FILE = "meta.json"
+KEEP_VERSIONS = 2
+DEFAULT_TOP_K = 5
+
+# Word TF-IDF, as in the notebook's compute_similarity. Rows are L2-normalised, so dot products are cosines.
+DEFAULT_PARAMS = {"lowercase": True, "ngram_range": (1, 1), "stop_words": None, "sublinear_tf": False}
+
+def corpus_fingerprint(texts, keys, params: dict) -> str:
+    """Hash of the vectorizer parameters and the (key, text) corpus; a model is reused only if it matches."""
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8"))
+    for key, text in zip(keys, texts):
+        digest.update(f"\0{key}\0{text}".encode("utf-8"))
+    return digest.hexdigest()
+
+#############################################
+# Fitted Model
+#############################################
+
+class TfidfModel:
+    """
+    TF-IDF vectorizer fitted once on the Wikileaks corpus, together with the corpus matrix
+    (documents x terms, float32, L2-normalised) and the document keys. Queries are transformed
+    with the fitted vocabulary, never refitted, and scored against the corpus in batches with
+    sparse matrix products.
+    """
+
+    def __init__(self, vectorizer: TfidfVectorizer, matrix, keys, meta: dict):
+        self.vectorizer = vectorizer
+        self.matrix = sparse.csr_matrix(matrix)
+        self.keys = np.asarray(keys)
+        self.meta = meta
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def version(self) -> int:
+        return self.meta["version"]
+
+    @classmethod
+    def fit(cls, texts, keys, version: int = 1, **params):
+        params = {**DEFAULT_PARAMS, **params}
+        texts = pd.Series(texts).fillna("").astype(str)
+        vectorizer = TfidfVectorizer(dtype=np.float32, **params)
+        matrix = vectorizer.fit_transform(texts)
+        meta = {
+            "version": version,
+            "fingerprint": corpus_fingerprint(texts, keys, params),
+            "params": params,
+            "documents": int(matrix.shape[0]),
+            "terms": int(matrix.shape[1]),
+            "sklearn_version": sklearn.__version__,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        return cls(vectorizer, matrix, keys, meta)
+
+    def transform(self, texts):
+        """(texts x terms) TF-IDF matrix in the model's vocabulary."""
+        return self.vectorizer.transform(pd.Series(texts).fillna("").astype(str))
+
+    def scores(self, texts):
+        """Dense (texts x documents) cosine similarity matrix, from one sparse matrix product."""
+        return (self.transform(texts) @ self.matrix.T).toarray()
+
+    def query(self, texts, k: int = DEFAULT_TOP_K):
+        """Returns (keys, scores), each of shape (n_texts, k), best match first."""
+        positions, scores = blocked_topk(self.transform(texts), self.matrix, k)
+        return self.keys[positions], scores
+
+    def save(self, model_dir: str = MODEL_DIR) -> str:
+        """Writes this version's directory, then points LATEST at it; older versions are pruned."""
+        directory = os.path.join(model_dir, f"v{self.version}")
+        os.makedirs(directory, exist_ok=True)
+        joblib.dump(self.vectorizer, os.path.join(directory, "vectorizer.joblib"))
+        sparse.save_npz(os.path.join(directory, "matrix.npz"), self.matrix)
+        np.save(os.path.join(directory, "keys.npy"), self.keys, allow_pickle=False)
+        with open(os.path.join(directory, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=2)
+        temp_path = os.path.join(model_dir, LATEST_FILE + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(str(self.version))
+        os.replace(temp_path, os.path.join(model_dir, LATEST_FILE))
+        for name in os.listdir(model_dir):
+            if name.startswith("v") and name[1:].isdigit() and int(name[1:]) <= self.version - KEEP_VERSIONS:
+                shutil.rmtree(os.path.join(model_dir, name), ignore_errors=True)
+        return directory
+
+    @classmethod
+    def load(cls, model_dir: str = MODEL_DIR):
+        """Loads the latest saved model, or returns None if none has been built."""
+        latest_path = os.path.join(model_dir, LATEST_FILE)
+        if not os.path.exists(latest_path):
+            return None
+        with open(latest_path, "r", encoding="utf-8") as f:
+            directory = os.path.join(model_dir, f"v{f.read().strip()}")
+        with open(os.path.join(directory, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(
+            joblib.load(os.path.join(directory, "vectorizer.joblib")),
+            sparse.load_npz(os.path.join(directory, "matrix.npz")),
+            np.load(os.path.join(directory, "keys.npy"), allow_pickle=False),
+            meta,
+        )
+
+#############################################
+# Building from the Data Store
+#############################################
+
+def wikileaks_corpus(store_dir: str = None) -> tuple:
+    """(texts, keys) of the Wikileaks table, in the order models are fitted on."""
+    from data_store import STORE_DIR, load_table
+
+    wikileaks_df = load_table("wikileaks", columns=["key", "Text"], store_dir=store_dir or STORE_DIR)
+    return wikileaks_df["Text"].fillna("").astype(str), wikileaks_df["key"].to_numpy()
+
+def is_current(model: TfidfModel, texts, keys, **params) -> bool:
+    """True if `model` was fitted on this corpus with the same parameters and scikit-learn version."""
+    params = {**DEFAULT_PARAMS, **params}
+    return (model.meta["fingerprint"] == corpus_fingerprint(texts, keys, params)
+            and model.meta["sklearn_version"] == sklearn.__version__)
+
+def load_or_fit(model_dir: str = MODEL_DIR, force: bool = False, **params) -> TfidfModel:
+    """
+    Returns the saved model if it was fitted on the current Wikileaks table with the same
+    parameters and scikit-learn version; otherwise fits a new version and saves it.
+    """
+    params = {**DEFAULT_PARAMS, **params}
+    texts, keys = wikileaks_corpus()
+    model = TfidfModel.load(model_dir)
+    if model is not None and not force and is_current(model, texts, keys, **params):
+        return model
+    model = TfidfModel.fit(texts, keys, version=(model.version + 1 if model else 1), **params)
+    model.save(model_dir)
+    return model
+
+def match_news(model: TfidfModel, news_df: pd.DataFrame, k: int = 1) -> pd.DataFrame:
+    """Scores every news row against the corpus in one batch; one row per (news link, match)."""
+    keys, scores = model.query(news_df["Text"], k)
+    k = keys.shape[1]
+    return pd.DataFrame({
+        "news_Link": np.repeat(news_df["Link"].to_numpy(), k),
+        "wikileaks_key": keys.ravel(),
+        "similarity_score": scores.ravel().astype(np.float64),
+    })
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit, query or apply the Wikileaks TF-IDF model.")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Fit a new version if the corpus or parameters changed.")
+    build_parser.add_argument("--force", action="store_true", help="Refit even if the saved model is current.")
+
+    query_parser = subparsers.add_parser("query")
+    query_parser.add_argument("text", nargs="+", help="One or more query texts (scored as one batch).")
+    query_parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K)
+
+    match_parser = subparsers.add_parser("match", help="Best Wikileaks matches for every news row.")
+    match_parser.add_argument("--top-k", type=int, default=1)
+    match_parser.add_argument("--output", default="./data/tfidf_matches.csv")
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+    if args.command == "build":
+        model = load_or_fit(args.model_dir, force=args.force)
+        print(f"TF-IDF model v{model.version}: {model.meta['documents']} documents, "
+              f"{model.meta['terms']} terms ({time.perf_counter() - start:.1f}s)")
+    elif args.command == "query":
+        model = load_or_fit(args.model_dir)
+        keys, scores = model.query(args.text, args.top_k)
+        for text, row_keys, row_scores in zip(args.text, keys, scores):
+            print(f"Query: {text[:80]}")
+            for key, score in zip(row_keys, row_scores):
+                print(f"  key={key}  similarity={score * 100:.2f}%")
+    else:
+        from data_store import load_table
+
+        model = load_or_fit(args.model_dir)
+        matches = match_news(model, load_table("news", columns=["Link", "Text"]), args.top_k)
+        matches.to_csv(args.output, index=False)
+        print(f"Wrote {len(matches)} matches to {args.output} in {time.perf_counter() - start:.1f}s")
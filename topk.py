@@ -0,0 +1,178 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+#############################################
+# Settings
+#############################################
+
+DEFAULT_K = 5
+GROUP_COLUMNS = ["news_Link"]
+SCORE_COLUMN = "content_similarity"
+CHUNK_SIZE = 1 << 19
+MIN_MERGE_ROWS = 1 << 19  # pending candidate rows before they are merged into the top-k buffer
+# Per-method columns of the combined view; news_Link and rank are the join keys.
+COMBINED_COLUMNS = ["wikileaks_Text", "wikileaks_Category", SCORE_COLUMN]
+METHOD_TABLES = {"fuzzy": "fuzzy", "bert": "bert"}
+
+#############################################
+# Streaming Grouped Top-k
+#############################################
+
+class GroupedTopK:
+    """
+    Keeps the k highest-scoring rows per group over a stream of chunks, so the full pair
+    table is never held or sorted. The retained rows form a bounded buffer of at most k rows
+    per group. Each chunk is reduced to its own top k per group with one vectorised sort, and
+    the reduced chunks are merged into the buffer in batches, so memory stays at about twice
+    groups x k plus one chunk. Ties keep the row seen first, and rows with a missing score are
+    dropped.
+    """
+
+    def __init__(self, k: int = DEFAULT_K, by: list = None, score_column: str = SCORE_COLUMN, columns: list = None):
+        self.k = k
+        self.by = list(by or GROUP_COLUMNS)
+        self.score_column = score_column
+        self.columns = columns
+        self.kept = None
+        self.pending = []
+        self.pending_rows = 0
+        self.rows_seen = 0
+
+    def _select(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        The first k rows per group by descending score, from two stable argsorts (score, then
+        integer group code). Rows arrive in stream order, so stable sorts keep the earlier row on ties.
+        """
+        codes = df.groupby(self.by, sort=False, dropna=False).ngroup().to_numpy()
+        order = np.argsort(-df[self.score_column].to_numpy(dtype=np.float64), kind="stable")
+        order = order[np.argsort(codes[order], kind="stable")]
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+        return df.iloc[order[rank < self.k]]
+
+    def update(self, chunk: pd.DataFrame):
+        if self.columns is not None:
+            keep = list(dict.fromkeys(self.by + [self.score_column] + list(self.columns)))
+            chunk = chunk[[c for c in keep if c in chunk.columns]]
+        self.rows_seen += len(chunk)
+        chunk = chunk[chunk[self.score_column].notna()]
+        # Reduce the chunk on its own, then merge pending candidates into the buffer only once they
+        # outnumber it, so each retained row is re-sorted O(log n) times rather than once per chunk.
+        self.pending.append(self._select(chunk))
+        self.pending_rows += len(self.pending[-1])
+        if self.pending_rows >= max(len(self.kept) if self.kept is not None else 0, MIN_MERGE_ROWS):
+            self._merge()
+        return self
+
+    def _merge(self):
+        if self.pending:
+            frames = ([self.kept] if self.kept is not None else []) + self.pending
+            self.kept = self._select(pd.concat(frames, ignore_index=True))
+            self.pending, self.pending_rows = [], 0
+
+    def result(self) -> pd.DataFrame:
+        """The retained rows sorted by group and descending score, with a 1-based rank per group."""
+        self._merge()
+        if self.kept is None:
+            return pd.DataFrame(columns=self.by + ["rank"])
+        # The buffer is already in (group, descending score) order; a stable sort on the group
+        # columns only reorders the groups.
+        ordered = self.kept.sort_values(self.by, kind="mergesort")
+        ordered = ordered.assign(rank=ordered.groupby(self.by, sort=False, dropna=False).cumcount() + 1)
+        return ordered.reset_index(drop=True)
+
+def top_k(batches, k: int = DEFAULT_K, by: list = None, score_column: str = SCORE_COLUMN,
+          columns: list = None) -> pd.DataFrame:
+    """Top k rows per group from an iterable of DataFrame chunks (e.g. data_store.iter_batches)."""
+    engine = GroupedTopK(k, by, score_column, columns)
+    for batch in batches:
+        engine.update(batch)
+    return engine.result()
+
+def top_k_frame(df: pd.DataFrame, k: int = DEFAULT_K, by: list = None, score_column: str = SCORE_COLUMN,
+                columns: list = None, chunk_size: int = CHUNK_SIZE) -> pd.DataFrame:
+    """top_k over an in-memory frame, fed in chunks; the same rows as sort + groupby().head(k), without the full sort."""
+    # An empty frame still yields one (empty) chunk, so the result keeps its columns.
+    chunks = (df.iloc[start:start + chunk_size] for start in range(0, max(len(df), 1), chunk_size))
+    return top_k(chunks, k, by, score_column, columns)
+
+#############################################
+# Rank-Joined Combined View
+#############################################
+
+def rank_join(tops: dict, by: list = None, columns: list = None) -> pd.DataFrame:
+    """
+    Aligns the top-k results of several methods by rank: one row per (group, rank) with each
+    method's columns prefixed by its name (e.g. fuzzy_content_similarity next to
+    bert_content_similarity). A group has as many rows as its longest ranking, not k x k.
+    """
+    by = list(by or GROUP_COLUMNS)
+    columns = columns or COMBINED_COLUMNS
+    frames = [
+        df.set_index(by + ["rank"])[[c for c in columns if c in df.columns]].add_prefix(f"{method}_")
+        for method, df in tops.items()
+    ]
+    combined = pd.concat(frames, axis=1, join="outer").sort_index()
+    return combined.reset_index()
+
+def resolve_wikileaks_keys(df: pd.DataFrame, key_to_text) -> pd.DataFrame:
+    """Replaces a wikileaks_Text column holding document keys (the Sentence-BERT results) with the texts."""
+    if "wikileaks_Text" in df.columns and pd.api.types.is_numeric_dtype(df["wikileaks_Text"]):
+        df = df.assign(wikileaks_Text=df["wikileaks_Text"].map(key_to_text))
+    return df
+
+def combined_top_k(k: int = DEFAULT_K, tables: dict = None, columns: list = None, batch_size: int = CHUNK_SIZE,
+                   store_dir: str = None) -> tuple:
+    """
+    Streams each method's similarity table from the data store through GroupedTopK and
+    rank-joins the results. Returns ({method: top-k frame}, combined frame).
+    """
+    from data_store import STORE_DIR, iter_batches, load_table
+
+    store_dir = store_dir or STORE_DIR
+    tables = tables or METHOD_TABLES
+    columns = columns or COMBINED_COLUMNS
+    wikileaks_df = load_table("wikileaks", columns=["key", "Text"], store_dir=store_dir)
+    key_to_text = pd.Series(wikileaks_df["Text"].to_numpy(), index=wikileaks_df["key"].to_numpy())
+    read_columns = list(dict.fromkeys(GROUP_COLUMNS + [SCORE_COLUMN] + list(columns)))
+    tops = {
+        method: resolve_wikileaks_keys(
+            top_k(iter_batches(table, read_columns, batch_size, store_dir), k, columns=columns), key_to_text)
+        for method, table in tables.items()
+    }
+    return tops, rank_join(tops, columns=columns)
+
+def write_table(df: pd.DataFrame, path: str):
+    if path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    elif path.endswith(".csv"):
+        df.to_csv(path, index=False)
+    else:
+        df.to_excel(path, index=False)
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming top-k matches per news link, rank-joined across methods.")
+    parser.add_argument("--k", type=int, default=DEFAULT_K)
+    parser.add_argument("--output", default="combined_top5_results.xlsx", help="Combined view (.xlsx, .csv or .parquet).")
+    parser.add_argument("--per-method", action="store_true", help="Also write <method>_top<k>.<ext> per method.")
+    parser.add_argument("--batch-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    tops, combined = combined_top_k(args.k, batch_size=args.batch_size)
+    write_table(combined, args.output)
+    if args.per_method:
+        directory, ext = os.path.dirname(args.output), os.path.splitext(args.output)[1]
+        for method, df in tops.items():
+            write_table(df, os.path.join(directory, f"{method}_top{args.k}{ext}"))
+    print(f"Wrote {len(combined)} rows ({combined['news_Link'].nunique()} links, k={args.k}) to {args.output} "
+          f"in {time.perf_counter() - start:.1f}s")
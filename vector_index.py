@@ -0,0 +1,304 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+#############################################
+# Settings
+#############################################
+
+# Saved next to wikileaks_mapping_clean.pkl.
+INDEX_DIR = "./data/wikileaks_index"
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+META_FILE = "meta.json"
+# Stored vectors are converted to float32 and scored this many rows at a time, so a float16
+# index is never held as a full float32 copy.
+VECTOR_BLOCK_ROWS = 65536
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalises rows so that inner products are cosine similarities."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def _topk(scores: np.ndarray, k: int):
+    """Row-wise top-k of a score matrix via argpartition; returns (positions, scores) sorted descending."""
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+def _merge_topk(positions: np.ndarray, scores: np.ndarray, new_positions: np.ndarray, new_scores: np.ndarray, k: int):
+    """Row-wise top-k of two (positions, scores) candidate sets."""
+    positions = np.concatenate([positions, new_positions], axis=1)
+    order, scores = _topk(np.concatenate([scores, new_scores], axis=1), k)
+    return np.take_along_axis(positions, order, axis=1), scores
+
+#############################################
+# Exact Flat Index
+#############################################
+
+class FlatIndex:
+    """
+    Exact cosine search over normalised vectors stored as float32 or float16.
+    Queries are scored in batches with one matrix product and reduced with argpartition,
+    so only the top k per query are ever sorted.
+    """
+    kind = "flat"
+
+    def __init__(self, vectors: np.ndarray, keys, dtype: str = "float32", model_name: str = MODEL_NAME,
+                 normalized: bool = False):
+        self.vectors = (vectors if normalized else normalize(vectors)).astype(dtype, copy=False)
+        self.keys = np.asarray(keys)
+        self.model_name = model_name
+
+    def __len__(self):
+        return len(self.keys)
+
+    def search(self, queries: np.ndarray, k: int = 5, batch_size: int = 1024):
+        """
+        Returns (keys, scores), each of shape (n_queries, k), best match first. Stored vectors are
+        converted to float32 once per block of VECTOR_BLOCK_ROWS (a no-op for float32 indexes),
+        and each block's top k is merged into the running top k.
+        """
+        queries = normalize(queries)
+        k = min(k, len(self.keys))
+        positions = np.empty((len(queries), 0), dtype=np.int64)
+        scores = np.empty((len(queries), 0), dtype=np.float32)
+        for block_start in range(0, len(self.vectors), VECTOR_BLOCK_ROWS):
+            block_t = self.vectors[block_start:block_start + VECTOR_BLOCK_ROWS].T.astype(np.float32, copy=False)
+            block_positions, block_scores = [], []
+            for start in range(0, len(queries), batch_size):
+                batch_positions, batch_scores = _topk(queries[start:start + batch_size] @ block_t, k)
+                block_positions.append(batch_positions + block_start)
+                block_scores.append(batch_scores)
+            positions, scores = _merge_topk(positions, scores, np.vstack(block_positions), np.vstack(block_scores), k)
+        return self.keys[positions], scores
+
+    def _meta(self):
+        return {"kind": self.kind, "dtype": str(self.vectors.dtype), "model_name": self.model_name,
+                "count": len(self.keys), "dim": int(self.vectors.shape[1])}
+
+    def save(self, directory: str = INDEX_DIR):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "vectors.npy"), self.vectors)
+        np.save(os.path.join(directory, "keys.npy"), self.keys)
+        with open(os.path.join(directory, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(self._meta(), f, indent=2)
+
+    @classmethod
+    def _load_arrays(cls, directory: str):
+        vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        keys = np.load(os.path.join(directory, "keys.npy"), allow_pickle=False)
+        return vectors, keys
+
+    @classmethod
+    def load(cls, directory: str, meta: dict):
+        vectors, keys = cls._load_arrays(directory)
+        return cls(vectors, keys, dtype=meta["dtype"], model_name=meta["model_name"], normalized=True)
+
+#############################################
+# Approximate Indexes
+#############################################
+
+class IVFIndex(FlatIndex):
+    """
+    Inverted-file index: vectors are clustered with k-means into `n_lists` cells and a query
+    only scores the vectors in its `n_probe` closest cells. Pure NumPy, no extra dependencies.
+    """
+    kind = "ivf"
+
+    def __init__(self, vectors, keys, dtype="float32", model_name=MODEL_NAME, normalized=False,
+                 n_lists: int = None, n_probe: int = 8, centroids=None, assignments=None, seed: int = 0):
+        super().__init__(vectors, keys, dtype, model_name, normalized)
+        self.n_probe = n_probe
+        if centroids is None:
+            n_lists = n_lists or max(1, int(np.sqrt(len(self.keys))))
+            centroids, assignments = self._kmeans(n_lists, seed)
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.assignments = np.asarray(assignments)
+        self.lists = [np.flatnonzero(self.assignments == c) for c in range(len(self.centroids))]
+
+    def _kmeans(self, n_lists: int, seed: int, iterations: int = 20):
+        data = self.vectors.astype(np.float32, copy=False)
+        rng = np.random.default_rng(seed)
+        n_lists = min(n_lists, len(data))
+        centroids = data[rng.choice(len(data), n_lists, replace=False)].copy()
+        assignments = np.zeros(len(data), dtype=np.int64)
+        for _ in range(iterations):
+            assignments = np.argmax(data @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = data[assignments == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = normalize(centroids)
+        return centroids, assignments
+
+    def search(self, queries: np.ndarray, k: int = 5, batch_size: int = 1024):
+        """
+        Queries are grouped by probed cell: each cell's vectors are scored against all the
+        queries probing it with one matrix product, and merged into each query's running top k.
+        A query whose `n_probe` closest cells hold fewer than k vectors probes further cells, in
+        order of closeness, until they do, so every returned slot is a real match.
+        """
+        queries = normalize(queries)
+        k = min(k, len(self.keys))
+        ranked_cells = np.argsort(-(queries @ self.centroids.T), axis=1, kind="stable")
+        list_sizes = np.array([len(members) for members in self.lists])
+        covered = np.cumsum(list_sizes[ranked_cells], axis=1)
+        n_cells = np.maximum(self.n_probe, (covered < k).sum(axis=1) + 1)
+        probed = np.arange(ranked_cells.shape[1]) < n_cells[:, None]
+        query_ids, flat = np.nonzero(probed)[0], ranked_cells[probed]
+        positions = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        order = np.argsort(flat, kind="stable")
+        cells, starts = np.unique(flat[order], return_index=True)
+        bounds = np.append(starts, len(order))
+        for cell, start, stop in zip(cells, bounds[:-1], bounds[1:]):
+            members = self.lists[cell]
+            if len(members) == 0:
+                continue
+            rows = query_ids[order[start:stop]]
+            cell_t = self.vectors[members].T.astype(np.float32, copy=False)
+            for batch in range(0, len(rows), batch_size):
+                batch_rows = rows[batch:batch + batch_size]
+                cell_positions, cell_scores = _topk(queries[batch_rows] @ cell_t, k)
+                positions[batch_rows], scores[batch_rows] = _merge_topk(
+                    positions[batch_rows], scores[batch_rows], members[cell_positions], cell_scores, k)
+        return self.keys[positions], scores
+
+    def _meta(self):
+        return {**super()._meta(), "n_probe": self.n_probe}
+
+    def save(self, directory: str = INDEX_DIR):
+        super().save(directory)
+        np.save(os.path.join(directory, "centroids.npy"), self.centroids)
+        np.save(os.path.join(directory, "assignments.npy"), self.assignments)
+
+    @classmethod
+    def load(cls, directory: str, meta: dict):
+        vectors, keys = cls._load_arrays(directory)
+        return cls(vectors, keys, dtype=meta["dtype"], model_name=meta["model_name"], normalized=True,
+                   n_probe=meta["n_probe"],
+                   centroids=np.load(os.path.join(directory, "centroids.npy")),
+                   assignments=np.load(os.path.join(directory, "assignments.npy")))
+
+class HNSWIndex(FlatIndex):
+    """Graph-based approximate index backed by the optional `hnswlib` package."""
+    kind = "hnsw"
+
+    def __init__(self, vectors, keys, dtype="float32", model_name=MODEL_NAME, normalized=False,
+                 ef: int = 64, graph=None, M: int = 16, ef_construction: int = 200):
+        import hnswlib
+
+        super().__init__(vectors, keys, dtype, model_name, normalized)
+        self.ef = ef
+        if graph is None:
+            graph = hnswlib.Index(space="ip", dim=self.vectors.shape[1])
+            graph.init_index(max_elements=len(self.keys), M=M, ef_construction=ef_construction)
+            graph.add_items(self.vectors.astype(np.float32, copy=False), np.arange(len(self.keys)))
+        graph.set_ef(max(ef, 1))
+        self.graph = graph
+
+    def search(self, queries: np.ndarray, k: int = 5, batch_size: int = 1024):
+        queries = normalize(queries)
+        k = min(k, len(self.keys))
+        labels, distances = self.graph.knn_query(queries, k=k)
+        # hnswlib's "ip" space returns 1 - inner product.
+        return self.keys[labels], (1.0 - distances).astype(np.float32)
+
+    def _meta(self):
+        return {**super()._meta(), "ef": self.ef}
+
+    def save(self, directory: str = INDEX_DIR):
+        super().save(directory)
+        self.graph.save_index(os.path.join(directory, "hnsw.bin"))
+
+    @classmethod
+    def load(cls, directory: str, meta: dict):
+        import hnswlib
+
+        vectors, keys = cls._load_arrays(directory)
+        graph = hnswlib.Index(space="ip", dim=meta["dim"])
+        graph.load_index(os.path.join(directory, "hnsw.bin"), max_elements=meta["count"])
+        return cls(vectors, keys, dtype=meta["dtype"], model_name=meta["model_name"], normalized=True,
+                   ef=meta["ef"], graph=graph)
+
+INDEX_TYPES = {cls.kind: cls for cls in (FlatIndex, IVFIndex, HNSWIndex)}
+
+def load_index(directory: str = INDEX_DIR):
+    """Loads a saved index (vectors are memory-mapped); returns None if none has been built."""
+    meta_path = os.path.join(directory, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    return INDEX_TYPES[meta["kind"]].load(directory, meta)
+
+#############################################
+# Build Step
+#############################################
+
+def encode_texts(texts, model_name: str = MODEL_NAME, batch_size: int = 64) -> np.ndarray:
+    """
+    Encodes texts with Sentence-BERT through the on-disk embedding cache, so only new or
+    changed texts are embedded. Returns normalised float32 embeddings.
+    """
+    from embedding_cache import EmbeddingCache
+
+    cache = EmbeddingCache(model_name)
+    embeddings = cache.encode(texts, batch_size=batch_size)
+    print(cache.report())
+    return normalize(embeddings)
+
+def build_index(kind: str = "flat", dtype: str = "float32", directory: str = INDEX_DIR,
+                model_name: str = MODEL_NAME, **options):
+    """Embeds the Wikileaks documents from the data store and saves an index keyed by document key."""
+    from data_store import load_table
+
+    wikileaks_df = load_table("wikileaks", columns=["key", "Text"])
+    embeddings = encode_texts(wikileaks_df["Text"].fillna("").astype(str), model_name)
+    index = INDEX_TYPES[kind](embeddings, wikileaks_df["key"].to_numpy(), dtype=dtype,
+                              model_name=model_name, normalized=True, **options)
+    index.save(directory)
+    return index
+
+#############################################
+# CLI
+#############################################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the Wikileaks Sentence-BERT vector index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build")
+    build_parser.add_argument("--kind", choices=sorted(INDEX_TYPES), default="flat")
+    build_parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    build_parser.add_argument("--directory", default=INDEX_DIR)
+
+    query_parser = subparsers.add_parser("query")
+    query_parser.add_argument("text", nargs="+", help="One or more query texts (searched as one batch).")
+    query_parser.add_argument("--top-k", type=int, default=5)
+    query_parser.add_argument("--directory", default=INDEX_DIR)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        start = time.perf_counter()
+        index = build_index(args.kind, args.dtype, args.directory)
+        print(f"Built {index.kind} index over {len(index)} documents in {time.perf_counter() - start:.1f}s")
+    else:
+        index = load_index(args.directory)
+        if index is None:
+            raise SystemExit(f"No index found in {args.directory}. Run `python vector_index.py build` first.")
+        keys, scores = index.search(encode_texts(args.text, index.model_name), k=args.top_k)
+        for text, row_keys, row_scores in zip(args.text, keys, scores):
+            print(f"Query: {text[:80]}")
+            for key, score in zip(row_keys, row_scores):
+                print(f"  key={key}  similarity={score * 100:.2f}%")